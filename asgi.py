@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""ASGI entry point serving the same routes as main.py.
+
+    SESSION_BACKEND=memory uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+Requests are handled by the Flask views in main.py, each in a worker
+thread so that the event loop keeps serving other connections meanwhile.
+The session is loaded from an async store before a view runs and the keys
+it changed are written back afterwards, so the event loop only waits on
+session I/O and never blocks on it. The request body is received as the
+view reads it and the response is sent chunk by chunk, so neither is held
+in memory as a whole.
+
+With the filesystem session backend there is no async store; the view then
+reads and writes the session files from its thread.
+"""
+
+import asyncio
+import io
+import sys
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask
+
+from main import create_app
+from monitoring.instrumentation import instrumentation
+from stores.session import (
+    AsyncSessionStore,
+    KeyedSessionInterface,
+    PendingSession,
+    PreloadedSessionStore,
+    create_async_session_store,
+    pending_session,
+)
+
+Scope = Dict[str, Any]
+Receive = Callable[[], Any]
+Send = Callable[[Dict[str, Any]], Any]
+
+
+class RequestBody(io.RawIOBase):
+    """WSGI input receiving the ASGI request body as the view reads it.
+
+    Only read from a worker thread; each read waits for the next message on
+    the event loop.
+    """
+
+    def __init__(self, receive: Receive, loop: asyncio.AbstractEventLoop) -> None:
+        self.receive = receive
+        self.loop = loop
+        self.buffer = b""
+        self.more_body = True
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.buffer and self.more_body:
+            message = asyncio.run_coroutine_threadsafe(
+                self.receive(), self.loop
+            ).result()
+            if message["type"] == "http.disconnect":
+                self.more_body = False
+                break
+            self.buffer = message.get("body", b"")
+            self.more_body = message.get("more_body", False)
+        size = min(len(buffer), len(self.buffer))
+        buffer[:size] = self.buffer[:size]
+        self.buffer = self.buffer[size:]
+        return size
+
+
+def build_environ(scope: Scope, body: io.RawIOBase) -> Dict[str, Any]:
+    """Translates an ASGI HTTP scope and body stream into a WSGI environ."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode().decode("latin-1"),
+        "PATH_INFO": scope["path"].encode().decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BufferedReader(body),
+        # The body ends with the last message, with or without Content-Length
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = f"HTTP_{key}"
+        if key in environ and key.startswith("HTTP_"):
+            value = f"{environ[key]},{value}"
+        environ[key] = value
+    return environ
+
+
+class WsgiResponse:
+    """Status, headers and body chunks of a WSGI app's response."""
+
+    def __init__(self, wsgi_app: Callable, environ: Dict[str, Any]) -> None:
+        """Calls the app; runs the view, so call it from a worker thread."""
+        self.status = 500
+        self.headers: List[Tuple[bytes, bytes]] = []
+        self.chunks: Iterable[bytes] = wsgi_app(environ, self.start_response)
+
+    def start_response(self, status, headers, exc_info=None):
+        self.status = int(status.split(" ", 1)[0])
+        self.headers = [
+            (name.lower().encode("latin-1"), value.encode("latin-1"))
+            for name, value in headers
+        ]
+
+    async def send(self, send: Send) -> None:
+        """Sends the response, fetching each chunk in a worker thread."""
+        chunks = iter(self.chunks)
+        try:
+            # Some apps only call start_response once the first chunk is read
+            chunk = await asyncio.to_thread(next, chunks, None)
+            await send(
+                {
+                    "type": "http.response.start",
+                    "status": self.status,
+                    "headers": self.headers,
+                }
+            )
+            while chunk is not None:
+                if chunk:
+                    await send(
+                        {"type": "http.response.body", "body": chunk, "more_body": True}
+                    )
+                chunk = await asyncio.to_thread(next, chunks, None)
+            await send({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(self.chunks, "close"):
+                await asyncio.to_thread(self.chunks.close)
+
+
+class AsyncApp:
+    """ASGI application running the Flask views around async session I/O."""
+
+    def __init__(self, app: Flask, store: Optional[AsyncSessionStore]) -> None:
+        self.app = app
+        self.store = store
+        if store is not None:
+            app.session_interface = KeyedSessionInterface(
+                app,
+                PreloadedSessionStore(),
+                permanent=app.config["SESSION_PERMANENT"],
+            )
+            instrumentation.instrument_session(app)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            raise ValueError(f"Unsupported ASGI scope type: {scope['type']}")
+
+        body = RequestBody(receive, asyncio.get_running_loop())
+        environ = build_environ(scope, body)
+        if self.store is None:
+            response = await asyncio.to_thread(WsgiResponse, self.app, environ)
+        else:
+            response = await self.handle(environ)
+        await response.send(send)
+
+    async def handle(self, environ: Dict[str, Any]) -> WsgiResponse:
+        """Loads the session, runs the views and awaits the session writes.
+
+        The writes are awaited before the response is sent, so a client's
+        next request sees them.
+        """
+        interface = self.app.session_interface
+        sid = self.session_id(environ)
+        store_id = interface._get_store_id(sid) if sid else None
+        fields = await self.store.load(store_id) if store_id else None
+
+        pending = PendingSession(store_id, fields)
+        token = pending_session.set(pending)
+        try:
+            # The worker thread runs in a copy of this context, pending included
+            response = await asyncio.to_thread(WsgiResponse, self.app, environ)
+        finally:
+            pending_session.reset(token)
+        await pending.flush(self.store)
+        return response
+
+    def session_id(self, environ: Dict[str, Any]) -> Optional[str]:
+        """Returns the session ID from the request's session cookie."""
+        name = self.app.config["SESSION_COOKIE_NAME"]
+        request = self.app.request_class(environ)
+        return request.cookies.get(name)
+
+    async def lifespan(self, receive: Receive, send: Send) -> None:
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.store is not None:
+                    await self.store.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+flask_app = create_app()
+app = AsyncApp(flask_app, create_async_session_store(flask_app))
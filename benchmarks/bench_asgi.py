@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Load-tests running deployments and compares requests/sec and p99 latency.
+
+Each worker thread is one visitor with its own cookie jar. It alternates
+between adding a drink through the JSON API and loading the index page.
+
+Run both deployments with the pod limits from deployment.yaml, e.g.:
+
+    docker run --rm --cpus 0.5 --memory 512m -p 5001:5000 bac_calculator
+    docker run --rm --cpus 0.5 --memory 512m -p 5002:5000 \\
+        -e SESSION_BACKEND=memory bac_calculator \\
+        uvicorn asgi:app --host 0.0.0.0 --port 5000
+
+    python benchmarks/bench_asgi.py \\
+        --target gevent=http://localhost:5001 --target asgi=http://localhost:5002
+
+Without docker, --spawn starts both servers locally instead, pinned to one
+CPU and limited to 512 MiB of address space. That only approximates the
+500m CPU limit, so prefer the containers for numbers worth comparing.
+"""
+
+import argparse
+import json
+import os
+import resource
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from http.cookiejar import CookieJar
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import DRINKS  # noqa: E402
+
+MEMORY_LIMIT = 512 * 1024 * 1024  # 512Mi, as in deployment.yaml
+
+SERVERS = {
+    "gevent": (
+        ["gunicorn", "-w", "4", "-k", "gevent", "-b", "127.0.0.1:{port}", "main:app"],
+        {},
+    ),
+    "asgi": (
+        ["uvicorn", "asgi:app", "--host", "127.0.0.1", "--port", "{port}"],
+        {"SESSION_BACKEND": "memory"},
+    ),
+}
+
+
+def limit_resources():
+    """Pins the server to one CPU and caps its address space."""
+    os.sched_setaffinity(0, {min(os.sched_getaffinity(0))})
+    resource.setrlimit(resource.RLIMIT_AS, (MEMORY_LIMIT, MEMORY_LIMIT))
+
+
+def spawn(name, port):
+    command, env = SERVERS[name]
+    process = subprocess.Popen(
+        [part.format(port=port) for part in command],
+        cwd=ROOT,
+        env=dict(os.environ, **env),
+        preexec_fn=limit_resources,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(f"{url}/health-check", timeout=1)
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError(f"{name} server did not start on port {port}")
+
+
+def visitor(url, requests, latencies, errors):
+    opener = urllib.request.build_opener(
+        urllib.request.HTTPCookieProcessor(CookieJar())
+    )
+    for i in range(requests):
+        if i % 2:
+            request = urllib.request.Request(f"{url}/")
+        else:
+            body = json.dumps({"drink": str(DRINKS[i % len(DRINKS)])}).encode()
+            request = urllib.request.Request(
+                f"{url}/api/v1/session/drinks",
+                data=body,
+                headers={"Content-Type": "application/json"},
+            )
+        start = time.perf_counter()
+        try:
+            opener.open(request, timeout=30).read()
+        except OSError:
+            errors.append(1)
+            continue
+        latencies.append(time.perf_counter() - start)
+
+
+def run(url, threads, requests):
+    latencies, errors = [], []
+    workers = [
+        threading.Thread(target=visitor, args=(url, requests, latencies, errors))
+        for _ in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": len(errors),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--target",
+        action="append",
+        default=[],
+        metavar="NAME=URL",
+        help="Running deployment to load-test, may be repeated",
+    )
+    parser.add_argument(
+        "--spawn", action="store_true", help="Start gevent and ASGI servers locally"
+    )
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=100)
+    args = parser.parse_args()
+
+    targets = dict(target.split("=", 1) for target in args.target)
+    processes = []
+    try:
+        if args.spawn:
+            for port, name in enumerate(SERVERS, start=5101):
+                process, targets[name] = spawn(name, port)
+                processes.append(process)
+        if not targets:
+            parser.error("Pass --target NAME=URL or --spawn")
+
+        results = {
+            name: run(url, args.threads, args.requests)
+            for name, url in targets.items()
+        }
+    finally:
+        for process in processes:
+            process.terminate()
+            process.wait()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""Measures the per-request cost of resolving a submitted drink.
+
+Compares the previous lookup, which rebuilt a set of every session drink
+plus DRINKS and scanned it, with DrinkCatalog.resolve, for sessions holding
+more and more drinks.
+
+    python benchmarks/bench_catalog.py --sizes 10 100 1000 5000
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from main import DRINK_CATALOG, DRINKS  # noqa: E402
+from models.drink import Drink  # noqa: E402
+from models.drink_log import DrinkLog  # noqa: E402
+
+
+def build_log(size):
+    """Returns a drink log with size drinks, a tenth of them custom."""
+    log = DrinkLog({})
+    for i in range(size):
+        if i % 10:
+            drink = DRINKS[i % len(DRINKS)]
+        else:
+            drink = Drink(name=f"Custom{i}", volume=250, unit="ml", alcohol=12)
+        log.add(drink, i)
+    return log
+
+
+def scan_lookup(store, key):
+    """The lookup add_drink and remove_drink used before DrinkCatalog."""
+    drinks = [Drink(*DrinkLog(store).catalog[i]) for i in store["selected"]]
+    all_unique_drinks = set(drinks + DRINKS)
+    return next((d for d in all_unique_drinks if str(d) == key), None)
+
+
+def indexed_lookup(store, key):
+    return DRINK_CATALOG.resolve(key, DrinkLog(store))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 5000])
+    parser.add_argument("--number", type=int, default=50)
+    args = parser.parse_args()
+
+    results = {}
+    for size in args.sizes:
+        store = build_log(size).store
+        key = "Custom0 (250 ml, 12%)"
+        results[size] = {
+            name: round(
+                min(timeit.repeat(lambda: lookup(store, key), number=args.number, repeat=3))
+                / args.number
+                * 1e6,
+                2,
+            )
+            for name, lookup in (("scan_us", scan_lookup), ("indexed_us", indexed_lookup))
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
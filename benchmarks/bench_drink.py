@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Compares memory and throughput of Drink and FrozenDrink.
+
+Constructs N drinks of each class, then sorts them by volume in liters the
+way get_combined_drinks does, and reports the time of both steps and the
+memory the instances hold.
+
+    python benchmarks/bench_drink.py --count 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.drink import Drink, FrozenDrink  # noqa: E402
+
+
+def random_fields(count, seed=1):
+    rng = random.Random(seed)
+    units = {"L": (0.1, 2.0), "ml": (20, 2000), "cl": (2, 150)}
+    fields = []
+    for _ in range(count):
+        unit = rng.choice(list(units))
+        volume = round(rng.uniform(*units[unit]), 2)
+        fields.append(("Drink", volume, unit, round(rng.uniform(0, 60), 1)))
+    return fields
+
+
+def measure(cls, fields):
+    start = time.perf_counter()
+    drinks = [cls(*entry) for entry in fields]
+    construct = time.perf_counter() - start
+
+    start = time.perf_counter()
+    drinks.sort(key=lambda x: x.volume_in_liters(), reverse=True)
+    sort = time.perf_counter() - start
+
+    timings = []
+    for _ in range(2):
+        start = time.perf_counter()
+        total = sum(drink.alcohol_grams() for drink in drinks)
+        timings.append(time.perf_counter() - start)
+
+    # Measured separately, tracemalloc slows down allocation heavy code
+    tracemalloc.start()
+    drinks = [cls(*entry) for entry in fields]
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "construct_ms": round(construct * 1000, 1),
+        "sort_ms": round(sort * 1000, 1),
+        "alcohol_grams_first_ms": round(timings[0] * 1000, 1),
+        "alcohol_grams_repeat_ms": round(timings[1] * 1000, 1),
+        "bytes_per_drink": round(memory / len(drinks), 1),
+        "total_grams": round(total, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=100000)
+    args = parser.parse_args()
+
+    fields = random_fields(args.count)
+    results = {cls.__name__: measure(cls, fields) for cls in (Drink, FrozenDrink)}
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""Measures the per-request overhead of logging on the calculation path.
+
+Times POST /api/v1/calculate with the memory session backend, and
+calculate_time_to_sober on its own, in a fresh process per mode with
+stderr written to a file. Each request uses another weight so the result
+cache never hits and every request logs its calculation:
+
+- off: LOG_LEVEL=WARNING, nothing is logged.
+- on: every calculation record is queued and written by the listener.
+- sampled: the default LOG_SAMPLE_RATES.
+
+With --root, the same is measured for another checkout, e.g. the commit
+before the log pipeline, where the modes only differ in LOG_LEVEL if that
+checkout reads it:
+
+    python benchmarks/bench_logging.py --requests 5000
+    python benchmarks/bench_logging.py --root /tmp/before
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODES = {
+    "off": {"LOG_LEVEL": "WARNING"},
+    "on": {"LOG_LEVEL": "INFO", "LOG_SAMPLE_RATES": "calculation=1"},
+    "sampled": {"LOG_LEVEL": "INFO"},
+}
+
+REQUESTS = """
+import json, statistics, sys, time
+import main
+app = main.create_app() if hasattr(main, "create_app") else main.app
+client = app.test_client()
+client.post("/add_drink", data={"drink": str(main.DRINKS[1])})
+timings = []
+for i in range(int(sys.argv[1])):
+    profile = {"weight": 50 + i / 10, "gender": "male", "age": 30}
+    start = time.perf_counter()
+    client.post("/api/v1/calculate", json=profile)
+    timings.append(time.perf_counter() - start)
+calls = int(sys.argv[1]) * 10
+start = time.perf_counter()
+for i in range(calls):
+    main.calculate_time_to_sober(0.5, 50 + i / 100, 30)
+calculation = (time.perf_counter() - start) / calls
+start = time.perf_counter()
+pipeline = getattr(main, "log_pipeline", None)
+if pipeline is not None:
+    pipeline.stop()
+drain = time.perf_counter() - start
+print(json.dumps({
+    "median_us": round(statistics.median(timings) * 1e6, 1),
+    "mean_us": round(statistics.mean(timings) * 1e6, 1),
+    "p99_us": round(sorted(timings)[int(len(timings) * 0.99)] * 1e6, 1),
+    "calculation_us": round(calculation * 1e6, 2),
+    "drain_ms": round(drain * 1000, 1),
+}))
+"""
+
+
+def measure(root: str, env: dict, requests: int) -> dict:
+    with tempfile.TemporaryFile() as log:
+        result = subprocess.run(
+            [sys.executable, "-c", REQUESTS, str(requests)],
+            cwd=root,
+            env=dict(os.environ, SESSION_BACKEND="memory", **env),
+            stdout=subprocess.PIPE,
+            stderr=log,
+            text=True,
+            check=True,
+        )
+        log_bytes = log.seek(0, os.SEEK_END)
+    return dict(json.loads(result.stdout.splitlines()[-1]), log_bytes=log_bytes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=ROOT, help="Checkout to measure")
+    parser.add_argument("--requests", type=int, default=2000)
+    args = parser.parse_args()
+
+    results = {
+        mode: measure(os.path.abspath(args.root), env, args.requests)
+        for mode, env in MODES.items()
+    }
+    off = results["off"]
+    for result in results.values():
+        result["overhead_us"] = round(result["median_us"] - off["median_us"], 1)
+        result["calculation_overhead_us"] = round(
+            result["calculation_us"] - off["calculation_us"], 2
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
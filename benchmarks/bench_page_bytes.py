@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+"""Measures the bytes a browser transfers per view of the index page.
+
+Replays a visit through the Flask test client with a minimal browser
+cache: responses are kept with their ETag and Last-Modified, fresh ones
+(max-age) are reused without a request and stale ones are revalidated
+with If-None-Match and If-Modified-Since. Every view fetches the page
+and the static files it references.
+
+The visit is a first view, reloads, adding a drink and a custom drink,
+and more reloads. The status line, headers and body of every response
+are counted. Use --root to measure another checkout, e.g. the commit
+before a change:
+
+    git worktree add /tmp/before HEAD~1
+    python benchmarks/bench_page_bytes.py --root /tmp/before
+    python benchmarks/bench_page_bytes.py
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from typing import Dict, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+ASSET = re.compile(r'(?:src|href)="(/static/[^"]+)"')
+
+
+class BrowserCache:
+    """Fetches URLs like a browser with an HTTP cache, counting the bytes."""
+
+    def __init__(self, client) -> None:
+        self.client = client
+        self.entries: Dict[str, dict] = {}
+        self.bytes = 0
+        self.requests = 0
+
+    def fetch(self, url: str, method: str = "GET", data: Optional[dict] = None) -> str:
+        entry = self.entries.get(url)
+        if method == "GET" and entry and entry["fresh_until"] > time.time():
+            return entry["body"]
+        headers = {}
+        if method == "GET" and entry:
+            if entry["etag"]:
+                headers["If-None-Match"] = entry["etag"]
+            if entry["last_modified"]:
+                headers["If-Modified-Since"] = entry["last_modified"]
+        response = self.client.open(url, method=method, data=data, headers=headers)
+        self.requests += 1
+        self.bytes += len(f"HTTP/1.1 {response.status}\r\n") + sum(
+            len(f"{name}: {value}\r\n") for name, value in response.headers
+        )
+        if response.status_code == 304:
+            body = entry["body"]
+        else:
+            body = response.get_data(as_text=True)
+            self.bytes += len(response.get_data())
+        if response.status_code in (301, 302, 303):
+            return self.view(response.headers["Location"])
+        cache_control = response.cache_control
+        if method == "GET" and not cache_control.no_store:
+            max_age = 0 if cache_control.no_cache else cache_control.max_age or 0
+            self.entries[url] = {
+                "body": body,
+                "etag": response.headers.get("ETag"),
+                "last_modified": response.headers.get("Last-Modified"),
+                "fresh_until": time.time() + max_age,
+            }
+        return body
+
+    def view(self, url: str, method: str = "GET", data: Optional[dict] = None) -> str:
+        """Fetches a page and the static files it references."""
+        html = self.fetch(url, method, data)
+        for asset in dict.fromkeys(ASSET.findall(html)):
+            self.fetch(asset.replace("&amp;", "&"))
+        return html
+
+
+def measure(app, reloads: int) -> Dict:
+    with app.test_client() as client:
+        browser = BrowserCache(client)
+        views = []
+
+        def view(*args, **kwargs):
+            before = (browser.bytes, browser.requests)
+            browser.view(*args, **kwargs)
+            views.append((browser.bytes - before[0], browser.requests - before[1]))
+
+        view("/")
+        for _ in range(reloads):
+            view("/")
+        view("/add_drink", "POST", {"drink": str(app.config["BENCH_DRINK"])})
+        for _ in range(reloads):
+            view("/")
+        custom = {
+            "custom-drink-name": "Mojito",
+            "custom-drink-alcohol": "12",
+            "custom-drink-volume": "250",
+        }
+        view("/add_custom_drink", "POST", custom)
+        for _ in range(reloads):
+            view("/")
+
+    # The reloads after the first drink was added
+    reloaded = views[1:reloads + 1]
+    return {
+        "views": len(views),
+        "total_bytes": browser.bytes,
+        "requests": browser.requests,
+        "first_view_bytes": views[0][0],
+        "bytes_per_view": round(browser.bytes / len(views)),
+        "bytes_per_reload": round(
+            sum(b for b, _ in reloaded) / max(reloads, 1)
+        ),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--root", default=ROOT, help="Checkout to measure")
+    parser.add_argument("--reloads", type=int, default=4)
+    args = parser.parse_args()
+
+    sys.path.insert(0, os.path.abspath(args.root))
+    os.chdir(args.root)
+    import main as app_module
+
+    app_module.app.config["BENCH_DRINK"] = app_module.DRINKS[1]
+    print(json.dumps(measure(app_module.app, args.reloads), indent=2))
+
+
+if __name__ == "__main__":
+    main()
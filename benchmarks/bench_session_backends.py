@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""Compares request latency of the session backends under concurrent load.
+
+Each worker thread owns a test client (one visitor) and alternates between
+adding a drink and loading the index page, so sessions keep growing the way
+they do in production. The size of each visitor's final session cookie is
+reported too, which is what the stateless backend trades storage for.
+
+    python benchmarks/bench_session_backends.py --threads 8 --requests 200
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask_session.filesystem import FileSystemSessionInterface  # noqa: E402
+from main import DRINKS, app  # noqa: E402
+from models.session_codec import SessionCodec  # noqa: E402
+from stores.session import (  # noqa: E402
+    KeyedSessionInterface,
+    MemorySessionStore,
+    RedisSessionStore,
+    TokenSessionInterface,
+)
+
+
+def create_interfaces(redis_url):
+    """Returns the session interfaces to compare, keyed by backend name."""
+    interfaces = {
+        "filesystem": FileSystemSessionInterface(
+            app,
+            cache_dir=tempfile.mkdtemp(prefix="bench_sessions_"),
+            threshold=0,
+            mode=0o600,
+            permanent=False,
+        ),
+        "memory": KeyedSessionInterface(app, MemorySessionStore(), permanent=False),
+        "stateless": TokenSessionInterface(
+            SessionCodec(DRINKS),
+            MemorySessionStore(),
+            app.config["SESSION_TOKEN_MAX_BYTES"],
+        ),
+    }
+    if redis_url:
+        store = RedisSessionStore.from_url(redis_url)
+    else:
+        try:
+            import fakeredis
+        except ImportError:
+            return interfaces
+        store = RedisSessionStore(fakeredis.FakeRedis())
+    interfaces["redis"] = KeyedSessionInterface(app, store, permanent=False)
+    return interfaces
+
+
+def visitor(requests, latencies, cookies):
+    client = app.test_client()
+    for i in range(requests):
+        start = time.perf_counter()
+        if i % 2:
+            client.get("/")
+        else:
+            client.post("/add_drink", data={"drink": str(DRINKS[i % len(DRINKS)])})
+        latencies.append(time.perf_counter() - start)
+    cookie = client.get_cookie(app.config["SESSION_COOKIE_NAME"])
+    cookies.append(len(cookie.value) if cookie else 0)
+
+
+def run(interface, threads, requests):
+    app.session_interface = interface
+    latencies, cookies = [], []
+    workers = [
+        threading.Thread(target=visitor, args=(requests, latencies, cookies))
+        for _ in range(threads)
+    ]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "requests_per_second": round(len(latencies) / elapsed, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+        "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+        "p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 3),
+        "cookie_bytes": max(cookies),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument(
+        "--redis-url", help="Benchmark a real Redis server instead of fakeredis"
+    )
+    args = parser.parse_args()
+
+    results = {
+        name: run(interface, args.threads, args.requests)
+        for name, interface in create_interfaces(args.redis_url).items()
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
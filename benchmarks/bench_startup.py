@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""Measures the cold start of the app against the budget in startup_budget.json.
+
+Reports, each in a fresh interpreter:
+
+- import_ms: cumulative `python -X importtime -c "import main"` time, with
+  the slowest modules main imports directly.
+- first_response_ms: from the start of the import, through create_app(),
+  to the responses of adding a drink and rendering the history.
+- rss_mb: resident memory of that process afterwards, i.e. of one worker.
+
+With --gunicorn, it also starts gunicorn with and without --preload and
+reports the time until it answers and the RSS and PSS of each worker; PSS
+splits the pages shared copy-on-write between the processes using them.
+
+    python benchmarks/bench_startup.py
+    python benchmarks/bench_startup.py --gunicorn --workers 4
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BUDGET = os.path.join(os.path.dirname(os.path.abspath(__file__)), "startup_budget.json")
+
+FIRST_RESPONSE = """
+import json, time
+start = time.perf_counter()
+import main
+app = main.create_app()
+client = app.test_client()
+client.post("/add_drink", data={"drink": str(main.DRINKS[1])})
+client.get("/history")
+elapsed = time.perf_counter() - start
+with open("/proc/self/status") as f:
+    rss = next(int(line.split()[1]) for line in f if line.startswith("VmRSS:"))
+print(json.dumps({"first_response_ms": elapsed * 1000, "rss_kb": rss}))
+"""
+
+
+def run_python(args: List[str]) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+
+
+def measure_import(top: int = 10) -> Dict:
+    """Returns the import time of main and its slowest direct imports."""
+    stderr = run_python(["-X", "importtime", "-c", "import main"]).stderr
+    total = 0
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|")
+        if not cumulative.strip().isdigit():
+            continue  # header line
+        if name.strip() == "main":
+            total = int(cumulative)
+        elif name.startswith("   ") and not name.startswith("    "):
+            # Imported directly by a top-level import, i.e. by main
+            modules.append((name.strip(), int(cumulative)))
+    modules.sort(key=lambda module: module[1], reverse=True)
+    return {
+        "import_ms": round(total / 1000, 1),
+        "slowest_imports_ms": {name: round(us / 1000, 1) for name, us in modules[:top]},
+    }
+
+
+def measure_first_response() -> Dict:
+    """Returns the time to the first responses and the RSS of a fresh process."""
+    result = json.loads(run_python(["-c", FIRST_RESPONSE]).stdout.splitlines()[-1])
+    return {
+        "first_response_ms": round(result["first_response_ms"], 1),
+        "rss_mb": round(result["rss_kb"] / 1024, 1),
+    }
+
+
+def memory_mb(pid: int) -> Dict[str, float]:
+    """Returns the RSS and PSS of a process from /proc."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key.lower() + "_mb"] = round(int(rest.split()[0]) / 1024, 1)
+    return values
+
+
+def measure_gunicorn(preload: bool, workers: int, port: int) -> Dict:
+    """Starts gunicorn and returns its startup time and per-worker memory."""
+    if preload:
+        command = ["gunicorn", "main:create_app(preload=True)"]
+    else:
+        # Without gunicorn.conf.py, as before create_app existed
+        command = ["gunicorn", "-c", "/dev/null", "-k", "gevent", "main:app"]
+    env = dict(
+        os.environ, GUNICORN_BIND=f"127.0.0.1:{port}", GUNICORN_WORKERS=str(workers)
+    )
+    command[1:1] = ["-w", str(workers), "-b", f"127.0.0.1:{port}"]
+
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        command,
+        cwd=ROOT,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        url = f"http://127.0.0.1:{port}"
+        first_response: Optional[float] = None
+        for _ in range(300):
+            try:
+                urllib.request.urlopen(f"{url}/health-check", timeout=1)
+                first_response = time.perf_counter() - start
+                break
+            except OSError:
+                time.sleep(0.02)
+        if first_response is None:
+            raise RuntimeError(f"gunicorn did not start on port {port}")
+
+        # Let every worker boot and serve a few requests
+        for _ in range(workers * 5):
+            urllib.request.urlopen(f"{url}/history", timeout=5).read()
+        time.sleep(0.5)
+        with open(f"/proc/{process.pid}/task/{process.pid}/children") as f:
+            pids = [int(pid) for pid in f.read().split()]
+        return {
+            "first_response_ms": round(first_response * 1000, 1),
+            "master": memory_mb(process.pid),
+            "workers": [memory_mb(pid) for pid in pids],
+        }
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def load_budget(path: str = BUDGET) -> Dict[str, float]:
+    with open(path) as f:
+        return json.load(f)
+
+
+def over_budget(results: Dict, budget: Dict[str, float]) -> List[str]:
+    """Returns a message for each measurement above its budget."""
+    return [
+        f"{name}: {results[name]} > {limit} budget"
+        for name, limit in budget.items()
+        if name in results and results[name] > limit
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget", default=BUDGET)
+    parser.add_argument("--gunicorn", action="store_true", help="Also start gunicorn")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=5201)
+    args = parser.parse_args()
+
+    results = measure_import()
+    results.update(measure_first_response())
+    if args.gunicorn:
+        results["gunicorn"] = {
+            "preload": measure_gunicorn(True, args.workers, args.port),
+            "no_preload": measure_gunicorn(False, args.workers, args.port + 1),
+        }
+
+    budget = load_budget(args.budget)
+    report = {"results": results, "budget": budget}
+    report["over_budget"] = over_budget(results, budget)
+    print(json.dumps(report, indent=2))
+    if report["over_budget"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
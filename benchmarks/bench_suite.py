@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Benchmarks every route at several session sizes and the calculation helpers.
+
+Sessions are pre-filled with 10, 1k and 10k drinks before the routes are
+timed, so the output shows how each route degrades as a session grows. The
+median of each benchmark is compared with a stored baseline and the script
+exits with status 1 if any benchmark got slower than the threshold allows.
+
+    python benchmarks/bench_suite.py                        # compare
+    python benchmarks/bench_suite.py --save-baseline        # record
+    python benchmarks/bench_suite.py --sizes 10 --threshold 0.5 --output out.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+from typing import Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from main import (  # noqa: E402
+    DRINKS,
+    app,
+    calculate_age_factor,
+    calculate_bac,
+    calculate_reduction_factor,
+    calculate_time_to_sober,
+    calculate_total_alcohol_in_grams,
+)
+from models.drink import Drink, FrozenDrink  # noqa: E402
+from models.drink_log import DrinkLog  # noqa: E402
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+SIZES = [10, 1000, 10000]
+START = 1_700_000_000
+
+
+MIN_ROUND_SECONDS = 0.005  # Shorter rounds are dominated by timer noise
+
+
+def calibrate(func: Callable[[], object]) -> int:
+    """Returns how many calls make a round last at least MIN_ROUND_SECONDS."""
+    inner = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(inner):
+            func()
+        if time.perf_counter() - start >= MIN_ROUND_SECONDS:
+            return inner
+        inner *= 2
+
+
+def measure(
+    func: Callable[[], object], rounds: int, inner: Optional[int] = 1
+) -> Dict:
+    """Times rounds of inner calls and returns per-call statistics in µs.
+
+    With inner=None, the number of calls per round is calibrated first.
+    """
+    func()  # warm up caches and lazy imports
+    if inner is None:
+        inner = calibrate(func)
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for _ in range(inner):
+            func()
+        timings.append((time.perf_counter() - start) / inner * 1e6)
+    return {
+        "median_us": round(statistics.median(timings), 3),
+        "mean_us": round(statistics.mean(timings), 3),
+        "min_us": round(min(timings), 3),
+        "rounds": rounds,
+    }
+
+
+def micro_benchmarks(rounds: int) -> Dict[str, Dict]:
+    drinks = DRINKS * 4
+    drink = DRINKS[1]
+    cases = {
+        "calculate_age_factor": lambda: calculate_age_factor(45),
+        "calculate_reduction_factor": lambda: calculate_reduction_factor("female", 45),
+        "calculate_bac": lambda: calculate_bac(70, "male", 30, 80.0),
+        "calculate_time_to_sober": lambda: calculate_time_to_sober(1.2, 70, 30),
+        "calculate_total_alcohol_in_grams": lambda: calculate_total_alcohol_in_grams(
+            drinks
+        ),
+        "Drink.__init__": lambda: Drink(name="Bier", volume=500, unit="ml", alcohol=5),
+        "FrozenDrink.__init__": lambda: FrozenDrink(
+            name="Bier", volume=500, unit="ml", alcohol=5
+        ),
+        "Drink.alcohol_grams": drink.alcohol_grams,
+        "Drink.volume_in_liters": drink.volume_in_liters,
+        "Drink.__str__": drink.__str__,
+        "Drink.__hash__": drink.__hash__,
+    }
+    return {
+        f"micro/{name}": measure(func, rounds, inner=None)
+        for name, func in cases.items()
+    }
+
+
+def fill_session(client, size: int) -> None:
+    """Pre-fills the client's session with size drinks and a user profile."""
+    client.post("/calculate", data={"weight": "75", "gender": "male", "age": "30"})
+    with client.session_transaction() as session:
+        log = DrinkLog(session)
+        for i in range(size):
+            log.add(DRINKS[i % len(DRINKS)], START + i * 60)
+
+
+def route_benchmarks(size: int, rounds: int) -> Dict[str, Dict]:
+    client = app.test_client()
+    fill_session(client, size)
+    drink = {"drink": str(DRINKS[1])}
+    profile = {"weight": "75", "gender": "male", "age": "30"}
+    cases = {
+        "GET /": lambda: client.get("/"),
+        "POST /add_drink": lambda: client.post("/add_drink", data=drink),
+        "POST /remove_drink": lambda: client.post("/remove_drink", data=drink),
+        "POST /calculate": lambda: client.post("/calculate", data=profile),
+        "GET /history": lambda: client.get("/history"),
+        "GET /api/v1/session/drinks": lambda: client.get("/api/v1/session/drinks"),
+    }
+    return {
+        f"route/{name}[{size}]": measure(func, rounds)
+        for name, func in cases.items()
+    }
+
+
+def compare(
+    results: Dict[str, Dict],
+    baseline: Dict[str, Dict],
+    threshold: float,
+    min_delta: float = 0.0,
+) -> List[str]:
+    """Returns a message for each benchmark slower than the baseline allows.
+
+    A benchmark regressed if its median exceeds the baseline median by more
+    than threshold, e.g. 0.25 for 25%, and by more than min_delta µs, which
+    keeps sub-microsecond benchmarks from failing on timer jitter.
+    Benchmarks missing on either side are ignored.
+    """
+    regressions = []
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        expected = baseline[name]["median_us"]
+        actual = result["median_us"]
+        if actual > expected * (1 + threshold) and actual - expected > min_delta:
+            regressions.append(
+                f"{name}: {actual:.1f}µs vs {expected:.1f}µs baseline "
+                f"(+{(actual / expected - 1) * 100:.0f}%)"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--baseline", default=BASELINE)
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=float(os.environ.get("BENCH_THRESHOLD", 0.25)),
+        help="Allowed slowdown of a median against the baseline (0.25 = 25%%)",
+    )
+    parser.add_argument(
+        "--min-delta",
+        type=float,
+        default=1.0,
+        help="Slowdowns of at most this many µs are never regressions",
+    )
+    parser.add_argument(
+        "--save-baseline", action="store_true", help="Write the results as baseline"
+    )
+    parser.add_argument("--output", help="Also write the results to this file")
+    args = parser.parse_args()
+
+    results = micro_benchmarks(args.rounds)
+    for size in args.sizes:
+        results.update(route_benchmarks(size, args.rounds))
+
+    report = {"results": results}
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+            f.write("\n")
+    elif os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report["threshold"] = args.threshold
+        report["regressions"] = compare(
+            results, baseline, args.threshold, args.min_delta
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps(report, indent=2, ensure_ascii=False))
+    if report.get("regressions"):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Measures session writes with inline pruning against the background sweeper.
+
+Fills a FileSystemCache directory with --files sessions, a tenth of them
+expired, and reports the worst and median time of a session write when
+cachelib prunes at that threshold inside set(), as the filesystem session
+backend did, and with threshold=0, as now. The time of one sweep of the
+same directory, which runs in the background instead, is reported as well.
+
+    python benchmarks/bench_sweeper.py --files 500
+"""
+
+import argparse
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from cachelib import FileSystemCache  # noqa: E402
+
+from stores.sweeper import FileIndex, SessionSweeper, SweptDirectory  # noqa: E402
+
+SESSION = {
+    "drink_catalog": [["Bier", 0.5, "L", 5]],
+    "selected_counts": [3],
+    "history_ids": [0] * 50,
+    "history_ts": list(range(1_700_000_000, 1_700_000_050)),
+}
+
+
+def fill(path: str, files: int) -> FileSystemCache:
+    cache = FileSystemCache(path, threshold=0)
+    for i in range(files):
+        cache.set(f"session:{i}", SESSION, timeout=1 if i % 10 == 0 else 3600)
+    return cache
+
+
+def write_times(path: str, threshold: int, writes: int) -> list:
+    """Returns the milliseconds of each session write at a threshold."""
+    cache = FileSystemCache(path, threshold=threshold)
+    if threshold:
+        # The count cachelib keeps, as if it had written the files itself
+        cache._update_count(value=len(os.listdir(path)))
+    times = []
+    for i in range(writes):
+        start = time.perf_counter()
+        cache.set(f"session:new:{i}", SESSION, timeout=3600)
+        times.append((time.perf_counter() - start) * 1000)
+    return times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, default=500)
+    parser.add_argument("--writes", type=int, default=200)
+    args = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="bench_sweeper_")
+    try:
+        results = {}
+        time.sleep(1.1)  # Let the short-lived sessions expire
+        for name, threshold in (("inline_prune", args.files), ("sweeper", 0)):
+            path = os.path.join(root, name)
+            fill(path, args.files)
+            times = write_times(path, threshold, args.writes)
+            results[name] = {
+                "median_ms": round(statistics.median(times), 3),
+                "max_ms": round(max(times), 3),
+            }
+
+        path = os.path.join(root, "sweep")
+        fill(path, args.files)
+        sweeper = SessionSweeper()
+        sweeper.state_file = os.path.join(root, "sweeper.json")
+        sweeper.directories = {
+            "sessions": SweptDirectory(FileIndex(path), max_files=args.files)
+        }
+        state = sweeper.sweep(now=time.time() + 2, force=True)
+        results["sweep"] = {
+            "ms": round(state["last_duration"] * 1000, 3),
+            "deleted": state["deleted"]["sessions"],
+        }
+    finally:
+        shutil.rmtree(root)
+    print(json.dumps({"files": args.files, "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""Measures the throughput of the factor table lookups against the arithmetic.
+
+Times the scalar helpers over random (gender, age, weight) profiles and the
+batch factor functions over arrays of them, once with the rounding
+arithmetic they used before engine.tables and once with the table lookups.
+
+    python benchmarks/bench_tables.py --profiles 10000 --batch-size 100000
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import batch, tables  # noqa: E402
+from engine.constants import (  # noqa: E402
+    AGE_FACTOR_ONSET,
+    AGE_FACTOR_SLOPE,
+    ALCOHOL_METABOLISM_RATE,
+    DEFAULT_REDUCTION_FACTOR,
+    MIN_METABOLISM_RATE,
+    REDUCTION_FACTOR,
+    REFERENCE_WEIGHT,
+)
+from models.user import MAX_AGE, MAX_WEIGHT, MIN_AGE  # noqa: E402
+
+
+def arithmetic_age_factor(age):
+    if age <= AGE_FACTOR_ONSET:
+        return 1
+    return round(1 - ((age - AGE_FACTOR_ONSET) * AGE_FACTOR_SLOPE), 2)
+
+
+def arithmetic_reduction_factor(gender, age):
+    return REDUCTION_FACTOR.get(gender, DEFAULT_REDUCTION_FACTOR) * arithmetic_age_factor(
+        age
+    )
+
+
+def arithmetic_metabolism_rate(age, weight):
+    metabolism_rate = max(
+        MIN_METABOLISM_RATE, ALCOHOL_METABOLISM_RATE * arithmetic_age_factor(age)
+    )
+    return round(metabolism_rate * (weight / REFERENCE_WEIGHT), 2)
+
+
+def arithmetic_batch(genders, ages, weights):
+    """The batch factor functions as they were before engine.tables."""
+    factors = 1 - ((ages - AGE_FACTOR_ONSET) * AGE_FACTOR_SLOPE)
+    age_factors = np.where(
+        ages > AGE_FACTOR_ONSET, batch.round_half_even(factors, 2), 1.0
+    )
+    reduction_factors = np.full(len(genders), DEFAULT_REDUCTION_FACTOR)
+    for gender, factor in REDUCTION_FACTOR.items():
+        reduction_factors[genders == gender] = factor
+    reduction_factors = reduction_factors * age_factors
+    rates = np.maximum(MIN_METABOLISM_RATE, ALCOHOL_METABOLISM_RATE * age_factors)
+    return reduction_factors, batch.round_half_even(
+        rates * (weights / REFERENCE_WEIGHT), 2
+    )
+
+
+def table_batch(genders, ages, weights):
+    return batch.reduction_factors(genders, ages), batch.adjusted_metabolism_rates(
+        ages, weights
+    )
+
+
+def random_profiles(size, seed=42):
+    rng = random.Random(seed)
+    return [
+        (
+            rng.choice(["male", "female"]),
+            rng.randint(MIN_AGE, MAX_AGE),
+            round(rng.uniform(5, MAX_WEIGHT), 1),
+        )
+        for _ in range(size)
+    ]
+
+
+def best_of(func, number):
+    """Returns the fastest of three runs of func in seconds per run."""
+    return min(timeit.repeat(func, number=number, repeat=3)) / number
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--profiles", type=int, default=10000)
+    parser.add_argument("--batch-size", type=int, default=100000)
+    parser.add_argument("--number", type=int, default=5)
+    args = parser.parse_args()
+
+    profiles = random_profiles(args.profiles)
+    scalar = {
+        "arithmetic": (
+            arithmetic_age_factor,
+            arithmetic_reduction_factor,
+            arithmetic_metabolism_rate,
+        ),
+        "tables": (
+            tables.age_factor,
+            tables.reduction_factor,
+            tables.adjusted_metabolism_rate,
+        ),
+    }
+    results = {}
+    for name, (age_factor, reduction_factor, metabolism_rate) in scalar.items():
+
+        def run():
+            for gender, age, weight in profiles:
+                age_factor(age)
+                reduction_factor(gender, age)
+                metabolism_rate(age, weight)
+
+        seconds = best_of(run, args.number)
+        results[f"scalar/{name}"] = {
+            "profiles_per_second": round(len(profiles) / seconds),
+            "us_per_profile": round(seconds / len(profiles) * 1e6, 3),
+        }
+
+    columns = random_profiles(args.batch_size, seed=7)
+    genders = np.array([gender for gender, _, _ in columns])
+    ages = np.array([age for _, age, _ in columns], dtype=np.int64)
+    weights = np.array([weight for _, _, weight in columns], dtype=np.float64)
+    for name, func in (("arithmetic", arithmetic_batch), ("tables", table_batch)):
+        seconds = best_of(lambda: func(genders, ages, weights), args.number)
+        results[f"batch/{name}"] = {
+            "profiles_per_second": round(args.batch_size / seconds),
+            "ms_per_batch": round(seconds * 1e3, 3),
+        }
+
+    for kind in ("scalar", "batch"):
+        results[f"{kind}/speedup"] = round(
+            results[f"{kind}/tables"]["profiles_per_second"]
+            / results[f"{kind}/arithmetic"]["profiles_per_second"],
+            2,
+        )
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""Measures formatting a history page with babel against the cached formatter.
+
+Formats --entries timestamps, logged --interval seconds apart, once with
+babel's format_datetime per entry and once with models.time_format, cold
+(a new formatter) and warm (the minutes already cached).
+
+    python benchmarks/bench_time_format.py --entries 500 --interval 30
+"""
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from datetime import datetime
+
+from babel.dates import format_datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from models.time_format import TimestampFormatter  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=500)
+    parser.add_argument("--interval", type=int, default=30)
+    parser.add_argument("--locale", default="de_DE")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    timestamps = [1_700_000_000 + i * args.interval for i in range(args.entries)]
+    warm = TimestampFormatter(args.locale)
+
+    def babel_page():
+        return [
+            format_datetime(datetime.fromtimestamp(t), locale=args.locale)
+            for t in timestamps
+        ]
+
+    def cold_page():
+        formatter = TimestampFormatter(args.locale)
+        return [formatter(t) for t in timestamps]
+
+    def warm_page():
+        return [warm(t) for t in timestamps]
+
+    assert babel_page() == cold_page() == warm_page()
+    pages = {"babel": babel_page, "cold": cold_page, "warm": warm_page}
+    results = {
+        name: round(min(timeit.repeat(page, number=1, repeat=args.repeat)) * 1000, 3)
+        for name, page in pages.items()
+    }
+    print(json.dumps({"page_ms": results, "entries": args.entries}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
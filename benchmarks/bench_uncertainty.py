@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""Measures the Monte Carlo uncertainty bands against a per-sample loop.
+
+Draws --samples parameter sets for one profile and reports the time of
+engine.uncertainty.simulate, which evaluates them as numpy arrays, and of
+the same model evaluated sample by sample in Python.
+
+    python benchmarks/bench_uncertainty.py --samples 10000
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from engine import tables  # noqa: E402
+from engine.constants import ALCOHOL_ABSORPTION_RATE  # noqa: E402
+from engine.uncertainty import simulate  # noqa: E402
+
+PROFILE = {"total_alcohol": 40.0, "weight": 80.0, "gender": "male", "age": 30}
+
+
+def loop_bands(samples: int, seed: int = 0) -> list:
+    """Evaluates the default distributions one sample at a time."""
+    rng = random.Random(seed)
+    reduction = tables.reduction_factor(PROFILE["gender"], PROFILE["age"])
+    rate = tables.adjusted_metabolism_rate(PROFILE["age"], PROFILE["weight"])
+    bac, time_to_sober = [], []
+    for _ in range(samples):
+        absorbed = min(ALCOHOL_ABSORPTION_RATE * rng.gauss(1, 0.08), 1.0)
+        value = (
+            PROFILE["total_alcohol"]
+            * absorbed
+            / (PROFILE["weight"] * reduction * rng.gauss(1, 0.12))
+        )
+        bac.append(value)
+        time_to_sober.append(value / (rate * rng.lognormvariate(0, 0.2)))
+    return [
+        statistics.quantiles(values, n=20)[index]
+        for values in (bac, time_to_sober)
+        for index in (0, 9, 18)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--samples", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    timings = {
+        "vectorized": lambda: simulate(**PROFILE, samples=args.samples),
+        "loop": lambda: loop_bands(args.samples),
+    }
+    results = {
+        name: round(min(timeit.repeat(run, number=1, repeat=args.repeat)) * 1000, 3)
+        for name, run in timings.items()
+    }
+    bands = simulate(**PROFILE, samples=args.samples, seed=0).to_dict()
+    print(
+        json.dumps(
+            {"ms": results, "samples": args.samples, "bands": bands}, indent=2
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
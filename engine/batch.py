@@ -0,0 +1,162 @@
+from dataclasses import dataclass
+from typing import Dict, Sequence
+
+import numpy as np
+
+from engine.constants import ALCOHOL_ABSORPTION_RATE, REFERENCE_WEIGHT
+from engine.tables import (
+    AGE_FACTORS,
+    BASE_METABOLISM_RATES,
+    DEFAULT_REDUCTION_FACTORS,
+    REDUCTION_FACTORS,
+)
+from models.user import MAX_AGE, MAX_WEIGHT, MIN_AGE
+
+# Distance from .5 below which a scaled value is treated as a rounding tie
+_TIE_EPSILON: float = 1e-6
+
+# The factor tables of engine.tables as arrays, indexed by age - MIN_AGE
+AGE_FACTOR_ARRAY: np.ndarray = np.array(AGE_FACTORS, dtype=np.float64)
+REDUCTION_FACTOR_ARRAYS: Dict[str, np.ndarray] = {
+    gender: np.array(factors, dtype=np.float64)
+    for gender, factors in REDUCTION_FACTORS.items()
+}
+DEFAULT_REDUCTION_FACTOR_ARRAY: np.ndarray = np.array(
+    DEFAULT_REDUCTION_FACTORS, dtype=np.float64
+)
+BASE_METABOLISM_RATE_ARRAY: np.ndarray = np.array(
+    BASE_METABOLISM_RATES, dtype=np.float64
+)
+
+
+@dataclass
+class BatchResult:
+    total_alcohol: np.ndarray  # Total alcohol per profile in grams
+    bac: np.ndarray  # Blood alcohol content per profile in per mille
+    time_to_sober: np.ndarray  # Hours until sober per profile
+
+    def to_dict(self) -> Dict[str, list]:
+        """Returns the result columns as plain lists for JSON encoding."""
+        return {
+            "total_alcohol": self.total_alcohol.tolist(),
+            "bac": self.bac.tolist(),
+            "time_to_sober": self.time_to_sober.tolist(),
+        }
+
+
+def round_half_even(values: np.ndarray, ndigits: int) -> np.ndarray:
+    """Rounds like the builtin round() so batch and scalar results agree.
+
+    np.round scales before rounding, which can flip values sitting next to a
+    .5 boundary. Those few candidates are re-rounded with the builtin.
+    """
+    scale = 10.0**ndigits
+    scaled = values * scale
+    rounded = np.rint(scaled) / scale
+    ties = np.abs(np.abs(scaled - np.trunc(scaled)) - 0.5) < _TIE_EPSILON
+    if ties.any():
+        index = np.flatnonzero(ties)
+        rounded[index] = [round(float(value), ndigits) for value in values[index]]
+    return rounded
+
+
+def age_factors(ages: np.ndarray) -> np.ndarray:
+    """Vectorized counterpart of calculate_age_factor.
+
+    Looks the factors up in the precomputed table, so ages must lie between
+    MIN_AGE and MAX_AGE.
+    """
+    return AGE_FACTOR_ARRAY[ages - MIN_AGE]
+
+
+def reduction_factors(genders: np.ndarray, ages: np.ndarray) -> np.ndarray:
+    """Vectorized counterpart of calculate_reduction_factor."""
+    index = ages - MIN_AGE
+    factors = DEFAULT_REDUCTION_FACTOR_ARRAY[index]
+    for gender, table in REDUCTION_FACTOR_ARRAYS.items():
+        mask = genders == gender
+        factors[mask] = table[index[mask]]
+    return factors
+
+
+def adjusted_metabolism_rates(ages: np.ndarray, weights: np.ndarray) -> np.ndarray:
+    """Vectorized counterpart of calculate_adjusted_metabolism_rate."""
+    rates = BASE_METABOLISM_RATE_ARRAY[ages - MIN_AGE]
+    return round_half_even(rates * (weights / REFERENCE_WEIGHT), 2)
+
+
+def total_alcohol_in_grams(
+    drink_grams: Sequence[float], owners: Sequence[int], size: int
+) -> np.ndarray:
+    """Sums the grams of every drink into the profile that owns it.
+
+    bincount accumulates in input order, so each total matches
+    calculate_total_alcohol_in_grams over the same drinks.
+    """
+    totals = np.bincount(
+        np.asarray(owners, dtype=np.intp),
+        weights=np.asarray(drink_grams, dtype=np.float64),
+        minlength=size,
+    )
+    return round_half_even(totals, 2)
+
+
+def integer_column(values: Sequence[int], name: str) -> np.ndarray:
+    """Returns a column of integers, rejecting floats, strings and booleans.
+
+    Casting with dtype=np.int64 would silently truncate 30.7 to 30 and
+    turn True into 1.
+    """
+    column = np.asarray(values)
+    if len(column) and column.dtype.kind not in "iu":
+        raise ValueError(f"{name} must be an integer")
+    # A list mixing ints and bools still gives an integer array
+    if not isinstance(values, np.ndarray) and any(
+        isinstance(value, bool) for value in values
+    ):
+        raise ValueError(f"{name} must be an integer")
+    return column.astype(np.int64, copy=False)
+
+
+def calculate_batch(
+    weights: Sequence[float],
+    genders: Sequence[str],
+    ages: Sequence[int],
+    drink_grams: Sequence[float],
+    owners: Sequence[int],
+) -> BatchResult:
+    """Calculates total alcohol, BAC and time to sober for a batch of profiles.
+
+    The profile columns must have the same length. Drinks are passed as two
+    flat columns: the alcohol grams of each drink and the index of the
+    profile that consumed it.
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    genders = np.asarray(genders, dtype=str)
+    ages = integer_column(ages, "Age")
+    size = len(weights)
+
+    if not (len(genders) == len(ages) == size):
+        raise ValueError("Weight, gender and age columns must have equal length")
+    if len(drink_grams) != len(owners):
+        raise ValueError("Drink grams and owners columns must have equal length")
+    if size and not ((0 < weights) & (weights <= MAX_WEIGHT)).all():
+        raise ValueError(f"Weight must be greater than 0 and at most {MAX_WEIGHT}")
+    if size and not ((MIN_AGE <= ages) & (ages <= MAX_AGE)).all():
+        raise ValueError(f"Age must be between {MIN_AGE} and {MAX_AGE}")
+    if len(owners) and not (0 <= np.min(owners) and np.max(owners) < size):
+        raise ValueError("Drink owner index out of range")
+
+    total_alcohol = total_alcohol_in_grams(drink_grams, owners, size)
+    absorbed_alcohol = round_half_even(total_alcohol * ALCOHOL_ABSORPTION_RATE, 2)
+    bac = round_half_even(
+        absorbed_alcohol / (weights * reduction_factors(genders, ages)), 3
+    )
+    metabolism_rates = adjusted_metabolism_rates(ages, weights)
+    if size and not (metabolism_rates > 0).all():
+        raise ValueError("Weight too low, metabolism rate rounds to zero")
+    time_to_sober = round_half_even(bac / metabolism_rates, 2)
+
+    return BatchResult(
+        total_alcohol=total_alcohol, bac=bac, time_to_sober=time_to_sober
+    )
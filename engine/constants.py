@@ -0,0 +1,13 @@
+from typing import Dict
+
+# Model constants shared by the scalar helpers in main.py and the engines
+ALCOHOL_METABOLISM_RATE: float = 0.15
+MIN_METABOLISM_RATE: float = 0.10
+REDUCTION_FACTOR: Dict[str, float] = {"male": 0.7, "female": 0.6}
+DEFAULT_REDUCTION_FACTOR: float = 0.7
+ALCOHOL_ABSORPTION_RATE: float = 0.85
+REFERENCE_WEIGHT: float = 70.0
+AGE_FACTOR_ONSET: int = 20
+AGE_FACTOR_SLOPE: float = 0.001
+ABSORPTION_HOURS: float = 0.5
+LEGAL_LIMIT: float = 0.5
@@ -0,0 +1,194 @@
+from math import inf
+from typing import Any, Dict, List, Optional, Tuple
+
+from engine.constants import ABSORPTION_HOURS, LEGAL_LIMIT
+
+Point = List[float]
+
+# Decimal places of the hours and BAC values in serialized curve points
+CURVE_PRECISION: int = 3
+
+
+def downsample(points: List[Point], target: int) -> List[Point]:
+    """Reduces points to target points with largest-triangle-three-buckets.
+
+    The first and last points are kept. The points in between are split
+    into target - 2 buckets and each bucket keeps the point forming the
+    largest triangle with the point kept before it and the average of the
+    next bucket, which preserves peaks and bends of the curve.
+    """
+    if target >= len(points):
+        return list(points)
+    if target < 3:
+        return [points[0], points[-1]]
+
+    sampled = [points[0]]
+    bucket_size = (len(points) - 2) / (target - 2)
+    previous = points[0]
+    for bucket in range(target - 2):
+        start = int(bucket * bucket_size) + 1
+        end = int((bucket + 1) * bucket_size) + 1
+        next_end = min(int((bucket + 2) * bucket_size) + 1, len(points))
+        following = points[end:next_end] or [points[-1]]
+        average_x = sum(x for x, _ in following) / len(following)
+        average_y = sum(y for _, y in following) / len(following)
+
+        best, best_area = points[start], -1.0
+        for point in points[start:end]:
+            area = abs(
+                (previous[0] - average_x) * (point[1] - previous[1])
+                - (previous[0] - point[0]) * (average_y - previous[1])
+            )
+            if area > best_area:
+                best, best_area = point, area
+        sampled.append(best)
+        previous = best
+    sampled.append(points[-1])
+    return sampled
+
+
+class BacCurve:
+    """Piecewise linear BAC-over-time curve built from timestamped drinks.
+
+    Each drink is absorbed linearly over ABSORPTION_HOURS and alcohol is
+    eliminated at a constant rate while the BAC is above zero. The curve
+    only changes slope at drink, absorption-end and sober events, so it is
+    stored as those breakpoints, in hours since the first drink.
+
+    Drinks are appended in time order. Everything before the latest drink
+    is committed and never recomputed; only the short tail after it is
+    rebuilt when another drink is appended.
+    """
+
+    def __init__(
+        self, bac_per_gram: float, elimination_rate: float, origin: Optional[float] = None
+    ) -> None:
+        if elimination_rate <= 0:
+            raise ValueError(f"Elimination rate must be positive, got {elimination_rate}")
+        self.bac_per_gram = bac_per_gram  # BAC added per absorbed gram of alcohol
+        self.elimination_rate = elimination_rate  # BAC eliminated per hour
+        self.origin = origin  # Epoch seconds of the first drink
+        self.drinks = 0  # Number of drinks folded into the curve
+        self.clock = 0.0  # Hours up to which the curve is committed
+        self.level = 0.0  # BAC at the clock
+        self.absorbing: List[List[float]] = []  # [end hour, BAC per hour]
+        self.committed: List[Point] = []
+        self._tail: Optional[List[Point]] = None
+
+    def add_drink(self, timestamp: float, grams: float) -> None:
+        """Appends a drink consumed at the given epoch timestamp."""
+        if self.origin is None:
+            self.origin = timestamp
+        hours = (timestamp - self.origin) / 3600
+        if hours < self.clock:
+            raise ValueError("Drinks must be added in chronological order")
+
+        self.clock, self.level = self._advance(
+            self.clock, self.level, self.absorbing, hours, self.committed
+        )
+        if not self.committed or self.committed[-1] != [self.clock, self.level]:
+            self.committed.append([self.clock, self.level])
+        self.absorbing.append(
+            [hours + ABSORPTION_HOURS, grams * self.bac_per_gram / ABSORPTION_HOURS]
+        )
+        self.drinks += 1
+        self._tail = None
+
+    def points(self) -> List[Point]:
+        """Returns all breakpoints of the curve until the BAC is back to zero."""
+        if self._tail is None:
+            self._tail = []
+            absorbing = [list(entry) for entry in self.absorbing]
+            self._advance(self.clock, self.level, absorbing, inf, self._tail)
+        return self.committed + self._tail
+
+    def compact(self, max_points: Optional[int] = None) -> List[List[float]]:
+        """Returns the breakpoints as rounded [hours, bac] pairs for JSON.
+
+        With max_points, curves with more breakpoints are downsampled first.
+        """
+        points = self.points()
+        if max_points is not None:
+            points = downsample(points, max_points)
+        return [
+            [round(hours, CURVE_PRECISION), round(bac, CURVE_PRECISION)]
+            for hours, bac in points
+        ]
+
+    def peak(self) -> float:
+        """Returns the highest BAC on the curve."""
+        return max((bac for _, bac in self.points()), default=0.0)
+
+    def time_below(self, limit: float = LEGAL_LIMIT) -> Optional[float]:
+        """Returns the hour after which the BAC stays below the limit.
+
+        Returns None when the curve never reaches the limit.
+        """
+        points = self.points()
+        for (start, start_bac), (end, end_bac) in zip(
+            reversed(points[:-1]), reversed(points[1:])
+        ):
+            if start_bac >= limit > end_bac:
+                return start + (start_bac - limit) / (start_bac - end_bac) * (end - start)
+            if end_bac >= limit:
+                return None
+        return None
+
+    def _advance(
+        self,
+        clock: float,
+        level: float,
+        absorbing: List[List[float]],
+        until: float,
+        points: List[Point],
+    ) -> Tuple[float, float]:
+        """Moves the curve forward to until, appending every breakpoint."""
+        while clock < until:
+            inflow = sum(rate for _, rate in absorbing)
+            if not absorbing and level <= 0:
+                break
+
+            segment_end = min([until] + [end for end, _ in absorbing])
+            slope = inflow - self.elimination_rate
+            if level <= 0 and slope <= 0:
+                # Alcohol is eliminated as fast as it is absorbed
+                level, clock = 0.0, segment_end
+            elif slope < 0 and level + slope * (segment_end - clock) <= 0:
+                clock, level = clock - level / slope, 0.0
+            else:
+                level += slope * (segment_end - clock)
+                clock = segment_end
+
+            absorbing[:] = [entry for entry in absorbing if entry[0] > clock]
+            if clock != inf and (not points or points[-1] != [clock, level]):
+                points.append([clock, level])
+
+        return max(clock, until) if until != inf else clock, level
+
+    def to_state(self) -> Dict[str, Any]:
+        """Serializes the committed curve for storage in the session.
+
+        The committed points are shared, not copied, so a curve restored
+        with from_state appends to the same list when extended.
+        """
+        return {
+            "bac_per_gram": self.bac_per_gram,
+            "elimination_rate": self.elimination_rate,
+            "origin": self.origin,
+            "drinks": self.drinks,
+            "clock": self.clock,
+            "level": self.level,
+            "absorbing": [list(entry) for entry in self.absorbing],
+            "committed": self.committed,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict[str, Any]) -> "BacCurve":
+        """Restores a curve serialized with to_state."""
+        curve = cls(state["bac_per_gram"], state["elimination_rate"], state["origin"])
+        curve.drinks = state["drinks"]
+        curve.clock = state["clock"]
+        curve.level = state["level"]
+        curve.absorbing = [list(entry) for entry in state["absorbing"]]
+        curve.committed = state["committed"]
+        return curve
@@ -0,0 +1,171 @@
+"""Inverse of the BAC model of calculate_bac and calculate_time_to_sober.
+
+The model is linear in the alcohol: the BAC is the absorbed grams divided by
+weight times reduction factor, and it falls by the adjusted metabolism rate
+per hour. Both questions of the planner are therefore solved in closed form:
+how many grams can still be drunk now to be below a target BAC after some
+hours, and after how many hours the drinks so far are below it. Only the
+rounding of calculate_bac shifts the exact gram boundary, which is found
+with a bisection bounded to the few hundredths of a gram around the closed
+form solution.
+"""
+
+import math
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Sequence
+
+from engine import tables
+from engine.constants import ALCOHOL_ABSORPTION_RATE, LEGAL_LIMIT
+from models.drink import Drink
+
+# Decimal places of alcohol amounts in grams, as in Drink.alcohol_grams
+GRAM_DIGITS: int = 2
+# BAC decimal places of calculate_bac, whose rounding moves the boundary
+BAC_DIGITS: int = 3
+# Larger targets (per mille) and hours are clamped, far beyond any real BAC
+MAX_TARGET: float = 10.0
+MAX_HOURS: float = 7 * 24.0
+# Steps of each search loop, far more than the bounded radius ever needs
+MAX_SEARCH_STEPS: int = 64
+
+
+def bac_of(total_alcohol: float, weight: float, gender: str, age: int) -> float:
+    """Returns the BAC of calculate_bac, with the same rounding."""
+    absorbed_alcohol = round(total_alcohol * ALCOHOL_ABSORPTION_RATE, 2)
+    return round(
+        absorbed_alcohol / (weight * tables.reduction_factor(gender, age)), BAC_DIGITS
+    )
+
+
+@dataclass
+class Plan:
+    target: float  # BAC in per mille to be below
+    hours: float  # Hours from now at which the BAC must be below the target
+    bac: float  # BAC of the drinks so far
+    hours_below: float  # Hours from now until the drinks so far are below target
+    budget_grams: float  # Grams of alcohol that can still be drunk now
+    drinks: List[Dict[str, Any]] = field(default_factory=list)  # Budget per drink
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "target": self.target,
+            "hours": self.hours,
+            "bac": self.bac,
+            "hours_below": self.hours_below,
+            "budget_grams": self.budget_grams,
+            "drinks": self.drinks,
+        }
+
+
+def plan(
+    total_alcohol: float,
+    weight: float,
+    gender: str,
+    age: int,
+    drinks: Sequence[Drink] = (),
+    target: float = LEGAL_LIMIT,
+    hours: float = 0.0,
+) -> Plan:
+    """Returns the alcohol budget and the hours until below a target BAC.
+
+    Like calculate_time_to_sober, the drinks so far and any drunk from the
+    budget count as consumed now. The budget is the largest amount of
+    alcohol, in hundredths of a gram, for which calculate_bac minus the
+    metabolism over the given hours is below the target. Each of drinks is
+    returned with the whole number that fits into the budget ("count") and
+    the budget in units of the drink ("units"). Targets above MAX_TARGET and
+    hours above MAX_HOURS are clamped.
+    """
+    if not weight > 0 or not math.isfinite(weight):
+        raise ValueError(f"Weight must be greater than 0, got {weight}")
+    if not target > 0 or not math.isfinite(target):
+        raise ValueError(f"Target must be greater than 0, got {target}")
+    if not hours >= 0 or not math.isfinite(hours):
+        raise ValueError(f"Hours must be at least 0, got {hours}")
+    target = min(target, MAX_TARGET)
+    hours = min(hours, MAX_HOURS)
+    metabolism_rate = tables.adjusted_metabolism_rate(age, weight)
+    if metabolism_rate <= 0:
+        raise ValueError("Weight too low, metabolism rate rounds to zero")
+
+    scale = 10**GRAM_DIGITS
+    reduction_factor = tables.reduction_factor(gender, age)
+    grams_per_bac = weight * reduction_factor / ALCOHOL_ABSORPTION_RATE
+
+    def below(units: int) -> bool:
+        bac = bac_of(units / scale, weight, gender, age)
+        return bac - metabolism_rate * hours < target
+
+    current = round(total_alcohol * scale)
+    bac = bac_of(total_alcohol, weight, gender, age)
+    budget = 0
+    if below(current):
+        # Closed form: grams at which the unrounded BAC reaches the target
+        limit = target + metabolism_rate * hours
+        estimate = math.floor(limit * grams_per_bac * scale)
+        # Rounding the BAC shifts the boundary by at most half its last digit,
+        # plus the rounding of the absorbed grams
+        radius = math.ceil(0.5 * 10**-BAC_DIGITS * grams_per_bac * scale) + 2
+        budget = find_boundary(below, current, estimate, radius) - current
+
+    # The BAC reaches the target at that hour and is below it afterwards
+    hours_below = max(0.0, (bac - target) / metabolism_rate)
+    return Plan(
+        target=target,
+        hours=hours,
+        bac=bac,
+        hours_below=round(hours_below, 2),
+        budget_grams=budget / scale,
+        drinks=drink_budgets(drinks, budget, scale),
+    )
+
+
+def find_boundary(
+    below: Callable[[int], bool], current: int, estimate: int, radius: int
+) -> int:
+    """Returns the largest amount, at least current, for which below holds.
+
+    below must hold for current and flip once as the amount grows. The
+    search starts radius around estimate, widens by radius until it brackets
+    the boundary and then bisects, each loop bounded by MAX_SEARCH_STEPS.
+    """
+    low, high = max(current, estimate - radius), estimate + radius
+    for _ in range(MAX_SEARCH_STEPS):
+        if below(low):
+            break
+        low = max(current, low - radius)
+    for _ in range(MAX_SEARCH_STEPS):
+        if not below(high):
+            break
+        high += radius
+    if not below(low) or below(high):
+        raise ValueError("No budget found for the target")
+    # Invariant: below(low) and not below(high)
+    for _ in range(MAX_SEARCH_STEPS):
+        if high - low <= 1:
+            break
+        middle = (low + high) // 2
+        if below(middle):
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def drink_budgets(
+    drinks: Sequence[Drink], budget: int, scale: int
+) -> List[Dict[str, Any]]:
+    """Returns how often and how much of each drink fits into a budget.
+
+    The budget is in 1/scale grams; drinks without alcohol are left out.
+    """
+    return [
+        {
+            "drink": str(drink),
+            "alcohol_grams": drink.alcohol_grams(),
+            "count": budget // round(drink.alcohol_grams() * scale),
+            "units": round(budget / (drink.alcohol_grams() * scale), 2),
+        }
+        for drink in drinks
+        if drink.alcohol_grams() > 0
+    ]
@@ -0,0 +1,76 @@
+"""Factor tables precomputed over the integer age domain of User.
+
+The age, reduction and base metabolism factors only depend on the age (and
+gender), so they are computed once at import for every age from MIN_AGE to
+MAX_AGE. The metabolism rate is linear in the weight, so scaling the base
+rate of an age by the weight gives exactly the value of the formula.
+"""
+
+from typing import Dict, Tuple
+
+from engine.constants import (
+    AGE_FACTOR_ONSET,
+    AGE_FACTOR_SLOPE,
+    ALCOHOL_METABOLISM_RATE,
+    DEFAULT_REDUCTION_FACTOR,
+    MIN_METABOLISM_RATE,
+    REDUCTION_FACTOR,
+    REFERENCE_WEIGHT,
+)
+from models.user import MAX_AGE, MIN_AGE
+
+
+def compute_age_factor(age: int) -> float:
+    if age <= AGE_FACTOR_ONSET:
+        return 1
+    return round(1 - ((age - AGE_FACTOR_ONSET) * AGE_FACTOR_SLOPE), 2)
+
+
+def compute_base_metabolism_rate(age: int) -> float:
+    """Returns the metabolism rate of an age for the reference weight."""
+    return max(MIN_METABOLISM_RATE, ALCOHOL_METABOLISM_RATE * compute_age_factor(age))
+
+
+AGES = range(MIN_AGE, MAX_AGE + 1)
+
+AGE_FACTORS: Tuple[float, ...] = tuple(compute_age_factor(age) for age in AGES)
+# Reduction factor per gender and age, already multiplied by the age factor
+REDUCTION_FACTORS: Dict[str, Tuple[float, ...]] = {
+    gender: tuple(factor * age_factor for age_factor in AGE_FACTORS)
+    for gender, factor in REDUCTION_FACTOR.items()
+}
+DEFAULT_REDUCTION_FACTORS: Tuple[float, ...] = tuple(
+    DEFAULT_REDUCTION_FACTOR * age_factor for age_factor in AGE_FACTORS
+)
+BASE_METABOLISM_RATES: Tuple[float, ...] = tuple(
+    compute_base_metabolism_rate(age) for age in AGES
+)
+
+
+def in_domain(age: int) -> bool:
+    return isinstance(age, int) and MIN_AGE <= age <= MAX_AGE
+
+
+def age_factor(age: int) -> float:
+    """Looks up the age factor, computing it for ages outside the table."""
+    if in_domain(age):
+        return AGE_FACTORS[age - MIN_AGE]
+    return compute_age_factor(age)
+
+
+def reduction_factor(gender: str, age: int) -> float:
+    """Looks up the reduction factor, computing it for ages outside the table."""
+    if in_domain(age):
+        return REDUCTION_FACTORS.get(gender, DEFAULT_REDUCTION_FACTORS)[age - MIN_AGE]
+    return REDUCTION_FACTOR.get(gender, DEFAULT_REDUCTION_FACTOR) * compute_age_factor(
+        age
+    )
+
+
+def adjusted_metabolism_rate(age: int, weight: float) -> float:
+    """Scales the base rate of an age by the weight and rounds it."""
+    if in_domain(age):
+        base_rate = BASE_METABOLISM_RATES[age - MIN_AGE]
+    else:
+        base_rate = compute_base_metabolism_rate(age)
+    return round(base_rate * (weight / REFERENCE_WEIGHT), 2)
@@ -0,0 +1,141 @@
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from engine import tables
+from engine.constants import ALCOHOL_ABSORPTION_RATE
+
+DISTRIBUTION_KINDS = ["normal", "lognormal", "uniform", "triangular"]
+PARAMETERS = ["reduction", "absorption", "metabolism"]
+DEFAULT_PERCENTILES: Sequence[float] = (5, 50, 95)
+
+# Bounds of the sampled multipliers, so no parameter turns zero or negative
+MIN_MULTIPLIER: float = 0.25
+MAX_MULTIPLIER: float = 4.0
+
+
+@dataclass(frozen=True)
+class Distribution:
+    """Distribution of the multiplier of a model parameter, centered on 1.
+
+    The scale is the standard deviation for "normal", the sigma of the
+    underlying normal for "lognormal", and the half-width for "uniform"
+    and "triangular". A scale of 0 keeps the parameter at its constant.
+    """
+
+    kind: str
+    scale: float
+
+    def __post_init__(self) -> None:
+        if self.kind not in DISTRIBUTION_KINDS:
+            raise ValueError(
+                f"Distribution must be one of {DISTRIBUTION_KINDS}, got '{self.kind}'"
+            )
+        if not 0 <= self.scale < 1:
+            raise ValueError(f"Scale must be at least 0 and below 1, got {self.scale}")
+
+    def sample(self, rng: np.random.Generator, size: int) -> np.ndarray:
+        if self.scale == 0:
+            return np.ones(size)
+        if self.kind == "normal":
+            values = rng.normal(1.0, self.scale, size)
+        elif self.kind == "lognormal":
+            values = rng.lognormal(0.0, self.scale, size)
+        elif self.kind == "uniform":
+            values = rng.uniform(1.0 - self.scale, 1.0 + self.scale, size)
+        else:
+            values = rng.triangular(1.0 - self.scale, 1.0, 1.0 + self.scale, size)
+        return np.clip(values, MIN_MULTIPLIER, MAX_MULTIPLIER)
+
+
+# Person-to-person variation of the Widmark factor (about 0.68 +/- 0.085 for
+# men), of the absorbed fraction and of the elimination rate (0.1 to 0.2
+# per mille per hour)
+DEFAULT_DISTRIBUTIONS: Dict[str, Distribution] = {
+    "reduction": Distribution("normal", 0.12),
+    "absorption": Distribution("normal", 0.08),
+    "metabolism": Distribution("lognormal", 0.2),
+}
+
+
+def parse_distributions(value: str) -> Dict[str, Distribution]:
+    """Parses "parameter=kind:scale,..." over the default distributions."""
+    distributions = dict(DEFAULT_DISTRIBUTIONS)
+    for pair in filter(None, (part.strip() for part in value.split(","))):
+        parameter, _, spec = pair.partition("=")
+        parameter = parameter.strip()
+        if parameter not in PARAMETERS:
+            raise ValueError(
+                f"Parameter must be one of {PARAMETERS}, got '{parameter}'"
+            )
+        kind, _, scale = spec.partition(":")
+        distributions[parameter] = Distribution(kind.strip(), float(scale))
+    return distributions
+
+
+@dataclass
+class UncertaintyResult:
+    samples: int
+    percentiles: Sequence[float]
+    bac: np.ndarray  # BAC in per mille at each percentile
+    time_to_sober: np.ndarray  # Hours until sober at each percentile
+
+    def to_dict(self) -> Dict:
+        """Returns the bands keyed like "p5", "p50" and "p95" for JSON."""
+        keys = [f"p{percentile:g}" for percentile in self.percentiles]
+        return {
+            "samples": self.samples,
+            "bac": dict(zip(keys, self.bac.tolist())),
+            "time_to_sober": dict(zip(keys, self.time_to_sober.tolist())),
+        }
+
+
+def simulate(
+    total_alcohol: float,
+    weight: float,
+    gender: str,
+    age: int,
+    samples: int = 10000,
+    distributions: Optional[Dict[str, Distribution]] = None,
+    percentiles: Sequence[float] = DEFAULT_PERCENTILES,
+    seed: Optional[int] = None,
+) -> UncertaintyResult:
+    """Returns percentile bands of the BAC and time to sober of a profile.
+
+    Draws samples of the reduction factor, the absorbed fraction and the
+    metabolism rate, each as the value calculate_bac and
+    calculate_time_to_sober use times a multiplier from its distribution,
+    and evaluates the model for all of them at once. The absorbed fraction
+    is capped at 1. Pass a seed for reproducible bands.
+    """
+    if samples < 1:
+        raise ValueError(f"Samples must be at least 1, got {samples}")
+    if weight <= 0:
+        raise ValueError(f"Weight must be greater than 0, got {weight}")
+    distributions = {**DEFAULT_DISTRIBUTIONS, **(distributions or {})}
+    rng = np.random.default_rng(seed)
+
+    reduction = tables.reduction_factor(gender, age) * distributions[
+        "reduction"
+    ].sample(rng, samples)
+    absorption = np.minimum(
+        ALCOHOL_ABSORPTION_RATE * distributions["absorption"].sample(rng, samples),
+        1.0,
+    )
+    base_rate = tables.adjusted_metabolism_rate(age, weight)
+    if base_rate <= 0:
+        raise ValueError("Weight too low, metabolism rate rounds to zero")
+    metabolism_rate = base_rate * distributions["metabolism"].sample(rng, samples)
+
+    bac = total_alcohol * absorption / (weight * reduction)
+    time_to_sober = bac / metabolism_rate
+    bac_bands, sober_bands = np.percentile(
+        np.stack([bac, time_to_sober]), percentiles, axis=1
+    ).T
+    return UncertaintyResult(
+        samples=samples,
+        percentiles=list(percentiles),
+        bac=np.round(bac_bands, 3),
+        time_to_sober=np.round(sober_bands, 2),
+    )
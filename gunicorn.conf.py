@@ -0,0 +1,29 @@
+"""Gunicorn settings, read automatically from the working directory.
+
+    gunicorn "main:create_app(preload=True)"
+
+The app is imported once in the master (preload_app) and the workers are
+forked from it, so the modules, locale data and templates loaded at
+startup are shared copy-on-write instead of being loaded by every worker.
+"""
+
+import gc
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:5000")
+workers = int(os.environ.get("GUNICORN_WORKERS", 4))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gevent")
+preload_app = True
+
+if worker_class == "gevent":
+    # The gevent worker patches only after the fork, too late for socket and
+    # ssl, which the master already imports while preloading the app
+    from gevent import monkey
+
+    monkey.patch_all()
+
+
+def when_ready(server):
+    # Objects that exist before the fork are never freed, so keep the
+    # collector from touching (and thereby copying) their pages in workers
+    gc.freeze()
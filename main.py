@@ -1,17 +1,56 @@
 #!/usr/bin/env python3
 
+import hashlib
+import io
 import logging
 import os
 from datetime import datetime
-from typing import List, Literal
+from functools import lru_cache
+from typing import Any, Dict, List, Literal, Optional, Tuple, Union
 
-from babel.dates import format_datetime
 from cachelib.file import FileSystemCache
-from flask import Flask, flash, redirect, render_template, request, session, url_for
-
-from flask_session import Session
-from models.drink import Drink
+from flask import (
+    Flask,
+    Response,
+    flash,
+    g,
+    has_request_context,
+    jsonify,
+    redirect,
+    render_template,
+    request,
+    session,
+    stream_with_context,
+    url_for,
+)
+from markupsafe import Markup
+from werkzeug.security import safe_join
+
+from engine import planner, tables
+from engine.constants import ALCOHOL_ABSORPTION_RATE, LEGAL_LIMIT
+from engine.curve import BacCurve
+from models.aggregate import DrinkAggregate
+from models.catalog import DrinkCatalog
+# Immutable drinks with cached derived values, API-compatible with Drink
+from models.drink import FrozenDrink as Drink
+from models.drink_log import DrinkLog
+from models.group import GroupTab
+from models.history_io import (
+    MEDIA_TYPES,
+    PARSERS,
+    export_csv,
+    export_ndjson,
+    import_history,
+)
+from models.session_version import SessionVersion
+from models.time_format import get_formatter
 from models.user import User
+from monitoring.instrumentation import instrumentation, timed
+from monitoring.logs import log_event, log_pipeline
+from stores.history import create_history_archive
+from stores.results import create_result_cache, result_key
+from stores.session import init_session
+from stores.sweeper import session_sweeper
 
 app = Flask(__name__)
 
@@ -21,32 +60,133 @@ class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", os.urandom(24))
     SESSION_PERMANENT = False
     SESSION_COOKIE_NAME = "session"
-    SESSION_TYPE = "filesystem"
+    SESSION_TYPE = "cachelib"
+    # One of "filesystem", "memory" (single worker per pod), "redis" or
+    # "stateless" (signed cookie tokens, replicas must share SECRET_KEY)
+    SESSION_BACKEND = os.environ.get("SESSION_BACKEND", "filesystem")
+    # Stateless sessions whose cookie would exceed this many bytes are kept
+    # in the fallback store. Every process and replica must reach it, so it
+    # is "redis", or "memory" only with WORKER_PROCESSES=1 and one replica
+    SESSION_TOKEN_MAX_BYTES = int(
+        os.environ.get("SESSION_TOKEN_MAX_BYTES", 3800)
+    )
+    SESSION_TOKEN_FALLBACK = os.environ.get("SESSION_TOKEN_FALLBACK", "redis")
+    # Processes serving the app, as gunicorn.conf.py starts them
+    WORKER_PROCESSES = int(os.environ.get("GUNICORN_WORKERS", 4))
+    # Files of the filesystem backend, the least recently used beyond
+    # SESSION_FILE_MAX are deleted by the sweeper
+    SESSION_FILE_DIR = os.environ.get(
+        "SESSION_FILE_DIR", os.path.join(os.getcwd(), "flask_session")
+    )
+    SESSION_FILE_MAX = int(os.environ.get("SESSION_FILE_MAX", 500))
+    SESSION_MEMORY_MAX_ENTRIES = int(
+        os.environ.get("SESSION_MEMORY_MAX_ENTRIES", 10000)
+    )
+    SESSION_REDIS_URL = os.environ.get("SESSION_REDIS_URL", "redis://localhost")
+    SESSION_REDIS_MAX_CONNECTIONS = int(
+        os.environ.get("SESSION_REDIS_MAX_CONNECTIONS", 50)
+    )
+    BATCH_MAX_PROFILES = int(os.environ.get("BATCH_MAX_PROFILES", 10000))
+    # Points of the downsampled BAC curve served by /api/curve
+    CURVE_POINTS = int(os.environ.get("CURVE_POINTS", 200))
+    # Monte Carlo uncertainty bands of /calculate, see engine/uncertainty.py
+    UNCERTAINTY_SAMPLES = int(os.environ.get("UNCERTAINTY_SAMPLES", 10000))
+    UNCERTAINTY_MAX_SAMPLES = int(
+        os.environ.get("UNCERTAINTY_MAX_SAMPLES", 100000)
+    )
+    # Parameter distributions as "parameter=kind:scale,...", over defaults
+    UNCERTAINTY_DISTRIBUTIONS = os.environ.get("UNCERTAINTY_DISTRIBUTIONS", "")
+    GROUP_MAX_PARTICIPANTS = int(
+        os.environ.get("GROUP_MAX_PARTICIPANTS", 300)
+    )
+    GROUP_MAX_ROUNDS = int(os.environ.get("GROUP_MAX_ROUNDS", 1000))
+    # One of "memory", "cachelib" (the FileSystemCache below) or "none"
+    RESULT_CACHE_BACKEND = os.environ.get("RESULT_CACHE_BACKEND", "memory")
+    RESULT_CACHE_MAX_ENTRIES = int(
+        os.environ.get("RESULT_CACHE_MAX_ENTRIES", 1024)
+    )
+    RESULT_CACHE_TTL = int(os.environ.get("RESULT_CACHE_TTL", 60 * 60))
+    # Directory of the FileSystemCache below, capped by the sweeper
+    CACHE_DIR = os.environ.get("CACHE_DIR", "/tmp/flask_session")
+    CACHE_MAX_FILES = int(os.environ.get("CACHE_MAX_FILES", 250))
+    # Seconds between sweeps of the session and cache files, 0 disables
+    # them, see stores/sweeper.py
+    SWEEP_INTERVAL = int(os.environ.get("SWEEP_INTERVAL", 300))
+    # Sessions unused for this long are deleted, 0 keeps them until expiry
+    SWEEP_IDLE_HOURS = int(os.environ.get("SWEEP_IDLE_HOURS", 168))
+    # Idle sessions larger than this many bytes get their history trimmed
+    # to SWEEP_COMPACT_ENTRIES entries, 0 disables it
+    SWEEP_COMPACT_BYTES = int(os.environ.get("SWEEP_COMPACT_BYTES", 8192))
+    SWEEP_COMPACT_ENTRIES = int(os.environ.get("SWEEP_COMPACT_ENTRIES", 50))
+    # Sweep totals, shared by the processes of a pod
+    SWEEP_STATE_FILE = os.environ.get(
+        "SWEEP_STATE_FILE", "/tmp/bac_sweeper.json"
+    )
+    # Recent history entries kept in the session, older ones are archived
+    HISTORY_MAX_ENTRIES = int(os.environ.get("HISTORY_MAX_ENTRIES", 200))
+    HISTORY_CHUNK_SIZE = int(os.environ.get("HISTORY_CHUNK_SIZE", 100))
+    # Entries older than this are dropped, 0 keeps them forever
+    HISTORY_RETENTION_HOURS = int(
+        os.environ.get("HISTORY_RETENTION_HOURS", 168)
+    )
+    # One of "filesystem", "memory", "redis" or "none" (drop instead)
+    HISTORY_ARCHIVE_BACKEND = os.environ.get(
+        "HISTORY_ARCHIVE_BACKEND", "filesystem"
+    )
+    HISTORY_ARCHIVE_DIR = os.environ.get(
+        "HISTORY_ARCHIVE_DIR", "/tmp/bac_history"
+    )
+    HISTORY_MEMORY_MAX_CHUNKS = int(
+        os.environ.get("HISTORY_MEMORY_MAX_CHUNKS", 100000)
+    )
+    HISTORY_PAGE_SIZE = int(os.environ.get("HISTORY_PAGE_SIZE", 50))
+    # Per-stage timings, /metrics and Server-Timing headers
+    INSTRUMENTATION_ENABLED = (
+        os.environ.get("INSTRUMENTATION_ENABLED", "false").lower() == "true"
+    )
+    # Fraction of requests run under cProfile, when instrumentation is on
+    PROFILE_SAMPLE_RATE = float(os.environ.get("PROFILE_SAMPLE_RATE", 0))
+    PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/bac_profiles")
+    # Logs are written to stderr by a background thread, see monitoring/logs
+    LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO").upper()
+    # One of "json" or "text"
+    LOG_FORMAT = os.environ.get("LOG_FORMAT", "json")
+    # Fraction of the records kept per event, as "event=rate,..."
+    LOG_SAMPLE_RATES = os.environ.get("LOG_SAMPLE_RATES", "calculation=0.1")
+    # Records logged while this many are queued are dropped
+    LOG_QUEUE_SIZE = int(os.environ.get("LOG_QUEUE_SIZE", 10000))
+    # Seconds the log listener collects records for before writing them
+    LOG_FLUSH_INTERVAL = float(os.environ.get("LOG_FLUSH_INTERVAL", 0.05))
+    # Locales of formatted times, matched against Accept-Language; the
+    # first one is the default
+    LOCALES = os.environ.get("LOCALES", "de_DE,en_US,en_GB,fr_FR").split(",")
 
 
 app.config.from_object(Config)
 
-# Initialize cache
+# Initialize cache, pruned by the sweeper instead of inline
 cache = FileSystemCache(
-    cache_dir="/tmp/flask_session",
-    threshold=250,
+    cache_dir=app.config["CACHE_DIR"],
+    threshold=0,
     default_timeout=60 * 60 * 24 * 7,
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format='"%(asctime)s" "%(levelname)s" - "%(message)s"'
-)
-logger = logging.getLogger(__name__)
+# Memoized calculation results
+result_cache = create_result_cache(app, cache)
 
-# Initialize Flask-Session
-Session(app)
+# Rendered page fragments by session version
+fragment_cache = create_result_cache(app, cache, prefix="fragment:")
 
-# Constants
-ALCOHOL_METABOLISM_RATE = 0.15
-REDUCTION_FACTOR = {"male": 0.7, "female": 0.6}
-ALCOHOL_ABSORPTION_RATE = 0.85
-ETHANOL_DENSITY = 0.789
+
+@lru_cache(maxsize=None)
+def get_history_archive() -> Optional[Any]:
+    """Returns the archive of history entries, created on first use."""
+    return create_history_archive(app)
+
+
+# Configure logging, the listener is started by create_app
+log_pipeline.init_app(app)
+logger = logging.getLogger(__name__)
 
 # Drink data
 DRINKS = [
@@ -59,17 +199,27 @@ DRINKS = [
     Drink(name="Schnaps", volume=4, unit="cl", alcohol=40),
     Drink(name="Schnaps", volume=2, unit="cl", alcohol=40),
 ]
+DRINK_CATALOG = DrinkCatalog(DRINKS)
+
+# Initialize the session backend, stateless tokens reference DRINKS
+init_session(app, known_drinks=DRINKS)
+
+# Initialize the opt-in instrumentation
+instrumentation.init_app(app)
 
 
 # Helper functions
+@timed("calculate_age_factor")
 def calculate_age_factor(age: int) -> float:
-    return round(1 - ((age - 20) * 0.001) if age > 20 else 1, 2)
+    return tables.age_factor(age)
 
 
+@timed("calculate_reduction_factor")
 def calculate_reduction_factor(gender: Literal["male", "female"], age: int) -> float:
-    return REDUCTION_FACTOR.get(gender, 0.7) * calculate_age_factor(age)
+    return tables.reduction_factor(gender, age)
 
 
+@timed("calculate_bac")
 def calculate_bac(
     weight: float, gender: Literal["male", "female"], age: int, total_alcohol: float
 ) -> float:
@@ -78,140 +228,618 @@ def calculate_bac(
     return round(absorbed_alcohol / (weight * reduction_factor), 3)
 
 
+@timed("calculate_adjusted_metabolism_rate")
 def calculate_adjusted_metabolism_rate(age: int, weight: float) -> float:
-    metabolism_rate = ALCOHOL_METABOLISM_RATE * calculate_age_factor(age)
-    metabolism_rate = max(0.10, metabolism_rate)
-    weight_factor = weight / 70
-    return round(metabolism_rate * weight_factor, 2)
+    return tables.adjusted_metabolism_rate(age, weight)
 
 
+@timed("calculate_time_to_sober")
 def calculate_time_to_sober(bac: float, weight: float, age: int) -> float:
     final_metabolism_rate = calculate_adjusted_metabolism_rate(age, weight)
     time_to_sober = round(bac / final_metabolism_rate, 2)
-    logger.info(f"With values age={age} weigth={weight} bac={bac}")
-    logger.info(f"Final metabolism rate: {final_metabolism_rate}")
-    logger.info(f"Time to sober: {time_to_sober} hours")
+    # One sampled record, formatted by the log listener if it is kept
+    log_event(
+        logger,
+        "calculation",
+        "Time to sober: %s hours",
+        time_to_sober,
+        age=age,
+        weight=weight,
+        bac=bac,
+        metabolism_rate=final_metabolism_rate,
+    )
 
     return time_to_sober
 
 
+@timed("calculate_total_alcohol_in_grams")
 def calculate_total_alcohol_in_grams(drinks: List[Drink]) -> float:
     return round(sum(drink.alcohol_grams() for drink in drinks), 2)
 
 
+def resolve_batch_drinks(
+    drinks: List[List[Any]],
+) -> Tuple[List[float], List[int]]:
+    """Flattens per-profile drink lists into grams and owner columns.
+
+    A drink is either the name of a predefined drink or an object with the
+    Drink fields. Each distinct drink is validated and converted only once.
+    """
+    grams_by_drink: Dict[str, float] = {}
+    drink_grams: List[float] = []
+    owners: List[int] = []
+    for owner, profile_drinks in enumerate(drinks):
+        for drink in profile_drinks:
+            if isinstance(drink, str):
+                key = drink
+            else:
+                key = repr(sorted(drink.items()))
+            grams = grams_by_drink.get(key)
+            if grams is None:
+                if isinstance(drink, str):
+                    if drink not in DRINK_CATALOG:
+                        raise ValueError(f"Drink not found: {drink}")
+                    grams = DRINK_CATALOG.get(drink).alcohol_grams()
+                else:
+                    grams = Drink(**drink).alcohol_grams()
+                grams_by_drink[key] = grams
+            drink_grams.append(grams)
+            owners.append(owner)
+    return drink_grams, owners
+
+
+def get_drink_log() -> DrinkLog:
+    """Returns the drink log of the current session, migrating old sessions."""
+    if "drink_log" not in g:
+        retention = app.config["HISTORY_RETENTION_HOURS"] * 60 * 60
+        g.drink_log = DrinkLog(
+            session,
+            known_drinks=DRINKS,
+            archive=get_history_archive(),
+            max_history=app.config["HISTORY_MAX_ENTRIES"],
+            history_chunk_size=app.config["HISTORY_CHUNK_SIZE"],
+            history_retention=retention or None,
+        )
+    return g.drink_log
+
+
+def get_group_tab() -> GroupTab:
+    """Returns the group tab hosted by the current session."""
+    return GroupTab(
+        session,
+        max_participants=app.config["GROUP_MAX_PARTICIPANTS"],
+        max_rounds=app.config["GROUP_MAX_ROUNDS"],
+    )
+
+
+def mark_changed() -> None:
+    """Bumps the session version after its drinks, user or history changed."""
+    SessionVersion(session).bump()
+    session.modified = True
+
+
+def get_session_version() -> str:
+    """Returns the version of the session's drinks, user and history."""
+    version = SessionVersion(session)
+    if version.value is None:
+        if not session.get("user") and not get_drink_log().catalog:
+            # Every new session renders the same page
+            return "new"
+        # Sessions written before the version existed
+        mark_changed()
+    return version.value
+
+
+@lru_cache(maxsize=1024)
+def static_digest(filename: str) -> Optional[str]:
+    """Returns a hash of a static file's content, or None if it is missing.
+
+    Files are hashed once per process, so changed assets need a restart.
+    """
+    path = safe_join(app.static_folder, filename)
+    if path is None or not os.path.isfile(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+@lru_cache(maxsize=None)
+def build_digest() -> str:
+    """Returns a hash of the templates and static files of this build."""
+    digest = hashlib.sha256()
+    for folder in (app.template_folder, app.static_folder):
+        folder = os.path.join(app.root_path, folder)
+        for root, dirs, files in os.walk(folder):
+            dirs.sort()
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, folder).encode())
+                with open(path, "rb") as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+
+@app.url_defaults
+def add_static_digest(endpoint: str, values: Dict[str, Any]) -> None:
+    """Adds ?v=<content hash> to static URLs, see cache_static_files."""
+    if endpoint == "static" and "v" not in values:
+        digest = static_digest(values["filename"])
+        if digest:
+            values["v"] = digest
+
+
+@app.after_request
+def cache_static_files(response: Response) -> Response:
+    """Lets browsers keep static files for good if their URL has their hash.
+
+    A changed file gets a new URL, so cached copies never go stale. Other
+    static URLs keep the default revalidation by ETag and Last-Modified.
+    """
+    if (
+        request.endpoint == "static"
+        and response.status_code == 200
+        and request.args.get("v")
+        == static_digest(request.view_args["filename"])
+    ):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 365 * 24 * 60 * 60
+        response.cache_control.immutable = True
+    return response
+
+
+@app.template_global()
+def drink_image(drink: Drink) -> str:
+    """Returns the static filename of a drink's image, or the custom one."""
+    filename = f"images/{drink.name}.svg"
+    return filename if static_digest(filename) else "images/Custom.svg"
+
+
+def get_locale() -> str:
+    """Returns the configured locale that best matches Accept-Language."""
+    locales = app.config["LOCALES"]
+    if not has_request_context():
+        return locales[0]
+    return request.accept_languages.best_match(locales, default=locales[0])
+
+
+def format_timestamp(timestamp: float, locale: Optional[str] = None) -> str:
+    return get_formatter(locale or get_locale())(timestamp)
+
+
+@timed("get_combined_drinks")
 def get_combined_drinks() -> List[Drink]:
-    user_drinks = [Drink(**drink) for drink in session.get("user_drinks", [])]
-    custom_drinks = [Drink(**drink) for drink in session.get("custom_drinks", [])]
-    combined_drinks = user_drinks + custom_drinks
-    combined_drinks.sort(key=lambda x: x.volume_in_liters(), reverse=True)
-    return combined_drinks
+    # Already sorted by volume in liters in descending order
+    return get_drink_log().selected_drinks()
 
 
-# Routes
-@app.route("/")
-def index():
-    # Get combined selected drinks
-    selected_drinks = get_combined_drinks()
+@timed("calculate_result")
+def calculate_result(user: User, aggregate: DrinkAggregate) -> Dict:
+    """Returns the BAC and time to sober, memoized per profile and drinks."""
 
-    # Generate a summary of selected drinks
-    drink_summary = {
-        f"{drink}": selected_drinks.count(drink) for drink in selected_drinks
-    }
+    def compute() -> Dict:
+        bac = calculate_bac(
+            weight=user.weight,
+            gender=user.gender,
+            age=user.age,
+            total_alcohol=aggregate.total_grams,
+        )
+        time_to_sober = calculate_time_to_sober(
+            bac=bac, weight=user.weight, age=user.age
+        )
+        return {"bac": bac, "time_to_sober": time_to_sober}
+
+    profile = [user.weight, user.gender, user.age]
+    key = result_key(profile, aggregate.counts)
+    return result_cache.memoize(key, compute)
+
+
+def uncertainty_options(data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Returns the samples and seed of a requested uncertainty band, or None.
+
+    Raises ValueError or TypeError for an invalid number of samples or seed,
+    e.g. a negative one, which numpy would only reject during the
+    calculation. The samples are capped at UNCERTAINTY_MAX_SAMPLES.
+    """
+    requested = data.get("uncertainty", request.args.get("uncertainty"))
+    if str(requested).lower() not in ("1", "true", "on", "yes"):
+        return None
+    samples = int(data.get("samples") or app.config["UNCERTAINTY_SAMPLES"])
+    if samples < 1:
+        raise ValueError(f"Samples must be positive, got {samples}")
+    samples = min(samples, app.config["UNCERTAINTY_MAX_SAMPLES"])
+    seed = data.get("seed")
+    seed = None if seed in (None, "") else int(seed)
+    if seed is not None and seed < 0:
+        raise ValueError(f"Seed must not be negative, got {seed}")
+    return {"samples": max(100, samples), "seed": seed}
+
+
+@timed("calculate_uncertainty")
+def calculate_uncertainty(
+    user: User, aggregate: DrinkAggregate, samples: int, seed: Optional[int]
+) -> Dict:
+    """Returns p5, p50 and p95 of the BAC and time to sober of a profile."""
+    # Imports numpy, so it is only loaded once a band is requested
+    from engine.uncertainty import parse_distributions, simulate
+
+    return simulate(
+        aggregate.total_grams,
+        user.weight,
+        user.gender,
+        user.age,
+        samples=samples,
+        distributions=parse_distributions(
+            app.config["UNCERTAINTY_DISTRIBUTIONS"]
+        ),
+        seed=seed,
+    ).to_dict()
+
+
+def create_bac_curve(user: User) -> BacCurve:
+    reduction_factor = calculate_reduction_factor(user.gender, user.age)
+    bac_per_gram = ALCOHOL_ABSORPTION_RATE / (user.weight * reduction_factor)
+    return BacCurve(
+        bac_per_gram=bac_per_gram,
+        elimination_rate=calculate_adjusted_metabolism_rate(
+            user.age, user.weight
+        ),
+    )
+
+
+@timed("get_bac_curve")
+def get_bac_curve(user: User) -> BacCurve:
+    """Returns the session's BAC curve, rebuilding it only when stale.
+
+    The cached curve is reused while it was built for the same user profile
+    and covers every history entry; otherwise it is rebuilt from history.
+    """
+    history = get_drink_log().history()
+    profile = [user.weight, user.gender, user.age]
+    cached = session.get("curve")
+    if (
+        cached
+        and cached["profile"] == profile
+        and cached["state"]["drinks"] == len(history)
+    ):
+        return BacCurve.from_state(cached["state"])
+
+    curve = create_bac_curve(user)
+    for drink, timestamp in sorted(history, key=lambda entry: entry[1]):
+        curve.add_drink(timestamp, drink.alcohol_grams())
+    session["curve"] = {"profile": profile, "state": curve.to_state()}
+    return curve
+
+
+def extend_bac_curve(timestamp: float, drink: Drink) -> None:
+    """Appends a new drink to the cached BAC curve, if there is one."""
+    cached = session.get("curve")
+    if not cached:
+        return
+    curve = BacCurve.from_state(cached["state"])
+    try:
+        curve.add_drink(timestamp, drink.alcohol_grams())
+    except ValueError:
+        session.pop("curve", None)
+        return
+    cached["state"] = curve.to_state()
 
+
+def available_drinks(aggregate: DrinkAggregate) -> List[Drink]:
     # Combine selected drinks with predefined DRINKS
-    all_unique_drinks = set(selected_drinks).union(DRINKS)
+    all_unique_drinks = set(aggregate.drinks).union(DRINKS)
 
     # Sort the drinks by volume in liters in descending order
-    drinks = sorted(all_unique_drinks, key=lambda x: x.volume_in_liters(), reverse=True)
+    return sorted(
+        all_unique_drinks, key=lambda x: x.volume_in_liters(), reverse=True
+    )
 
-    # Create context for rendering the template
-    context = {
-        "drinks": drinks,
-        "drink_summary": drink_summary,
-        "selected_drinks": selected_drinks,
-        "user": session.get("user"),
-        "current_year": datetime.now().year,
+
+def add_to_session(drink: Drink) -> None:
+    """Selects a drink now and appends it to the history and BAC curve."""
+    timestamp = int(datetime.now().timestamp())
+    get_drink_log().add(drink, timestamp)
+    extend_bac_curve(timestamp, drink)
+    mark_changed()
+
+
+def remove_from_session(drink: Drink) -> bool:
+    """Deselects one instance of a drink, returning False if not selected."""
+    if not get_drink_log().remove(drink):
+        return False
+    session.pop("curve", None)
+    mark_changed()
+    return True
+
+
+def drink_to_dict(drink: Drink) -> Dict[str, Any]:
+    return {
+        "drink": str(drink),
+        "name": drink.name,
+        "volume": drink.volume,
+        "unit": drink.unit,
+        "alcohol": drink.alcohol,
+        "alcohol_grams": drink.alcohol_grams(),
+    }
+
+
+def session_state() -> Dict[str, Any]:
+    """Returns the selected drinks, their total and the BAC as JSON data.
+
+    The BAC is only included once the user profile has been entered.
+    """
+    aggregate = get_drink_log().aggregate()
+    result = None
+    if session.get("user") and aggregate.drinks:
+        try:
+            result = calculate_result(User(**session["user"]), aggregate)
+        except (TypeError, ValueError, ZeroDivisionError) as e:
+            logger.error(e)
+    return {
+        "drinks": [
+            dict(
+                drink_to_dict(drink),
+                count=aggregate.counts[str(drink)],
+                grams=aggregate.grams[str(drink)],
+            )
+            for drink in aggregate.drinks
+        ],
+        "count": aggregate.count,
+        "total_grams": aggregate.total_grams,
+        "result": result,
     }
 
-    # Render the template with the context
-    return render_template("index.html", **context)
 
+def wants_json() -> bool:
+    """Returns True for API routes and requests that prefer JSON over HTML."""
+    if request.path.startswith("/api/"):
+        return True
+    best = request.accept_mimetypes.best_match(
+        ["text/html", "application/json"]
+    )
+    return best == "application/json"
 
+
+def request_data() -> Dict[str, Any]:
+    """Returns the JSON object of the request, falling back to form data."""
+    data = request.get_json(silent=True)
+    return data if isinstance(data, dict) else request.form
+
+
+def drink_from_data(data: Dict[str, Any]) -> Optional[Drink]:
+    """Returns the drink named by data["drink"], or built from its fields.
+
+    Returns None for an unknown drink name and raises KeyError, TypeError
+    or ValueError for invalid fields.
+    """
+    if "drink" in data:
+        return DRINK_CATALOG.resolve(data["drink"], get_drink_log())
+    return Drink(
+        name=data["name"],
+        volume=float(data["volume"]),
+        unit=data.get("unit", "ml"),
+        alcohol=float(data["alcohol"]),
+    )
+
+
+def group_state() -> Dict[str, Any]:
+    """Returns the group tab, longest time to sober first, as JSON data."""
+    tab = get_group_tab()
+    return {
+        "participants": [p.to_dict() for p in tab.participants()],
+        "rounds": tab.rounds,
+    }
+
+
+def form_response(
+    message: str, location: str, status: int = 200
+) -> Union[Response, Tuple[Response, int]]:
+    """Redirects with a flashed message, or returns JSON if requested.
+
+    JSON responses carry the updated session state, or the message as an
+    error for statuses of 400 and above.
+    """
+    if wants_json():
+        if status >= 400:
+            return jsonify(error=message), status
+        return jsonify(message=message, **session_state()), status
+    flash(message)
+    return redirect(location)
+
+
+# Routes
+@app.route("/")
+def index():
+    # The page only changes with the session version, the templates and
+    # static files, and the year in the footer
+    version = get_session_version()
+    current_year = datetime.now().year
+    etag = hashlib.sha256(
+        f"{version}:{build_digest()}:{current_year}".encode()
+    ).hexdigest()[:32]
+    if request.if_none_match.contains(etag):
+        response = app.response_class(status=304)
+    else:
+        # Aggregate the selected drinks and summarize them
+        aggregate = get_drink_log().aggregate()
+        drink_summary = aggregate.summary()
+
+        def render_drink_grid() -> str:
+            return render_template(
+                "drink_grid.html",
+                drinks=available_drinks(aggregate),
+                drink_summary=drink_summary,
+            )
+
+        # Create context for rendering the template
+        context = {
+            "drink_grid": Markup(
+                fragment_cache.memoize(
+                    f"drink_grid:{version}:{build_digest()}",
+                    render_drink_grid,
+                )
+            ),
+            "drink_summary": drink_summary,
+            "user": session.get("user"),
+            "current_year": current_year,
+        }
+
+        # Render the template with the context
+        response = app.make_response(
+            render_template("index.html", **context)
+        )
+    response.set_etag(etag)
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add("Cookie")
+    return response
+
+
+@app.route("/api/v1/history")
 @app.route("/history")
 def history():
-    return render_template("history.html", drink_history=session.get("history", []))
+    before = request.args.get("before", type=int)
+    limit = request.args.get("limit", type=int)
+    limit = max(1, min(limit or app.config["HISTORY_PAGE_SIZE"], 500))
+    entries, cursor = get_drink_log().history_page(before, limit)
+    # Entries of the same minute share one Babel call
+    format_time = get_formatter(get_locale())
+    drink_history = [
+        {
+            "id": entry.entry_id,
+            "drink": str(drink),
+            "time": format_time(entry.timestamp),
+            "timestamp": entry.timestamp,
+        }
+        for entry, drink in entries
+    ]
+    if wants_json():
+        return jsonify(history=drink_history, next=cursor)
+    return render_template(
+        "history.html", drink_history=drink_history, next_cursor=cursor
+    )
 
 
+@app.route("/api/v1/history", methods=["DELETE"])
 @app.route("/history/reset")
 def reset_history():
-    session["history"] = []
-    session["user_drinks"] = []
-    session["custom_drinks"] = []
-    session.modified = True
-    flash("History reset.")
-    return redirect(url_for("history"))
+    get_drink_log().reset()
+    session.pop("curve", None)
+    mark_changed()
+    return form_response("History reset.", url_for("history"))
 
 
 @app.route("/history/remove", methods=["POST"])
 def remove_history_entry():
-    drink = request.form.get("drink")
-    time = request.form.get("time")
-    history = session.get("history", [])
-    session["history"] = [
-        entry for entry in history if entry["drink"] != drink or entry["time"] != time
-    ]
-    session.modified = True
-    flash("History entry removed.")
-    return redirect(url_for("history"))
+    entry_id = request.form.get("entry_id", type=int)
+    log = get_drink_log()
+    if entry_id is not None:
+        log.remove_history_entry(entry_id)
+    else:
+        # Forms rendered before entries had IDs
+        drink = request.form.get("drink")
+        time = request.form.get("time")
+        timestamp = request.form.get("timestamp", type=int)
+        format_time = get_formatter(get_locale())
+        for entry in log.history_entries():
+            if str(log.drink(entry.drink_id)) == drink and (
+                entry.timestamp == timestamp
+                or format_time(entry.timestamp) == time
+            ):
+                log.remove_history_entry(entry.entry_id)
+    session.pop("curve", None)
+    mark_changed()
+    return form_response("History entry removed.", url_for("history"))
+
+
+@app.route("/api/v1/history/export")
+def export_history():
+    """Streams the whole history, archived entries included, oldest first."""
+    fmt = request.args.get("format", "ndjson")
+    if fmt not in MEDIA_TYPES:
+        return jsonify(error="Format must be csv or ndjson."), 400
+    export = export_csv if fmt == "csv" else export_ndjson
+    return Response(
+        stream_with_context(export(get_drink_log().iter_history())),
+        mimetype=MEDIA_TYPES[fmt],
+        headers={
+            "Content-Disposition": f"attachment; filename=history.{fmt}"
+        },
+    )
+
+
+@app.route("/api/v1/history/import", methods=["POST"])
+def import_history_file():
+    """Appends the rows of an uploaded CSV or NDJSON file to the history.
+
+    The file is either the "file" field of a multipart upload or the raw
+    request body. The format is taken from ?format, the file extension or
+    the content type.
+    """
+    upload = request.files.get("file")
+    stream = upload.stream if upload else request.stream
+    filename = upload.filename if upload else ""
+    mimetype = upload.mimetype if upload else request.mimetype
+
+    fmt = request.args.get("format")
+    if fmt is None:
+        fmt = next(
+            (
+                name
+                for name, media_type in MEDIA_TYPES.items()
+                if (filename or "").endswith(f".{name}")
+                or mimetype == media_type
+            ),
+            None,
+        )
+    if fmt not in PARSERS:
+        return jsonify(error="Upload a csv or ndjson file."), 415
+
+    lines = io.TextIOWrapper(
+        stream, encoding="utf-8-sig", errors="replace", newline=""
+    )
+    result = import_history(
+        get_drink_log(),
+        PARSERS[fmt](lines),
+        chunk_size=app.config["HISTORY_CHUNK_SIZE"],
+    )
+    session.pop("curve", None)
+    mark_changed()
+    return jsonify(result.to_dict())
+
+
+@app.route("/api/v1/history/<int:entry_id>", methods=["DELETE"])
+def api_remove_history_entry(entry_id: int):
+    if not get_drink_log().remove_history_entry(entry_id):
+        return jsonify(error="History entry not found."), 404
+    session.pop("curve", None)
+    mark_changed()
+    return jsonify(message="History entry removed.")
 
 
 @app.route("/add_drink", methods=["POST"])
 def add_drink():
     drink = request.form.get("drink")
-    all_unique_drinks = set(get_combined_drinks() + DRINKS)
-
-    selected_drink = next((d for d in all_unique_drinks if str(d) == drink), None)
+    selected_drink = DRINK_CATALOG.resolve(drink, get_drink_log())
 
     if not selected_drink:
-        flash("Drink not found.")
-        return redirect(url_for("index"))
+        return form_response("Drink not found.", url_for("index"), 404)
 
-    user_drinks = session.setdefault("user_drinks", [])
-    user_drinks.append(selected_drink.__dict__)
-
-    log = {
-        "drink": str(selected_drink),
-        "time": format_datetime(datetime.now(), locale="de_DE"),
-        "timestamp": datetime.now().timestamp(),
-    }
-    history = session.get("history", [])
-    history.append(log)
-    session["history"] = history
-    session.modified = True
-    flash(f"{selected_drink.name} added.")
-    return redirect(url_for("index"))
+    add_to_session(selected_drink)
+    return form_response(f"{selected_drink.name} added.", url_for("index"))
 
 
 @app.route("/remove_drink", methods=["POST"])
 def remove_drink():
     drink = request.form.get("drink")
-    all_unique_drinks = set(get_combined_drinks() + DRINKS)
-    selected_drink = next((d for d in all_unique_drinks if str(d) == drink), None)
+    selected_drink = DRINK_CATALOG.resolve(drink, get_drink_log())
 
-    if not selected_drink:
-        flash("Drink not found.")
-        return redirect(url_for("index"))
-
-    user_drinks = session.get("user_drinks", [])
-    user_drinks.remove(selected_drink.__dict__)
+    if not selected_drink or not remove_from_session(selected_drink):
+        return form_response("Drink not found.", url_for("index"), 404)
 
-    history = session.get("history", [])
-    session["history"] = [
-        entry for entry in history if entry["drink"] != str(selected_drink)
-    ]
-    session.modified = True
-    flash(f"{selected_drink.name} removed.")
-    return redirect(url_for("index") + "#drinks")
+    return form_response(
+        f"{selected_drink.name} removed.", url_for("index") + "#drinks"
+    )
 
 
 @app.route("/add_custom_drink", methods=["POST"])
@@ -223,31 +851,66 @@ def add_custom_drink():
             volume=float(request.form["custom-drink-volume"]),
             unit=request.form.get("custom-drink-unit", "ml"),
         )
-        custom_drinks = session.setdefault("custom_drinks", [])
-        custom_drinks.append(custom_drink.__dict__)
+    except ValueError:
+        return form_response(
+            "Invalid input. Please enter numbers for volume and alcohol content.",
+            url_for("index"),
+            400,
+        )
+    add_to_session(custom_drink)
+    return form_response(
+        f"Custom drink {custom_drink.name} added.", url_for("index")
+    )
 
-        log = {
-            "drink": str(custom_drink),
-            "time": format_datetime(datetime.now(), locale="de_DE"),
-            "timestamp": datetime.now().timestamp(),
-        }
-        history = session.get("history", [])
-        history.append(log)
-        session["history"] = history
 
-        session.modified = True
-        flash(f"Custom drink {custom_drink.name} added.")
-    except ValueError:
-        flash("Invalid input. Please enter numbers for volume and alcohol content.")
-    return redirect(url_for("index"))
+@app.route("/api/v1/drinks")
+def api_drinks():
+    aggregate = get_drink_log().aggregate()
+    return jsonify(drinks=[drink_to_dict(d) for d in available_drinks(aggregate)])
+
+
+@app.route("/api/v1/session/drinks")
+def api_session_drinks():
+    return jsonify(session_state())
+
+
+@app.route("/api/v1/session/drinks", methods=["POST"])
+def api_add_session_drink():
+    """Adds a drink by its display string, or a custom drink by its fields."""
+    try:
+        drink = drink_from_data(request_data())
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify(error=f"Invalid drink: {e}"), 400
+    if not drink:
+        return jsonify(error="Drink not found."), 404
+    add_to_session(drink)
+    return jsonify(message=f"{drink.name} added.", **session_state()), 201
+
+
+@app.route("/api/v1/session/drinks", methods=["DELETE"])
+def api_remove_session_drink():
+    key = request_data().get("drink") or request.args.get("drink")
+    drink = DRINK_CATALOG.resolve(key, get_drink_log())
+    if not drink or not remove_from_session(drink):
+        return jsonify(error="Drink not found."), 404
+    return jsonify(message=f"{drink.name} removed.", **session_state())
+
+
+def result_error(message: str, status: int):
+    """Renders the result page with an error, or returns it as JSON."""
+    if wants_json():
+        return jsonify(error=message), status
+    return render_template("result.html", error=message, drinks=[])
 
 
+@app.route("/api/v1/calculate", methods=["POST"])
 @app.route("/calculate", methods=["POST"])
 def calculate():
+    data = request_data()
     try:
-        weight = float(request.form.get("weight", 70))
-        gender = request.form.get("gender", "male")
-        age = int(request.form.get("age", 20))
+        weight = float(data.get("weight", 70))
+        gender = data.get("gender", "male")
+        age = int(data.get("age", 20))
 
         user = User(
             name="User",
@@ -255,52 +918,229 @@ def calculate():
             gender=gender,
             age=age,
         )
-        session["user"] = user.__dict__
-        session.modified = True
-    except (ValueError, KeyError):
-        return render_template(
-            "result.html", error="Invalid input. Please check your details.", drinks=[]
-        )
+        if session.get("user") != user.__dict__:
+            session["user"] = user.__dict__
+            mark_changed()
+        uncertainty = uncertainty_options(data)
+    except (ValueError, KeyError, TypeError):
+        return result_error("Invalid input. Please check your details.", 400)
 
-    selected_drinks = get_combined_drinks()
+    aggregate = get_drink_log().aggregate()
 
-    if not selected_drinks:
-        return render_template("result.html", error="No drinks selected.", drinks=[])
+    if not aggregate.drinks:
+        return result_error("No drinks selected.", 422)
 
     try:
-        total_alcohol = calculate_total_alcohol_in_grams(selected_drinks)
-        bac = calculate_bac(
-            weight=user.weight,
-            gender=user.gender,
-            age=user.age,
-            total_alcohol=total_alcohol,
-        )
-        time_to_sober = calculate_time_to_sober(
-            bac=bac, weight=user.weight, age=user.age
-        )
+        result = calculate_result(user, aggregate)
+        curve = get_bac_curve(user)
+        time_below_limit = curve.time_below(LEGAL_LIMIT)
+        if uncertainty is not None:
+            uncertainty = calculate_uncertainty(user, aggregate, **uncertainty)
     except Exception as e:
         logger.error(e)
-        return render_template(
-            "result.html", error="Calculation error. Please try again.", drinks=[]
-        )
+        return result_error("Calculation error. Please try again.", 500)
 
-    drink_summary = {
-        str(drink): selected_drinks.count(drink) for drink in selected_drinks
+    context = {
+        "time": result["time_to_sober"],
+        "bac": result["bac"],
+        "drinks": aggregate.summary(),
+        "legal_limit": LEGAL_LIMIT,
+        "time_below_limit": (
+            None if time_below_limit is None else round(time_below_limit, 2)
+        ),
+        "uncertainty": uncertainty,
     }
+    if wants_json():
+        # The page fetches the curve from /api/curve instead
+        return jsonify({**context, "curve": curve.compact()})
+    return render_template("result.html", **context)
 
+
+@app.route("/api/v1/plan", methods=["POST"])
+@app.route("/plan", methods=["POST"])
+def plan():
+    """Returns how much more can be drunk and when the BAC is below target.
+
+    The profile is taken from the request, or from the session once it was
+    entered for a calculation.
+    """
+    data = request_data()
+    try:
+        if "weight" in data:
+            user = User(
+                name="User",
+                weight=float(data["weight"]),
+                gender=data.get("gender", "male"),
+                age=int(data.get("age", 20)),
+            )
+        else:
+            user = User(**session["user"])
+        target = data.get("target")
+        target = LEGAL_LIMIT if target is None else float(target)
+        hours = data.get("hours")
+        hours = 0.0 if hours is None else float(hours)
+        result = planner.plan(
+            get_drink_log().aggregate().total_grams,
+            user.weight,
+            user.gender,
+            user.age,
+            drinks=DRINKS,
+            target=target,
+            hours=hours,
+        )
+    except KeyError:
+        return result_error("No user profile. Please calculate first.", 422)
+    except (ValueError, TypeError):
+        return result_error("Invalid input. Please check your details.", 400)
+
+    now = int(datetime.now().timestamp())
+    below_at = now + round(result.hours_below * 3600)
+    if wants_json():
+        return jsonify(dict(result.to_dict(), below_at=below_at))
     return render_template(
-        "result.html", time=time_to_sober, bac=bac, drinks=drink_summary
+        "plan.html", plan=result, below_at=format_timestamp(below_at)
+    )
+
+
+@app.route("/api/curve")
+def api_curve():
+    """Returns the session's BAC curve downsampled to ?points points."""
+    points = request.args.get("points", type=int)
+    points = max(2, min(points or app.config["CURVE_POINTS"], 2000))
+    try:
+        user = User(**session["user"])
+    except (KeyError, TypeError, ValueError):
+        return jsonify(error="No user profile. Please calculate first."), 422
+
+    try:
+        curve = get_bac_curve(user)
+        time_below_limit = curve.time_below(LEGAL_LIMIT)
+    except Exception as e:
+        logger.error(e)
+        return jsonify(error="Calculation error. Please try again."), 500
+    if not curve.drinks:
+        return jsonify(error="No drinks in history."), 422
+
+    compact = curve.compact(points)
+    return jsonify(
+        points=compact,
+        hours=compact[-1][0],
+        peak=round(curve.peak(), 3),
+        legal_limit=LEGAL_LIMIT,
+        time_below_limit=(
+            None if time_below_limit is None else round(time_below_limit, 2)
+        ),
     )
 
 
+@app.route("/api/calculate/batch", methods=["POST"])
+def calculate_batch_api():
+    # Imports numpy, so workers only load it once a batch is requested
+    from engine.batch import calculate_batch
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error="Expected a JSON object."), 400
+
+    try:
+        weights = payload["weight"]
+        genders = payload["gender"]
+        ages = payload["age"]
+        drinks = payload.get("drinks", [[] for _ in weights])
+        if len(weights) > app.config["BATCH_MAX_PROFILES"]:
+            return jsonify(error="Too many profiles in batch."), 413
+        if len(drinks) != len(weights):
+            raise ValueError("Drinks column must have one entry per profile")
+
+        drink_grams, owners = resolve_batch_drinks(drinks)
+        result = calculate_batch(weights, genders, ages, drink_grams, owners)
+    except (KeyError, TypeError, ValueError, AttributeError) as e:
+        logger.error(e)
+        error = "Invalid batch input. Please check the columns."
+        return jsonify(error=error), 400
+
+    return jsonify(result.to_dict())
+
+
+@app.route("/api/v1/group")
+def api_group():
+    return jsonify(group_state())
+
+
+@app.route("/api/v1/group", methods=["DELETE"])
+def api_reset_group():
+    get_group_tab().reset()
+    session.modified = True
+    return jsonify(message="Group reset.", **group_state())
+
+
+@app.route("/api/v1/group/participants", methods=["POST"])
+def api_join_group():
+    data = request_data()
+    try:
+        user = User(
+            name=str(data.get("name", "User")),
+            weight=float(data.get("weight", 70)),
+            gender=data.get("gender", "male"),
+            age=int(data.get("age", 20)),
+        )
+        participant_id = get_group_tab().join(user)
+    except (TypeError, ValueError) as e:
+        return jsonify(error=f"Invalid participant: {e}"), 400
+    session.modified = True
+    return jsonify(id=participant_id, **group_state()), 201
+
+
+@app.route(
+    "/api/v1/group/participants/<int:participant_id>", methods=["DELETE"]
+)
+def api_leave_group(participant_id: int):
+    if not get_group_tab().leave(participant_id):
+        return jsonify(error="Participant not found."), 404
+    session.modified = True
+    return jsonify(message="Participant removed.", **group_state())
+
+
+@app.route("/api/v1/group/rounds", methods=["POST"])
+def api_add_round():
+    """Adds a drink to the listed participants, or to everyone."""
+    data = request_data()
+    try:
+        drink = drink_from_data(data)
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify(error=f"Invalid drink: {e}"), 400
+    if not drink:
+        return jsonify(error="Drink not found."), 404
+
+    if hasattr(data, "getlist") and "participants" in data:
+        participants = data.getlist("participants")
+    else:
+        participants = data.get("participants")
+    timestamp = int(datetime.now().timestamp())
+    try:
+        if participants is not None:
+            participants = [int(p) for p in participants]
+        members = get_group_tab().add_round(drink, timestamp, participants)
+    except KeyError:
+        return jsonify(error="Participant not found."), 404
+    except (TypeError, ValueError) as e:
+        return jsonify(error=f"Invalid round: {e}"), 400
+    session.modified = True
+    return jsonify(members=members, **group_state()), 201
+
+
 @app.route("/reset")
 def reset():
+    # The log deletes the archived history chunks the session refers to
+    get_drink_log().reset()
     session.clear()
-    session["user_drinks"] = []
-    session["custom_drinks"] = []
-    session["history"] = []
-    flash("Session reset.")
-    return redirect(url_for("index"))
+    mark_changed()
+    return form_response("Session reset.", url_for("index"))
+
+
+@app.route("/api/cache/stats")
+def cache_stats():
+    return jsonify(result_cache.stats.to_dict())
 
 
 @app.route("/health-check")
@@ -308,5 +1148,32 @@ def health_check():
     return "OK", 200
 
 
+def create_app(preload: bool = False) -> Flask:
+    """App factory for WSGI servers, e.g. gunicorn "main:create_app()".
+
+    Importing main builds the app with the subsystems every request needs,
+    but starts no thread and opens no store. The batch and group engines
+    import numpy on first use, and the history archive is created on first
+    use. The factory starts the log listener and the sweeper, and loads the
+    data of the configured locales up front, so the first request that
+    formats a timestamp does not pay for it.
+
+    With preload=True, for gunicorn --preload (see gunicorn.conf.py), the
+    optional engines are imported as well. The master process then holds
+    them once and the forked workers share those pages copy-on-write.
+    """
+    log_pipeline.install()
+    # Expire, cap and compact the session and cache files in the background
+    session_sweeper.init_app(
+        app, archive=get_history_archive(), known_drinks=DRINKS
+    )
+    for locale in app.config["LOCALES"]:
+        format_timestamp(0, locale)
+    if preload:
+        import engine.batch  # noqa: F401
+        import engine.uncertainty  # noqa: F401
+    return app
+
+
 if __name__ == "__main__":
-    app.run(host="0.0.0.0", port=5000)
+    create_app().run(host="0.0.0.0", port=5000)
@@ -0,0 +1,61 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List
+
+from models.drink import FrozenDrink
+
+
+def centigrams(drink: FrozenDrink) -> int:
+    """Returns the alcohol of a drink in hundredths of a gram.
+
+    alcohol_grams() is rounded to two decimals, so totals kept in
+    centigrams are exact integers and never drift as drinks come and go.
+    """
+    return round(drink.alcohol_grams() * 100)
+
+
+@dataclass
+class DrinkAggregate:
+    drinks: List[FrozenDrink] = field(default_factory=list)  # Sorted by volume, descending
+    counts: Dict[str, int] = field(default_factory=dict)  # Count per drink key
+    grams: Dict[str, float] = field(default_factory=dict)  # Alcohol grams per drink key
+    total_centigrams: int = 0  # Total alcohol in hundredths of a gram
+
+    @property
+    def total_grams(self) -> float:
+        """Returns the total alcohol in grams."""
+        return self.total_centigrams / 100
+
+    @property
+    def count(self) -> int:
+        """Returns the number of drinks."""
+        return sum(self.counts.values())
+
+    def summary(self) -> Dict[str, int]:
+        """Returns the count per drink string, largest volume first."""
+        return {str(drink): self.counts[str(drink)] for drink in self.drinks}
+
+    def add(self, drink: FrozenDrink, count: int = 1) -> None:
+        """Adds count instances of a drink, keeping the volume order."""
+        key = str(drink)
+        if key not in self.counts:
+            self.counts[key] = 0
+            self.grams[key] = 0.0
+            position = len(self.drinks)
+            while (
+                position
+                and self.drinks[position - 1].volume_in_liters()
+                < drink.volume_in_liters()
+            ):
+                position -= 1
+            self.drinks.insert(position, drink)
+        self.counts[key] += count
+        self.total_centigrams += centigrams(drink) * count
+        self.grams[key] = self.counts[key] * centigrams(drink) / 100
+
+
+def aggregate_drinks(drinks: Iterable[FrozenDrink]) -> DrinkAggregate:
+    """Computes counts, grams, total and volume order in one pass."""
+    aggregate = DrinkAggregate()
+    for drink in drinks:
+        aggregate.add(drink)
+    return aggregate
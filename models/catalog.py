@@ -0,0 +1,41 @@
+from typing import Dict, Iterable, Iterator, Optional
+
+from models.drink import FrozenDrink
+from models.drink_log import DrinkLog
+
+
+class DrinkCatalog:
+    """Resolves submitted drink keys to drinks without scanning any list.
+
+    The canonical key of a drink is its display string, which is what the
+    forms submit. Predefined drinks are indexed once when the catalog is
+    built; drinks only known to a session are resolved through the index
+    the session's DrinkLog maintains as drinks are interned.
+    """
+
+    def __init__(self, drinks: Iterable[FrozenDrink]) -> None:
+        self._drinks: Dict[str, FrozenDrink] = {str(drink): drink for drink in drinks}
+
+    def get(self, key: str) -> Optional[FrozenDrink]:
+        """Returns the predefined drink with the given key."""
+        return self._drinks.get(key)
+
+    def resolve(
+        self, key: str, log: Optional[DrinkLog] = None
+    ) -> Optional[FrozenDrink]:
+        """Returns the predefined or session drink with the given key."""
+        drink = self._drinks.get(key)
+        if drink is None and log is not None:
+            drink_id = log.lookup(key)
+            if drink_id is not None:
+                drink = log.drink(drink_id)
+        return drink
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._drinks
+
+    def __iter__(self) -> Iterator[FrozenDrink]:
+        return iter(self._drinks.values())
+
+    def __len__(self) -> int:
+        return len(self._drinks)
@@ -1,5 +1,5 @@
 from dataclasses import dataclass, field
-from typing import List
+from typing import List, Optional, Tuple
 
 # Constants for validation
 MIN_ALCOHOL: float = 0.0
@@ -50,7 +50,7 @@ class Drink:
             )
 
         # Ensure the name starts with an uppercase letter
-        if not self.name[0].isupper():
+        if not self.name or not self.name[0].isupper():
             raise ValueError("Drink name must start with an uppercase letter")
 
     def volume_in_liters(self) -> float:
@@ -100,4 +100,111 @@ class Drink:
         )
 
     def __hash__(self):
-        return hash((self.name, self.volume, self.alcohol))
+        return hash((self.name.lower(), self.volume, self.alcohol))
+
+
+@dataclass(frozen=True, eq=False, slots=True)
+class FrozenDrink:
+    """Immutable drink with the derived quantities computed once.
+
+    Behaves like Drink, but normalizes the unit at construction instead of
+    inside volume_in_liters(). The volume in liters is cached at
+    construction; the alcohol grams and the display string, which is the
+    canonical key, are cached on first use.
+    """
+
+    name: str  # Name of the drink
+    volume: float = field(default=0.5)  # Volume of the drink, default 0.5
+    unit: str = field(default=VALID_UNITS[0])  # Unit of volume, default is "L"
+    alcohol: float = field(default=MIN_ALCOHOL)  # Alcohol percentage, default is 0.0
+    _liters: float = field(init=False, repr=False)
+    _grams: Optional[float] = field(init=False, repr=False)
+    _key: Optional[str] = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        """Validates the drink, normalizes its unit and caches derived values."""
+        if self.unit not in VALID_UNITS:
+            raise ValueError(f"Unit must be one of {VALID_UNITS}, got '{self.unit}'")
+
+        if not (MIN_ALCOHOL <= self.alcohol <= MAX_ALCOHOL):
+            raise ValueError(
+                f"Alcohol percentage must be between {MIN_ALCOHOL} and {MAX_ALCOHOL}, got {self.alcohol}"
+            )
+
+        liters = calculate_volume_in_liters(self.volume, self.unit)
+        if not (MIN_VOLUME <= liters <= MAX_VOLUME):
+            raise ValueError(
+                f"Volume must be between {MIN_VOLUME} and {MAX_VOLUME} liters, got {liters}"
+            )
+
+        if not self.name or not self.name[0].isupper():
+            raise ValueError("Drink name must start with an uppercase letter")
+
+        # Same normalization Drink applies on its first volume_in_liters() call
+        if self.unit == "ml" and liters > 1.0:
+            object.__setattr__(self, "volume", round(self.volume / 1000, 2))
+            object.__setattr__(self, "unit", "L")
+            liters = calculate_volume_in_liters(self.volume, self.unit)
+        elif self.unit == "cl" and liters > 1.0:
+            object.__setattr__(self, "volume", round(self.volume / 100, 2))
+            object.__setattr__(self, "unit", "L")
+            liters = calculate_volume_in_liters(self.volume, self.unit)
+
+        object.__setattr__(self, "_liters", liters)
+        object.__setattr__(self, "_grams", None)
+        object.__setattr__(self, "_key", None)
+
+    @property
+    def key(self) -> str:
+        """Returns the canonical key, which is the display string."""
+        key = self._key
+        if key is None:
+            key = f"{self.name} ({self.volume} {self.unit}, {self.alcohol}%)"
+            object.__setattr__(self, "_key", key)
+        return key
+
+    def volume_in_liters(self) -> float:
+        """Returns the cached volume of the drink in liters."""
+        return self._liters
+
+    def alcohol_content(self) -> float:
+        """Calculates the alcohol content in liters."""
+        return round(self._liters * (self.alcohol / 100), 2)
+
+    def alcohol_grams(self) -> float:
+        """Calculates the alcohol content in grams, cached after the first call."""
+        grams = self._grams
+        if grams is None:
+            grams = round(
+                self._liters * 1000 * (self.alcohol / 100) * ETHANOL_DENSITY, 2
+            )
+            object.__setattr__(self, "_grams", grams)
+        return grams
+
+    def _identity(self) -> Tuple[str, str, float, float]:
+        return (self.name.lower(), self.unit.lower(), self.alcohol, self.volume)
+
+    def __str__(self) -> str:
+        """Provides a user-friendly string representation of the drink."""
+        return self.key
+
+    def __repr__(self) -> str:
+        """Provides a developer-friendly string representation of the drink."""
+        return self.key
+
+    def __eq__(self, other: object) -> bool:
+        """Compares drinks case-insensitively by name and unit, like Drink."""
+        if isinstance(other, FrozenDrink):
+            return self._identity() == other._identity()
+        if isinstance(other, Drink):
+            return self._identity() == (
+                other.name.lower(),
+                other.unit.lower(),
+                other.alcohol,
+                other.volume,
+            )
+        return NotImplemented
+
+    def __hash__(self) -> int:
+        # The key of Drink.__hash__, so that equal drinks of both types hash equal
+        return hash((self.name.lower(), self.volume, self.alcohol))
@@ -0,0 +1,270 @@
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from models.aggregate import DrinkAggregate, centigrams
+from models.drink import FrozenDrink
+from models.history import DrinkHistory, HistoryEntry
+
+# Session keys of the compact drink log
+CATALOG_KEY: str = "drink_catalog"  # Interned drinks as [name, volume, unit, alcohol]
+INDEX_KEY: str = "drink_index"  # Catalog ID of each interned drink by display string
+COUNTS_KEY: str = "selected_counts"  # Selected instances per catalog ID
+ORDER_KEY: str = "catalog_order"  # Catalog IDs by volume, largest first
+TOTAL_KEY: str = "selected_centigrams"  # Alcohol of the selected drinks
+
+# Session keys of the previous format, holding Drink.__dict__ and log dicts
+LEGACY_KEYS: List[str] = ["user_drinks", "custom_drinks", "history"]
+# Catalog IDs of the selected drinks, before they were aggregated into counts
+SELECTED_KEY: str = "selected"
+
+
+def drink_fields(drink: FrozenDrink) -> list:
+    """Returns the compact catalog entry of a drink."""
+    return [drink.name, drink.volume, drink.unit, drink.alcohol]
+
+
+class DrinkLog:
+    """Compact, append-only record of the drinks in a session.
+
+    Drinks are interned once into a catalog and referenced by their index.
+    The history (see DrinkHistory) stores catalog IDs and epoch seconds, so
+    appending a drink adds a few small integers to the session instead of
+    two dicts.
+
+    The selected drinks are kept aggregated: a count per catalog ID, the
+    catalog IDs ordered by volume and the total alcohol. These are updated
+    as drinks are added or removed, so rendering and calculating never walk
+    the individual drinks.
+    """
+
+    def __init__(
+        self,
+        store: MutableMapping,
+        known_drinks: Iterable[FrozenDrink] = (),
+        archive: Any = None,
+        max_history: Optional[int] = None,
+        history_chunk_size: int = 100,
+        history_retention: Optional[int] = None,
+    ) -> None:
+        self.store = store
+        self._drinks: Dict[int, FrozenDrink] = {}
+        self.entries = DrinkHistory(
+            store,
+            archive=archive,
+            max_entries=max_history,
+            chunk_size=history_chunk_size,
+            retention=history_retention,
+        )
+        if any(key in store for key in LEGACY_KEYS):
+            migrate_session(store, known_drinks)
+        if CATALOG_KEY in store and COUNTS_KEY not in store:
+            self._aggregate_selected(store.pop(SELECTED_KEY, []))
+
+    # Reading never adds keys to the store, so requests that only read the
+    # log leave a new session unmodified; the keys are created on mutation
+
+    @property
+    def catalog(self) -> Sequence[list]:
+        return self.store.get(CATALOG_KEY, ())
+
+    @property
+    def index(self) -> Mapping[str, int]:
+        index = self.store.get(INDEX_KEY)
+        if index is None:
+            if not self.catalog:
+                return {}
+            # Sessions written before the index existed
+            index = {
+                str(FrozenDrink(*fields)): drink_id
+                for drink_id, fields in enumerate(self.catalog)
+            }
+            self.store[INDEX_KEY] = index
+        return index
+
+    @property
+    def counts(self) -> Sequence[int]:
+        return self.store.get(COUNTS_KEY, ())
+
+    @property
+    def order(self) -> Sequence[int]:
+        return self.store.get(ORDER_KEY, ())
+
+    def _list(self, key: str) -> list:
+        """Returns a list of the store to change, creating it if missing."""
+        return self.store.setdefault(key, [])
+
+    def lookup(self, key: str) -> Optional[int]:
+        """Returns the catalog ID for a drink's display string."""
+        return self.index.get(key)
+
+    def find(self, drink: FrozenDrink) -> Optional[int]:
+        """Returns the catalog ID of a drink, or None if it is not interned."""
+        return self.lookup(str(drink))
+
+    def intern(self, drink: FrozenDrink) -> int:
+        """Returns the catalog ID of a drink, adding it to the catalog if needed."""
+        drink_id = self.find(drink)
+        if drink_id is None:
+            drink_id = len(self.catalog)
+            self.store.setdefault(INDEX_KEY, {})[str(drink)] = drink_id
+            self._list(CATALOG_KEY).append(drink_fields(drink))
+            self._list(COUNTS_KEY).append(0)
+            self._drinks[drink_id] = drink
+
+            order = self._list(ORDER_KEY)
+            position = len(order)
+            while (
+                position
+                and self.drink(order[position - 1]).volume_in_liters()
+                < drink.volume_in_liters()
+            ):
+                position -= 1
+            order.insert(position, drink_id)
+        return drink_id
+
+    def drink(self, drink_id: int) -> FrozenDrink:
+        """Returns the drink for a catalog ID."""
+        if drink_id not in self._drinks:
+            self._drinks[drink_id] = FrozenDrink(*self.catalog[drink_id])
+        return self._drinks[drink_id]
+
+    def select(self, drink: FrozenDrink, count: int = 1) -> int:
+        """Adds instances of a drink to the selection without logging them."""
+        drink_id = self.intern(drink)
+        self.store[COUNTS_KEY][drink_id] += count
+        self.store[TOTAL_KEY] = self.total_centigrams + centigrams(drink) * count
+        return drink_id
+
+    def add(self, drink: FrozenDrink, timestamp: float) -> int:
+        """Selects a drink and appends it to the history."""
+        drink_id = self.select(drink)
+        self.entries.append(drink_id, int(timestamp))
+        return drink_id
+
+    def extend_history(self, entries: Iterable[Tuple[FrozenDrink, int]]) -> None:
+        """Appends (drink, epoch seconds) entries to the history at once.
+
+        Unlike add, the drinks are only interned, not selected.
+        """
+        drink_ids, timestamps = [], []
+        for drink, timestamp in entries:
+            drink_ids.append(self.intern(drink))
+            timestamps.append(int(timestamp))
+        self.entries.extend(drink_ids, timestamps)
+
+    def remove(self, drink: FrozenDrink) -> bool:
+        """Deselects one instance of a drink and drops it from the history."""
+        drink_id = self.find(drink)
+        if drink_id is None or not self.counts[drink_id]:
+            return False
+        self.store[COUNTS_KEY][drink_id] -= 1
+        self.store[TOTAL_KEY] = self.total_centigrams - centigrams(drink)
+        self.entries.remove_drink(drink_id)
+        return True
+
+    def remove_history_entry(self, entry_id: int) -> bool:
+        """Drops a single history entry by its ID."""
+        return self.entries.remove(entry_id)
+
+    @property
+    def total_centigrams(self) -> int:
+        return self.store.get(TOTAL_KEY, 0)
+
+    def aggregate(self) -> DrinkAggregate:
+        """Returns the aggregated selection, reading one entry per drink type."""
+        aggregate = DrinkAggregate(total_centigrams=self.total_centigrams)
+        counts = self.counts
+        for drink_id in self.order:
+            if counts[drink_id]:
+                drink = self.drink(drink_id)
+                key = str(drink)
+                aggregate.drinks.append(drink)
+                aggregate.counts[key] = counts[drink_id]
+                aggregate.grams[key] = counts[drink_id] * centigrams(drink) / 100
+        return aggregate
+
+    def selected_drinks(self) -> List[FrozenDrink]:
+        """Returns every selected drink instance, largest volume first."""
+        return [
+            self.drink(drink_id)
+            for drink_id in self.order
+            for _ in range(self.counts[drink_id])
+        ]
+
+    def history(self) -> List[Tuple[FrozenDrink, int]]:
+        """Returns the recent history as (drink, epoch seconds), oldest first.
+
+        Archived entries are not included; see history_page.
+        """
+        return [
+            (self.drink(entry.drink_id), entry.timestamp)
+            for entry in self.entries.entries()
+        ]
+
+    def history_entries(self) -> List[HistoryEntry]:
+        """Returns the recent history entries, oldest first."""
+        return self.entries.entries()
+
+    def iter_history(self) -> Iterator[Tuple[HistoryEntry, FrozenDrink]]:
+        """Yields every history entry with its drink, oldest first."""
+        for entry in self.entries.iter_entries():
+            yield entry, self.drink(entry.drink_id)
+
+    def history_page(
+        self, before: Optional[int] = None, limit: int = 50
+    ) -> Tuple[List[Tuple[HistoryEntry, FrozenDrink]], Optional[int]]:
+        """Returns a page of history entries with their drinks, newest first."""
+        entries, cursor = self.entries.page(before, limit)
+        return [(entry, self.drink(entry.drink_id)) for entry in entries], cursor
+
+    def reset(self) -> None:
+        """Clears the selected drinks and the history."""
+        for key in (CATALOG_KEY, COUNTS_KEY, ORDER_KEY):
+            self.store[key] = []
+        self.entries.clear()
+        self.store[INDEX_KEY] = {}
+        self.store[TOTAL_KEY] = 0
+        self._drinks.clear()
+
+    def _aggregate_selected(self, selected: List[int]) -> None:
+        """Builds the counts, order and total from a list of selected IDs."""
+        catalog = self.store.pop(CATALOG_KEY, [])
+        for key in (INDEX_KEY, COUNTS_KEY, ORDER_KEY, TOTAL_KEY):
+            self.store.pop(key, None)
+        self._drinks.clear()
+        for fields in catalog:
+            self.intern(FrozenDrink(*fields))
+        for drink_id in selected:
+            self.select(self.drink(drink_id))
+
+
+def migrate_session(store: MutableMapping, known_drinks: Iterable[FrozenDrink]) -> None:
+    """Converts a session from the dict-list format to the compact drink log.
+
+    History entries refer to drinks by their display string. They are
+    resolved against the session's own drinks first and then known_drinks;
+    entries that cannot be resolved are dropped.
+    """
+    log = DrinkLog({})
+    drinks_by_name = {str(drink): drink for drink in known_drinks}
+    for fields in store.pop("user_drinks", []) + store.pop("custom_drinks", []):
+        drink = FrozenDrink(**fields)
+        drinks_by_name[str(drink)] = drink
+        log.select(drink)
+
+    for entry in store.pop("history", []):
+        drink = drinks_by_name.get(entry.get("drink"))
+        if drink is not None and "timestamp" in entry:
+            log.entries.append(log.intern(drink), int(entry["timestamp"]))
+
+    store.update(log.store)
@@ -0,0 +1,254 @@
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, MutableMapping, Optional, Sequence
+
+from models.aggregate import centigrams
+from models.drink import FrozenDrink
+from models.drink_log import drink_fields
+from models.user import User
+
+# Session keys of the group tab, one column per participant attribute
+NAMES_KEY: str = "group_names"
+WEIGHTS_KEY: str = "group_weights"
+GENDERS_KEY: str = "group_genders"
+AGES_KEY: str = "group_ages"
+ACTIVE_KEY: str = "group_active"  # False once a participant left the table
+DRINK_COUNTS_KEY: str = "group_drink_counts"  # Drinks per participant
+TOTALS_KEY: str = "group_centigrams"  # Alcohol per participant
+BAC_KEY: str = "group_bac"
+SOBER_KEY: str = "group_time_to_sober"
+
+# Session keys of the rounds, one column per round attribute
+CATALOG_KEY: str = "group_catalog"  # Interned drinks as [name, volume, unit, alcohol]
+ROUND_DRINKS_KEY: str = "group_round_drinks"  # Catalog ID of each round
+ROUND_TS_KEY: str = "group_round_ts"  # Epoch seconds of each round
+ROUND_MEMBERS_KEY: str = "group_round_members"  # Participant IDs of each round
+
+PARTICIPANT_KEYS: List[str] = [
+    NAMES_KEY,
+    WEIGHTS_KEY,
+    GENDERS_KEY,
+    AGES_KEY,
+    ACTIVE_KEY,
+    DRINK_COUNTS_KEY,
+    TOTALS_KEY,
+    BAC_KEY,
+    SOBER_KEY,
+]
+ROUND_KEYS: List[str] = [CATALOG_KEY, ROUND_DRINKS_KEY, ROUND_TS_KEY, ROUND_MEMBERS_KEY]
+
+
+@dataclass
+class Participant:
+    participant_id: int  # Position in the participant columns
+    name: str
+    weight: float
+    gender: str
+    age: int
+    drinks: int  # Number of drinks so far
+    total_grams: float
+    bac: float
+    time_to_sober: float
+
+    def to_dict(self) -> Dict:
+        return {
+            "id": self.participant_id,
+            "name": self.name,
+            "weight": self.weight,
+            "gender": self.gender,
+            "age": self.age,
+            "drinks": self.drinks,
+            "total_grams": self.total_grams,
+            "bac": self.bac,
+            "time_to_sober": self.time_to_sober,
+        }
+
+
+class GroupTab:
+    """Participants of a table and the rounds of drinks they had.
+
+    One host session tracks every participant. Their attributes, drink
+    counts, total alcohol and results are kept as parallel columns indexed
+    by participant ID, so a round only touches the columns of its members.
+
+    Adding a round adds the drink's alcohol to the total of every member
+    and recalculates their BAC and time to sober in a single call of the
+    batch engine. Participants who did not drink keep their results.
+
+    A participant who leaves keeps their slot, so that the rounds they had
+    still refer to them. max_participants bounds the slots, not only the
+    participants at the table, and max_rounds bounds the rounds.
+    """
+
+    def __init__(
+        self,
+        store: MutableMapping,
+        max_participants: int = 300,
+        max_rounds: int = 1000,
+    ) -> None:
+        self.store = store
+        self.max_participants = max_participants
+        self.max_rounds = max_rounds
+
+    def column(self, key: str) -> Sequence:
+        # Reading never adds keys, so reading the tab leaves a new session unmodified
+        return self.store.get(key, ())
+
+    def _mutable_column(self, key: str) -> list:
+        return self.store.setdefault(key, [])
+
+    @property
+    def active(self) -> Sequence[bool]:
+        return self.column(ACTIVE_KEY)
+
+    def __len__(self) -> int:
+        """Returns the number of participants still at the table."""
+        return sum(self.active)
+
+    def __contains__(self, participant_id: int) -> bool:
+        return 0 <= participant_id < len(self.active) and self.active[participant_id]
+
+    def join(self, user: User) -> int:
+        """Adds a participant and returns their ID.
+
+        Raises ValueError if every slot is taken, by participants at the
+        table or ones who left, or the batch engine rejects the profile,
+        e.g. for a weight of zero.
+        """
+        if len(self.active) >= self.max_participants:
+            raise ValueError(
+                f"A group holds at most {self.max_participants} participants,"
+                " including those who left"
+            )
+        # The batch engine imports numpy, so it is only loaded once a group is used
+        from engine.batch import calculate_batch
+
+        # Validates the profile before it is stored
+        calculate_batch([user.weight], [user.gender], [user.age], [], [])
+
+        participant_id = len(self.active)
+        values = {
+            NAMES_KEY: user.name,
+            WEIGHTS_KEY: user.weight,
+            GENDERS_KEY: user.gender,
+            AGES_KEY: user.age,
+            ACTIVE_KEY: True,
+            DRINK_COUNTS_KEY: 0,
+            TOTALS_KEY: 0,
+            BAC_KEY: 0.0,
+            SOBER_KEY: 0.0,
+        }
+        for key, value in values.items():
+            self._mutable_column(key).append(value)
+        return participant_id
+
+    def leave(self, participant_id: int) -> bool:
+        """Removes a participant from the table, keeping their rounds."""
+        if participant_id not in self:
+            return False
+        self.store[ACTIVE_KEY][participant_id] = False
+        return True
+
+    def add_round(
+        self,
+        drink: FrozenDrink,
+        timestamp: int,
+        participant_ids: Optional[Iterable[int]] = None,
+    ) -> List[int]:
+        """Adds a drink to each given participant, by default everyone.
+
+        Returns the IDs of the members, whose results are recalculated
+        together. Raises KeyError for an unknown participant ID and
+        ValueError once the tab holds max_rounds rounds.
+        """
+        if participant_ids is None:
+            members = [i for i, active in enumerate(self.active) if active]
+        else:
+            members = sorted(set(participant_ids))
+            for participant_id in members:
+                if participant_id not in self:
+                    raise KeyError(f"Participant not found: {participant_id}")
+        if not members:
+            return members
+        if self.rounds >= self.max_rounds:
+            raise ValueError(f"A group holds at most {self.max_rounds} rounds")
+
+        self._mutable_column(ROUND_DRINKS_KEY).append(self.intern(drink))
+        self._mutable_column(ROUND_TS_KEY).append(int(timestamp))
+        self._mutable_column(ROUND_MEMBERS_KEY).append(members)
+
+        counts, totals = self.store[DRINK_COUNTS_KEY], self.store[TOTALS_KEY]
+        grams = centigrams(drink)
+        for participant_id in members:
+            counts[participant_id] += 1
+            totals[participant_id] += grams
+        self._update_results(members)
+        return members
+
+    def intern(self, drink: FrozenDrink) -> int:
+        """Returns the catalog ID of a drink, adding it if needed."""
+        catalog = self._mutable_column(CATALOG_KEY)
+        fields = drink_fields(drink)
+        try:
+            return catalog.index(fields)
+        except ValueError:
+            catalog.append(fields)
+            return len(catalog) - 1
+
+    @property
+    def rounds(self) -> int:
+        return len(self.column(ROUND_DRINKS_KEY))
+
+    def participants(self) -> List[Participant]:
+        """Returns the participants at the table, longest time to sober first."""
+        columns = [self.column(key) for key in PARTICIPANT_KEYS]
+        participants = [
+            Participant(
+                participant_id=participant_id,
+                name=name,
+                weight=weight,
+                gender=gender,
+                age=age,
+                drinks=drinks,
+                total_grams=total / 100,
+                bac=bac,
+                time_to_sober=time_to_sober,
+            )
+            for participant_id, (
+                name,
+                weight,
+                gender,
+                age,
+                active,
+                drinks,
+                total,
+                bac,
+                time_to_sober,
+            ) in enumerate(zip(*columns))
+            if active
+        ]
+        participants.sort(key=lambda p: (-p.time_to_sober, p.participant_id))
+        return participants
+
+    def reset(self) -> None:
+        """Removes every participant and round."""
+        for key in PARTICIPANT_KEYS + ROUND_KEYS:
+            self.store[key] = []
+
+    def _update_results(self, members: List[int]) -> None:
+        from engine.batch import calculate_batch
+
+        weights, genders = self.column(WEIGHTS_KEY), self.column(GENDERS_KEY)
+        ages, totals = self.column(AGES_KEY), self.column(TOTALS_KEY)
+        result = calculate_batch(
+            weights=[weights[i] for i in members],
+            genders=[genders[i] for i in members],
+            ages=[ages[i] for i in members],
+            drink_grams=[totals[i] / 100 for i in members],
+            owners=range(len(members)),
+        )
+        bac, sober = self.store[BAC_KEY], self.store[SOBER_KEY]
+        for participant_id, value, hours in zip(
+            members, result.bac.tolist(), result.time_to_sober.tolist()
+        ):
+            bac[participant_id] = value
+            sober[participant_id] = hours
@@ -0,0 +1,287 @@
+import secrets
+from bisect import bisect_left, bisect_right
+from dataclasses import dataclass
+from typing import (
+    Any,
+    Dict,
+    Iterator,
+    List,
+    Mapping,
+    MutableMapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+# Session keys of the drink history
+HISTORY_IDS_KEY: str = "history_ids"  # Catalog ID of each recent entry
+HISTORY_TS_KEY: str = "history_ts"  # Epoch seconds of each recent entry
+HISTORY_START_KEY: str = "history_start"  # Entry ID of the first recent entry
+HISTORY_CHUNKS_KEY: str = "history_chunks"  # Archived chunks as [first ID, last ID, last ts]
+HISTORY_PURGED_KEY: str = "history_purged"  # Entry IDs below which a drink is hidden
+HISTORY_ARCHIVE_KEY: str = "history_archive_id"  # Prefix of the archived chunks
+
+REMOVED: int = -1  # Catalog ID of a removed entry
+
+
+@dataclass(frozen=True)
+class HistoryEntry:
+    entry_id: int  # Position of the entry in the whole history
+    drink_id: int  # Catalog ID of the drink
+    timestamp: int  # Epoch seconds
+
+
+class DrinkHistory:
+    """Drink history with a bounded recent part in the session.
+
+    Every entry gets a sequential ID. The most recent max_entries entries
+    stay in the session as two parallel lists, so the entry with a given ID
+    is found by subtracting the ID of the first one. Removing an entry marks
+    it as REMOVED in O(1) instead of rebuilding the lists.
+
+    Once the session holds more than max_entries, the oldest chunk_size
+    entries are moved to the archive, a cachelib cache, and only loaded when
+    a history page reaches them. Without an archive they are dropped.
+    Entries older than retention seconds are dropped from both.
+    """
+
+    def __init__(
+        self,
+        store: MutableMapping,
+        archive: Any = None,
+        max_entries: Optional[int] = None,
+        chunk_size: int = 100,
+        retention: Optional[int] = None,
+    ) -> None:
+        self.store = store
+        self.archive = archive
+        self.max_entries = max_entries
+        self.chunk_size = chunk_size
+        self.retention = retention
+
+    # Reading never adds keys to the store, so requests that only read the
+    # history leave a new session unmodified; the keys are created on mutation
+
+    @property
+    def drink_ids(self) -> Sequence[int]:
+        return self.store.get(HISTORY_IDS_KEY, ())
+
+    @property
+    def timestamps(self) -> Sequence[int]:
+        return self.store.get(HISTORY_TS_KEY, ())
+
+    @property
+    def start(self) -> int:
+        return self.store.get(HISTORY_START_KEY, 0)
+
+    @property
+    def chunks(self) -> Sequence[list]:
+        return self.store.get(HISTORY_CHUNKS_KEY, ())
+
+    @property
+    def purged(self) -> Mapping[str, int]:
+        return self.store.get(HISTORY_PURGED_KEY, {})
+
+    @property
+    def next_id(self) -> int:
+        return self.start + len(self.drink_ids)
+
+    def append(self, drink_id: int, timestamp: int) -> int:
+        """Appends an entry and returns its ID."""
+        entry_id = self.next_id
+        self.store.setdefault(HISTORY_IDS_KEY, []).append(drink_id)
+        self.store.setdefault(HISTORY_TS_KEY, []).append(timestamp)
+        self._trim(timestamp)
+        return entry_id
+
+    def extend(self, drink_ids: Sequence[int], timestamps: Sequence[int]) -> None:
+        """Appends a chunk of entries, trimming the session once afterwards."""
+        if not drink_ids:
+            return
+        self.store.setdefault(HISTORY_IDS_KEY, []).extend(drink_ids)
+        self.store.setdefault(HISTORY_TS_KEY, []).extend(timestamps)
+        self._trim(max(timestamps))
+
+    def remove(self, entry_id: int) -> bool:
+        """Removes a single entry, returning False if it does not exist."""
+        if self.start <= entry_id < self.next_id:
+            index = entry_id - self.start
+            if not self._visible(entry_id, self.drink_ids[index]):
+                return False
+            self.store[HISTORY_IDS_KEY][index] = REMOVED
+            return True
+
+        position = bisect_right([chunk[0] for chunk in self.chunks], entry_id) - 1
+        if position < 0 or entry_id > self.chunks[position][1]:
+            return False
+        chunk = self._load_chunk(self.chunks[position][0])
+        if chunk is None:
+            return False
+        index = bisect_left(chunk["ids"], entry_id)
+        if index == len(chunk["ids"]) or chunk["ids"][index] != entry_id:
+            return False
+        for column in chunk.values():
+            del column[index]
+        self._save_chunk(self.chunks[position][0], chunk)
+        return True
+
+    def remove_drink(self, drink_id: int) -> None:
+        """Hides every entry of a drink so far, archived ones included."""
+        self.store.setdefault(HISTORY_PURGED_KEY, {})[str(drink_id)] = self.next_id
+
+    def entries(self) -> List[HistoryEntry]:
+        """Returns the entries kept in the session, oldest first."""
+        return [
+            HistoryEntry(entry_id, drink_id, timestamp)
+            for entry_id, (drink_id, timestamp) in enumerate(
+                zip(self.drink_ids, self.timestamps), start=self.start
+            )
+            if self._visible(entry_id, drink_id)
+        ]
+
+    def iter_entries(self) -> Iterator[HistoryEntry]:
+        """Yields every entry, archived ones included, oldest first.
+
+        Archived chunks are loaded one at a time as the iteration reaches
+        them, so only a single chunk is held in memory.
+        """
+        for first_id, _, _ in list(self.chunks):
+            chunk = self._load_chunk(first_id)
+            if chunk is None:
+                continue
+            for entry_id, drink_id, timestamp in zip(
+                chunk["ids"], chunk["drinks"], chunk["ts"]
+            ):
+                if self._visible(entry_id, drink_id):
+                    yield HistoryEntry(entry_id, drink_id, timestamp)
+        yield from self.entries()
+
+    def page(
+        self, before: Optional[int] = None, limit: int = 50
+    ) -> Tuple[List[HistoryEntry], Optional[int]]:
+        """Returns up to limit entries with IDs below before, newest first.
+
+        The second value is the cursor of the next page, or None if there
+        are no older entries. Archived chunks are only loaded once the page
+        reaches them.
+        """
+        before = self.next_id if before is None else min(before, self.next_id)
+        page: List[HistoryEntry] = []
+
+        for entry_id in range(before - 1, self.start - 1, -1):
+            index = entry_id - self.start
+            drink_id = self.drink_ids[index]
+            if self._visible(entry_id, drink_id):
+                page.append(HistoryEntry(entry_id, drink_id, self.timestamps[index]))
+                if len(page) > limit:
+                    return page[:limit], page[limit - 1].entry_id
+
+        for first_id, _, _ in reversed(self.chunks):
+            if first_id >= before:
+                continue
+            chunk = self._load_chunk(first_id)
+            if chunk is None:
+                continue
+            entries = zip(chunk["ids"], chunk["drinks"], chunk["ts"])
+            for entry_id, drink_id, timestamp in reversed(list(entries)):
+                if entry_id < before and self._visible(entry_id, drink_id):
+                    page.append(HistoryEntry(entry_id, drink_id, timestamp))
+                    if len(page) > limit:
+                        return page[:limit], page[limit - 1].entry_id
+        return page, None
+
+    def clear(self) -> None:
+        """Removes every entry, deleting the archived chunks."""
+        if self.archive is not None:
+            for first_id, _, _ in self.chunks:
+                self.archive.delete(self._chunk_key(first_id))
+        self.store[HISTORY_IDS_KEY] = []
+        self.store[HISTORY_TS_KEY] = []
+        self.store[HISTORY_START_KEY] = 0
+        self.store[HISTORY_CHUNKS_KEY] = []
+        self.store[HISTORY_PURGED_KEY] = {}
+
+    def compact(self, now: int, max_entries: int) -> int:
+        """Trims the session to at most max_entries recent entries.
+
+        Like appending an entry at now, but with a smaller bound, e.g. for a
+        session that is idle and large. Returns how many entries left the
+        session, to the archive or dropped.
+        """
+        size = len(self.drink_ids)
+        limit, self.max_entries = self.max_entries, max_entries
+        try:
+            self._trim(now)
+        finally:
+            self.max_entries = limit
+        return size - len(self.drink_ids)
+
+    def _visible(self, entry_id: int, drink_id: int) -> bool:
+        return drink_id != REMOVED and entry_id >= self.purged.get(str(drink_id), 0)
+
+    def _trim(self, now: int) -> None:
+        """Applies the retention window and moves overflow to the archive."""
+        if self.retention:
+            cutoff = now - self.retention
+            timestamps = self.timestamps
+            expired = 0
+            while expired < len(timestamps) and timestamps[expired] < cutoff:
+                expired += 1
+            if expired:
+                self._drop(expired)
+            chunks = self.store.get(HISTORY_CHUNKS_KEY, [])
+            while chunks and chunks[0][2] < cutoff:
+                first_id, _, _ = chunks.pop(0)
+                if self.archive is not None:
+                    self.archive.delete(self._chunk_key(first_id))
+
+        if self.max_entries is not None:
+            while len(self.drink_ids) > self.max_entries:
+                self._archive_oldest(min(self.chunk_size, len(self.drink_ids)))
+
+        oldest = self.chunks[0][0] if self.chunks else self.start
+        purged = self.store.get(HISTORY_PURGED_KEY, {})
+        for drink_id, below in list(purged.items()):
+            if below <= oldest:
+                del purged[drink_id]
+
+    def _archive_oldest(self, count: int) -> None:
+        start, drink_ids, timestamps = self.start, self.drink_ids, self.timestamps
+        entries = [
+            HistoryEntry(start + index, drink_ids[index], timestamps[index])
+            for index in range(count)
+            if self._visible(start + index, drink_ids[index])
+        ]
+        if entries and self.archive is not None:
+            first_id = entries[0].entry_id
+            chunk = {
+                "ids": [entry.entry_id for entry in entries],
+                "drinks": [entry.drink_id for entry in entries],
+                "ts": [entry.timestamp for entry in entries],
+            }
+            self._save_chunk(first_id, chunk)
+            self.store.setdefault(HISTORY_CHUNKS_KEY, []).append(
+                [first_id, entries[-1].entry_id, max(chunk["ts"])]
+            )
+        self._drop(count)
+
+    def _drop(self, count: int) -> None:
+        """Drops the oldest count entries from the session."""
+        del self.store[HISTORY_IDS_KEY][:count]
+        del self.store[HISTORY_TS_KEY][:count]
+        self.store[HISTORY_START_KEY] = self.start + count
+
+    def _chunk_key(self, first_id: int) -> str:
+        archive_id = self.store.setdefault(
+            HISTORY_ARCHIVE_KEY, secrets.token_urlsafe(16)
+        )
+        return f"history:{archive_id}:{first_id}"
+
+    def _load_chunk(self, first_id: int) -> Optional[Dict[str, List[int]]]:
+        if self.archive is None:
+            return None
+        return self.archive.get(self._chunk_key(first_id))
+
+    def _save_chunk(self, first_id: int, chunk: Dict[str, List[int]]) -> None:
+        # Without retention, chunks expire with the archive's default timeout
+        self.archive.set(self._chunk_key(first_id), chunk, timeout=self.retention)
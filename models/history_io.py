@@ -0,0 +1,181 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from models.drink import FrozenDrink
+from models.drink_log import DrinkLog
+from models.history import HistoryEntry
+
+# Columns of an exported history entry; time is informational on import
+FIELDS: List[str] = ["id", "timestamp", "time", "name", "volume", "unit", "alcohol"]
+MEDIA_TYPES: Dict[str, str] = {"csv": "text/csv", "ndjson": "application/x-ndjson"}
+
+BUFFER_SIZE: int = 8192  # Characters written per chunk of a streamed export
+MAX_IMPORT_ERRORS: int = 20  # Error messages kept in an import result
+MAX_CACHED_DRINKS: int = 1024  # Validated drinks reused across rows of an import
+
+Row = Dict[str, Any]
+
+
+def entry_row(entry: HistoryEntry, drink: FrozenDrink) -> Row:
+    return {
+        "id": entry.entry_id,
+        "timestamp": entry.timestamp,
+        "time": datetime.fromtimestamp(entry.timestamp).isoformat(),
+        "name": drink.name,
+        "volume": drink.volume,
+        "unit": drink.unit,
+        "alcohol": drink.alcohol,
+    }
+
+
+def export_ndjson(entries: Iterable[Tuple[HistoryEntry, FrozenDrink]]) -> Iterator[str]:
+    """Yields the entries as JSON lines, in chunks of about BUFFER_SIZE.
+
+    The drink fields are encoded once per drink and reused for each of
+    its entries.
+    """
+    encoded: Dict[FrozenDrink, str] = {}
+    buffer: List[str] = []
+    size = 0
+    for entry, drink in entries:
+        fields = encoded.get(drink)
+        if fields is None:
+            row = entry_row(entry, drink)
+            del row["id"], row["timestamp"], row["time"]
+            fields = encoded[drink] = json.dumps(row, ensure_ascii=False)[1:-1]
+        time = datetime.fromtimestamp(entry.timestamp).isoformat()
+        line = (
+            f'{{"id": {entry.entry_id}, "timestamp": {entry.timestamp}, '
+            f'"time": "{time}", {fields}}}\n'
+        )
+        buffer.append(line)
+        size += len(line)
+        if size >= BUFFER_SIZE:
+            yield "".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield "".join(buffer)
+
+
+def export_csv(entries: Iterable[Tuple[HistoryEntry, FrozenDrink]]) -> Iterator[str]:
+    """Yields a header and the entries as CSV, in chunks of about BUFFER_SIZE."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, FIELDS)
+    writer.writeheader()
+    for entry, drink in entries:
+        writer.writerow(entry_row(entry, drink))
+        if buffer.tell() >= BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def csv_rows(lines: Iterable[str]) -> Iterator[Tuple[int, Optional[Row]]]:
+    """Yields (line number, row) for the rows after the CSV header."""
+    reader = csv.DictReader(lines)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def ndjson_rows(lines: Iterable[str]) -> Iterator[Tuple[int, Optional[Row]]]:
+    """Yields (line number, row) per JSON line, with None for invalid JSON."""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            row = None
+        yield number, row if isinstance(row, dict) else None
+
+
+PARSERS = {"csv": csv_rows, "ndjson": ndjson_rows}
+
+
+def parse_number(value: Any) -> float:
+    """Parses a CSV or JSON number, keeping integers as int like the export."""
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    text = str(value).strip()
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
+
+def row_entry(
+    row: Row, drinks: Optional[Dict[tuple, FrozenDrink]] = None
+) -> Tuple[FrozenDrink, int]:
+    """Validates a row through FrozenDrink and returns it with its timestamp.
+
+    Drinks already validated for an identical row are taken from drinks.
+    The timestamp is read from "timestamp" in epoch seconds, or else from
+    an ISO 8601 "time".
+    """
+    fields = (row["name"], row["volume"], row.get("unit") or "ml", row["alcohol"])
+    drink = drinks.get(fields) if drinks is not None else None
+    if drink is None:
+        drink = FrozenDrink(
+            name=fields[0],
+            volume=parse_number(fields[1]),
+            unit=fields[2],
+            alcohol=parse_number(fields[3]),
+        )
+        if drinks is not None and len(drinks) < MAX_CACHED_DRINKS:
+            drinks[fields] = drink
+    if row.get("timestamp") not in (None, ""):
+        timestamp = int(float(row["timestamp"]))
+    else:
+        timestamp = int(datetime.fromisoformat(row["time"]).timestamp())
+    return drink, timestamp
+
+
+@dataclass
+class ImportResult:
+    imported: int = 0
+    failed: int = 0
+    errors: List[str] = field(default_factory=list)  # First MAX_IMPORT_ERRORS
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"imported": self.imported, "failed": self.failed, "errors": self.errors}
+
+
+def import_history(
+    log: DrinkLog,
+    rows: Iterable[Tuple[int, Optional[Row]]],
+    chunk_size: int = 100,
+) -> ImportResult:
+    """Validates rows one at a time and appends them in chunks.
+
+    Invalid rows are skipped and counted. Only chunk_size entries are held
+    before they are appended, so importing a large file keeps memory flat
+    as long as the log trims its history into an archive.
+    """
+    result = ImportResult()
+    chunk: List[Tuple[FrozenDrink, int]] = []
+    drinks: Dict[tuple, FrozenDrink] = {}
+    for number, row in rows:
+        try:
+            if row is None:
+                raise ValueError("not a JSON object")
+            chunk.append(row_entry(row, drinks))
+        except (AttributeError, IndexError, KeyError, TypeError, ValueError) as e:
+            result.failed += 1
+            if len(result.errors) < MAX_IMPORT_ERRORS:
+                reason = f"missing {e}" if isinstance(e, KeyError) else str(e)
+                result.errors.append(f"Line {number}: {reason}")
+            continue
+        if len(chunk) >= chunk_size:
+            log.extend_history(chunk)
+            result.imported += len(chunk)
+            chunk = []
+    if chunk:
+        log.extend_history(chunk)
+        result.imported += len(chunk)
+    return result
@@ -0,0 +1,375 @@
+import struct
+import zlib
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import msgspec
+
+from models.drink import FrozenDrink
+from models.drink_log import CATALOG_KEY, COUNTS_KEY, INDEX_KEY, ORDER_KEY, TOTAL_KEY
+from models.drink_log import DrinkLog, drink_fields
+from models.history import HISTORY_IDS_KEY, HISTORY_START_KEY, HISTORY_TS_KEY
+
+# Format of the encoded session, the first byte of every payload
+CODEC_VERSION: int = 1
+
+# Flags of the sections present in a payload
+USER_SECTION: int = 1
+DRINKS_SECTION: int = 2
+HISTORY_SECTION: int = 4
+REST_SECTION: int = 8
+COMPRESSED: int = 128
+
+# Session keys that are rebuilt from the drinks section instead of encoded,
+# and the cached BAC curve, which get_bac_curve rebuilds from the history
+DERIVED_KEYS = frozenset([INDEX_KEY, ORDER_KEY, TOTAL_KEY, "curve"])
+USER_KEY: str = "user"
+USER_FIELDS = ("name", "age", "gender", "weight")
+
+# Tags of encoded numbers, in their two lowest bits
+_INT, _CENTS, _FLOAT = 0, 1, 2
+
+
+def zigzag(value: int) -> int:
+    """Maps signed to unsigned integers, small magnitudes to small values."""
+    return value * 2 if value >= 0 else -value * 2 - 1
+
+
+def unzigzag(value: int) -> int:
+    return value // 2 if value % 2 == 0 else -(value + 1) // 2
+
+
+class Writer:
+    """Appends varints, numbers and strings to a byte buffer."""
+
+    def __init__(self) -> None:
+        self.buffer = bytearray()
+
+    def varint(self, value: int) -> None:
+        """Writes an unsigned integer in 7-bit groups, lowest first."""
+        if value < 0:
+            raise ValueError(f"Varints must not be negative, got {value}")
+        while value >= 0x80:
+            self.buffer.append(value & 0x7F | 0x80)
+            value >>= 7
+        self.buffer.append(value)
+
+    def number(self, value: Any) -> None:
+        """Writes an int or float, keeping its type.
+
+        Floats with at most two decimals, like weights and volumes, are
+        written as hundredths; anything else as an 8-byte double.
+        """
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(f"Expected a number, got {value!r}")
+        if isinstance(value, int):
+            self.varint(zigzag(value) << 2 | _INT)
+        elif abs(value) < 2**52 and round(value * 100) / 100 == value:
+            self.varint(zigzag(round(value * 100)) << 2 | _CENTS)
+        else:
+            self.varint(_FLOAT)
+            self.buffer += struct.pack("<d", value)
+
+    def string(self, value: str) -> None:
+        encoded = value.encode()
+        self.varint(len(encoded))
+        self.buffer += encoded
+
+    def bits(self, values: Sequence[int]) -> None:
+        """Writes small unsigned integers with the bits the largest needs."""
+        width = max(values, default=0).bit_length()
+        self.varint(width)
+        packed = 0
+        for position, value in enumerate(values):
+            packed |= value << (position * width)
+        self.buffer += packed.to_bytes((len(values) * width + 7) // 8, "little")
+
+
+class Reader:
+    """Reads what Writer wrote, raising ValueError past the end."""
+
+    def __init__(self, data: bytes) -> None:
+        self.data = data
+        self.position = 0
+
+    def take(self, size: int) -> bytes:
+        start, end = self.position, self.position + size
+        if end > len(self.data):
+            raise ValueError("Truncated session payload")
+        self.position = end
+        return self.data[start:end]
+
+    def varint(self) -> int:
+        value = shift = 0
+        while True:
+            byte = self.take(1)[0]
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value
+            shift += 7
+            if shift > 70:
+                raise ValueError("Varint too long")
+
+    def number(self) -> Any:
+        value = self.varint()
+        tag, payload = value & 3, value >> 2
+        if tag == _INT:
+            return unzigzag(payload)
+        if tag == _CENTS:
+            return unzigzag(payload) / 100
+        if tag == _FLOAT:
+            return struct.unpack("<d", self.take(8))[0]
+        raise ValueError(f"Unknown number tag {tag}")
+
+    def string(self) -> str:
+        return self.take(self.varint()).decode()
+
+    def bits(self, count: int) -> List[int]:
+        width = self.varint()
+        packed = int.from_bytes(self.take((count * width + 7) // 8), "little")
+        mask = (1 << width) - 1
+        return [packed >> (position * width) & mask for position in range(count)]
+
+    def rest(self) -> bytes:
+        return self.take(len(self.data) - self.position)
+
+
+class SessionCodec:
+    """Compact binary encoding of a whole session, e.g. for a cookie.
+
+    The user profile, the drink catalog with the selected counts and the
+    recent history get their own sections: predefined drinks are referenced
+    by their position in known_drinks, history drink IDs are bit-packed and
+    timestamps are stored as varint differences. Keys that can be rebuilt
+    (see DERIVED_KEYS) are left out and everything else is appended as
+    MessagePack. The payload is deflated when that makes it smaller.
+
+    Payloads start with CODEC_VERSION and a checksum of known_drinks, so
+    payloads of another format or drink list are rejected, not misread.
+    """
+
+    def __init__(self, known_drinks: Sequence[FrozenDrink] = ()) -> None:
+        self.known_drinks = list(known_drinks)
+        self.known_ids = {str(drink): i for i, drink in enumerate(self.known_drinks)}
+        names = "\n".join(self.known_ids).encode()
+        self.table_id = zlib.crc32(names) & 0xFFFF
+        self._rest_decoder = msgspec.msgpack.Decoder(dict)
+
+    def encode(self, session: Mapping[str, Any]) -> bytes:
+        """Returns the payload of a session; equal sessions encode equally."""
+        rest = {key: value for key, value in session.items() if key not in DERIVED_KEYS}
+        flags = 0
+        body = Writer()
+
+        user = rest.get(USER_KEY)
+        if self._compact_user(user):
+            flags |= USER_SECTION
+            del rest[USER_KEY]
+            self._encode_user(body, user)
+
+        drinks = self._compact_drinks(rest.get(CATALOG_KEY), rest.get(COUNTS_KEY))
+        if drinks is not None:
+            flags |= DRINKS_SECTION
+            self._encode_drinks(body, drinks, rest.pop(COUNTS_KEY))
+            del rest[CATALOG_KEY]
+        else:
+            # The derived keys cannot be rebuilt without the drinks section
+            for key in DERIVED_KEYS - {"curve"}:
+                if key in session:
+                    rest[key] = session[key]
+
+        history = self._compact_history(rest)
+        if history is not None:
+            flags |= HISTORY_SECTION
+            for key in (HISTORY_IDS_KEY, HISTORY_TS_KEY, HISTORY_START_KEY):
+                rest.pop(key, None)
+            self._encode_history(body, *history)
+
+        if rest:
+            flags |= REST_SECTION
+            body.buffer += msgspec.msgpack.encode(dict(sorted(rest.items())))
+        return self._frame(flags, bytes(body.buffer))
+
+    @staticmethod
+    def _encode_user(body: Writer, user: Mapping[str, Any]) -> None:
+        body.string(user["name"])
+        body.number(user["age"])
+        body.string(user["gender"])
+        body.number(user["weight"])
+
+    def _encode_drinks(
+        self, body: Writer, drinks: Sequence[FrozenDrink], counts: Sequence[int]
+    ) -> None:
+        """Writes each drink, by position if known, followed by its count."""
+        body.varint(len(drinks))
+        for drink, count in zip(drinks, counts):
+            known_id = self.known_ids.get(str(drink))
+            if known_id is not None:
+                body.varint(known_id + 1)
+            else:
+                body.varint(0)
+                body.string(drink.name)
+                body.number(drink.volume)
+                body.string(drink.unit)
+                body.number(drink.alcohol)
+            body.varint(count)
+
+    @staticmethod
+    def _encode_history(
+        body: Writer,
+        drink_ids: Sequence[int],
+        timestamps: Sequence[int],
+        start: Optional[int],
+    ) -> None:
+        body.varint(0 if start is None else start + 1)
+        body.varint(len(drink_ids))
+        # REMOVED (-1) becomes 0, so all IDs are small unsigned integers
+        body.bits([drink_id + 1 for drink_id in drink_ids])
+        previous = 0
+        for timestamp in timestamps:
+            body.varint(zigzag(timestamp - previous))
+            previous = timestamp
+
+    def _frame(self, flags: int, payload: bytes) -> bytes:
+        """Deflates the body if that makes it smaller and adds the header."""
+        deflated = zlib.compress(payload, 9)
+        if len(deflated) < len(payload):
+            flags |= COMPRESSED
+            payload = deflated
+        return struct.pack("<BBH", CODEC_VERSION, flags, self.table_id) + payload
+
+    def decode(self, payload: bytes) -> Dict[str, Any]:
+        """Returns the session of a payload, raising ValueError if invalid."""
+        try:
+            return self._decode(payload)
+        except (
+            KeyError,
+            IndexError,
+            TypeError,
+            UnicodeDecodeError,
+            struct.error,
+            zlib.error,
+            msgspec.DecodeError,
+        ) as e:
+            raise ValueError(f"Invalid session payload: {e}") from e
+
+    def _decode(self, payload: bytes) -> Dict[str, Any]:
+        flags, body = self._unframe(payload)
+        reader = Reader(body)
+        session: Dict[str, Any] = {}
+
+        if flags & USER_SECTION:
+            session[USER_KEY] = {
+                "name": reader.string(),
+                "age": reader.number(),
+                "gender": reader.string(),
+                "weight": reader.number(),
+            }
+        if flags & DRINKS_SECTION:
+            self._decode_drinks(reader, session)
+        if flags & HISTORY_SECTION:
+            self._decode_history(reader, session)
+
+        if flags & REST_SECTION:
+            session.update(self._rest_decoder.decode(reader.rest()))
+        elif reader.rest():
+            raise ValueError("Trailing bytes in session payload")
+        return session
+
+    def _unframe(self, payload: bytes) -> Tuple[int, bytes]:
+        """Checks the header and returns the flags and the inflated body."""
+        version, flags, table_id = struct.unpack_from("<BBH", payload)
+        if version != CODEC_VERSION:
+            raise ValueError(f"Unsupported session payload version {version}")
+        if table_id != self.table_id:
+            raise ValueError("Session payload encoded for other known drinks")
+        body = payload[4:]
+        if flags & COMPRESSED:
+            body = zlib.decompress(body)
+        return flags, body
+
+    def _decode_drinks(self, reader: Reader, session: Dict[str, Any]) -> None:
+        # Interning rebuilds the index, volume order and total like the
+        # requests that selected the drinks did
+        for key in (CATALOG_KEY, COUNTS_KEY, ORDER_KEY):
+            session[key] = []
+        session[INDEX_KEY] = {}
+        session[TOTAL_KEY] = 0
+        log = DrinkLog(session)
+        for _ in range(reader.varint()):
+            known_id = reader.varint()
+            if known_id:
+                drink = self.known_drinks[known_id - 1]
+            else:
+                name, volume = reader.string(), reader.number()
+                drink = FrozenDrink(name, volume, reader.string(), reader.number())
+            count = reader.varint()
+            log.intern(drink)
+            if count:
+                log.select(drink, count)
+
+    @staticmethod
+    def _decode_history(reader: Reader, session: Dict[str, Any]) -> None:
+        start = reader.varint()
+        if start:
+            session[HISTORY_START_KEY] = start - 1
+        size = reader.varint()
+        session[HISTORY_IDS_KEY] = [drink_id - 1 for drink_id in reader.bits(size)]
+        timestamps, previous = [], 0
+        for _ in range(size):
+            previous += unzigzag(reader.varint())
+            timestamps.append(previous)
+        session[HISTORY_TS_KEY] = timestamps
+
+    @staticmethod
+    def _compact_user(user: Any) -> bool:
+        return (
+            isinstance(user, dict)
+            and tuple(sorted(user)) == tuple(sorted(USER_FIELDS))
+            and isinstance(user["name"], str)
+            and isinstance(user["gender"], str)
+            and type(user["age"]) in (int, float)
+            and type(user["weight"]) in (int, float)
+        )
+
+    @staticmethod
+    def _compact_drinks(catalog: Any, counts: Any) -> Optional[List[FrozenDrink]]:
+        """Returns the drinks of a well-formed catalog, otherwise None."""
+        if not isinstance(catalog, list) or not isinstance(counts, list):
+            return None
+        if len(catalog) != len(counts):
+            return None
+        drinks = []
+        for fields, count in zip(catalog, counts):
+            if type(count) is not int or count < 0:
+                return None
+            try:
+                drink = FrozenDrink(*fields)
+            except (IndexError, TypeError, ValueError):
+                return None
+            # Known drinks are matched by display string, so the types of
+            # the fields, e.g. 6 and 6.0, must be kept as well
+            if drink_fields(drink) != fields or not all(
+                type(a) is type(b) for a, b in zip(drink_fields(drink), fields)
+            ):
+                return None
+            drinks.append(drink)
+        return drinks
+
+    @staticmethod
+    def _compact_history(
+        session: Mapping[str, Any],
+    ) -> Optional[Tuple[List[int], List[int], Optional[int]]]:
+        drink_ids = session.get(HISTORY_IDS_KEY)
+        timestamps = session.get(HISTORY_TS_KEY)
+        start = session.get(HISTORY_START_KEY)
+        if not isinstance(drink_ids, list) or not isinstance(timestamps, list):
+            return None
+        if len(drink_ids) != len(timestamps) or (
+            start is not None and (type(start) is not int or start < 0)
+        ):
+            return None
+        if not all(type(value) is int and value >= -1 for value in drink_ids):
+            return None
+        if not all(type(value) is int for value in timestamps):
+            return None
+        return drink_ids, timestamps, start
@@ -0,0 +1,33 @@
+import secrets
+from typing import MutableMapping, Optional
+
+# Session key of the version, as [tag, counter]. The random tag tells apart
+# sessions that reached the same counter, e.g. before and after a reset.
+VERSION_KEY: str = "version"
+
+
+class SessionVersion:
+    """Counter of the changes to the drinks, user and history of a session.
+
+    Everything the index page shows is derived from those, so the version
+    identifies the rendered page: it drives the ETag of the index and the
+    key of its cached fragments. Other session writes, like the group tab
+    or a rebuilt BAC curve, leave the version alone.
+    """
+
+    def __init__(self, store: MutableMapping) -> None:
+        self.store = store
+
+    @property
+    def value(self) -> Optional[str]:
+        """Returns the version as "tag-counter", or None if never bumped."""
+        version = self.store.get(VERSION_KEY)
+        if version is None:
+            return None
+        tag, counter = version
+        return f"{tag}-{counter}"
+
+    def bump(self) -> None:
+        """Records a change, starting with a new tag if there is none."""
+        tag, counter = self.store.get(VERSION_KEY) or (secrets.token_hex(8), 0)
+        self.store[VERSION_KEY] = [tag, counter + 1]
@@ -0,0 +1,71 @@
+from datetime import datetime
+from functools import lru_cache
+from typing import Callable
+
+from babel import Locale
+from babel.dates import (
+    format_date,
+    format_time,
+    get_datetime_format,
+    tokenize_pattern,
+    untokenize_pattern,
+)
+
+DEFAULT_LOCALE: str = "de_DE"
+FORMAT: str = "medium"
+MAX_CACHED_MINUTES: int = 4096  # Formatted minutes kept per locale
+MAX_LOCALES: int = 32
+
+# Stands in for the seconds while a minute is formatted by Babel
+SECONDS_PLACEHOLDER: str = "\ue000"  # Private use, not in any locale data
+
+
+class TimestampFormatter:
+    """Formats epoch timestamps like babel's format_datetime(format="medium").
+
+    Babel parses the locale's patterns and renders every field on each
+    call, which adds up on a history page of hundreds of entries. Entries
+    logged in the same minute only differ in their seconds, so each minute
+    is formatted once with the seconds left as a placeholder, and a row is
+    its minute's cached string with the seconds filled in.
+    """
+
+    def __init__(self, locale: str = DEFAULT_LOCALE) -> None:
+        self.locale = Locale.parse(locale)
+        self.datetime_format = get_datetime_format(FORMAT, locale=self.locale).replace(
+            "'", ""
+        )
+        # The time pattern with its seconds field replaced by the placeholder
+        self.seconds_width = 0
+        tokens = []
+        for kind, value in tokenize_pattern(self.locale.time_formats[FORMAT].pattern):
+            if kind == "field" and value[0] == "s":
+                self.seconds_width = value[1]
+                tokens.append(("chars", SECONDS_PLACEHOLDER))
+            else:
+                tokens.append((kind, value))
+        self.time_pattern = untokenize_pattern(tokens)
+        self.format_minute: Callable[[int], str] = lru_cache(
+            maxsize=MAX_CACHED_MINUTES
+        )(self._format_minute)
+
+    def __call__(self, timestamp: float) -> str:
+        timestamp = int(timestamp)
+        # Local time, so minutes follow the wall clock of odd UTC offsets too
+        second = datetime.fromtimestamp(timestamp).second
+        text = self.format_minute(timestamp - second)
+        if not self.seconds_width:
+            return text
+        return text.replace(SECONDS_PLACEHOLDER, f"{second:0{self.seconds_width}d}")
+
+    def _format_minute(self, timestamp: int) -> str:
+        moment = datetime.fromtimestamp(timestamp)
+        return self.datetime_format.replace(
+            "{0}", format_time(moment, self.time_pattern, locale=self.locale)
+        ).replace("{1}", format_date(moment, FORMAT, locale=self.locale))
+
+
+@lru_cache(maxsize=MAX_LOCALES)
+def get_formatter(locale: str = DEFAULT_LOCALE) -> TimestampFormatter:
+    """Returns the formatter of a locale, created once per process."""
+    return TimestampFormatter(locale)
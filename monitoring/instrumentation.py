@@ -0,0 +1,258 @@
+import cProfile
+import functools
+import logging
+import os
+import random
+import re
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import msgspec
+from flask import (
+    Flask,
+    Response,
+    before_render_template,
+    g,
+    has_request_context,
+    request,
+    session,
+    template_rendered,
+)
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds of the histogram buckets
+DURATION_BUCKETS: List[float] = [
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5
+]
+SIZE_BUCKETS: List[float] = [256, 1024, 4096, 16384, 65536, 262144, 1048576]
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+    """Prometheus histogram with a series per label set."""
+
+    def __init__(self, name: str, help: str, buckets: List[float]) -> None:
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self._series: Dict[Labels, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                # Bucket counts (the last one is +Inf), sum
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][bisect_left(self.buckets, value)] += 1
+            series[1] += value
+
+    def render(self) -> List[str]:
+        lines = [
+            f"# HELP {self.name} {self.help}",
+            f"# TYPE {self.name} histogram",
+        ]
+        with self._lock:
+            series = [
+                (key, list(counts), total)
+                for key, (counts, total) in self._series.items()
+            ]
+        bounds = [format_bound(bound) for bound in self.buckets] + ["+Inf"]
+        for key, counts, total in sorted(series):
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                labels = format_labels(key + (("le", bound),))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {total}")
+            lines.append(f"{self.name}_count{format_labels(key)} {cumulative}")
+        return lines
+
+
+def format_bound(bound: float) -> str:
+    return repr(float(bound)) if bound < 1024 else str(int(bound))
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    pairs = (f'{name}="{escape_label(value)}"' for name, value in labels)
+    return "{" + ",".join(pairs) + "}"
+
+
+class Instrumentation:
+    """Opt-in request timings, Prometheus metrics and sampled profiles.
+
+    When enabled, every request records the time spent in each instrumented
+    stage, the session payload size and the template render time. They are
+    aggregated into histograms served at /metrics and sent back per request
+    in a Server-Timing header; the session is saved after the response is
+    built, so its save time only shows up in /metrics. A configurable
+    fraction of requests is run under cProfile and dumped per route.
+
+    Other subsystems add their metrics to /metrics by appending a function
+    returning rendered lines to collectors.
+    """
+
+    def __init__(self) -> None:
+        self.enabled = False
+        self.profile_rate = 0.0
+        self.profile_dir = "/tmp/bac_profiles"
+        self.request_duration = Histogram(
+            "bac_request_duration_seconds",
+            "Time spent handling a request.",
+            DURATION_BUCKETS,
+        )
+        self.stage_duration = Histogram(
+            "bac_stage_duration_seconds",
+            "Time spent in an instrumented stage of a request.",
+            DURATION_BUCKETS,
+        )
+        self.template_duration = Histogram(
+            "bac_template_render_seconds",
+            "Time spent rendering a template.",
+            DURATION_BUCKETS,
+        )
+        self.session_size = Histogram(
+            "bac_session_payload_bytes",
+            "Size of the msgpack-encoded session after a request.",
+            SIZE_BUCKETS,
+        )
+        self.collectors: List[Callable[[], List[str]]] = []
+
+    def init_app(self, app: Flask) -> None:
+        """Reads the configuration and registers the hooks and /metrics."""
+        self.enabled = app.config["INSTRUMENTATION_ENABLED"]
+        self.profile_rate = app.config["PROFILE_SAMPLE_RATE"]
+        self.profile_dir = app.config["PROFILE_DIR"]
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.add_url_rule("/metrics", "metrics", self.metrics)
+        self.instrument_session(app)
+
+    def instrument_session(self, app: Flask) -> None:
+        """Times the session load and save of the installed interface."""
+        interface = app.session_interface
+        interface.open_session = self.timed("session_load")(interface.open_session)
+        interface.save_session = self.timed("session_save")(interface.save_session)
+
+    def timed(self, stage: str) -> Callable:
+        """Decorator recording the duration of a function as a request stage."""
+
+        def decorator(func: Callable) -> Callable:
+            @functools.wraps(func)
+            def wrapper(*args: Any, **kwargs: Any) -> Any:
+                if not self.enabled or not has_request_context():
+                    return func(*args, **kwargs)
+                start = time.perf_counter()
+                try:
+                    return func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter() - start)
+
+            return wrapper
+
+        return decorator
+
+    def record(self, stage: str, duration: float) -> None:
+        """Adds a stage duration to the current request and the metrics."""
+        timings = g.setdefault("stage_timings", {})
+        timings[stage] = timings.get(stage, 0.0) + duration
+        self.stage_duration.observe(duration, stage=stage)
+
+    def metrics(self) -> Response:
+        if not self.enabled:
+            return Response("Instrumentation is disabled.\n", 404)
+        lines = []
+        for histogram in (
+            self.request_duration,
+            self.stage_duration,
+            self.template_duration,
+            self.session_size,
+        ):
+            lines.extend(histogram.render())
+        for collector in self.collectors:
+            lines.extend(collector())
+        return Response(
+            "\n".join(lines) + "\n",
+            content_type="text/plain; version=0.0.4; charset=utf-8",
+        )
+
+    def _before_request(self) -> None:
+        if not self.enabled:
+            return
+        g.request_start = time.perf_counter()
+        if self.profile_rate and random.random() < self.profile_rate:
+            profiler = cProfile.Profile()
+            try:
+                profiler.enable()
+            except ValueError:
+                # Another profiler is active in this process
+                return
+            g.profiler = profiler
+
+    def _after_request(self, response: Response) -> Response:
+        if not self.enabled or "request_start" not in g:
+            return response
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        duration = time.perf_counter() - g.request_start
+        self.request_duration.observe(
+            duration,
+            route=route,
+            method=request.method,
+            status=str(response.status_code),
+        )
+        if session:
+            size = len(msgspec.msgpack.encode(dict(session)))
+            self.session_size.observe(size, route=route)
+
+        timings = g.get("stage_timings", {})
+        timings["total"] = duration
+        response.headers["Server-Timing"] = ", ".join(
+            f"{stage};dur={seconds * 1000:.3f}" for stage, seconds in timings.items()
+        )
+
+        profiler: Optional[cProfile.Profile] = g.pop("profiler", None)
+        if profiler is not None:
+            profiler.disable()
+            self._dump_profile(profiler, route)
+        return response
+
+    def _dump_profile(self, profiler: cProfile.Profile, route: str) -> None:
+        name = re.sub(r"[^A-Za-z0-9]+", "_", route).strip("_") or "index"
+        os.makedirs(self.profile_dir, exist_ok=True)
+        path = os.path.join(
+            self.profile_dir, f"{name}-{time.time_ns()}-{os.getpid()}.prof"
+        )
+        try:
+            profiler.dump_stats(path)
+        except OSError as e:
+            logger.warning("Could not write profile %s: %s", path, e)
+
+    def _before_render(self, app: Flask, template: Any, context: dict) -> None:
+        if self.enabled and has_request_context():
+            g.render_start = time.perf_counter()
+
+    def _after_render(self, app: Flask, template: Any, context: dict) -> None:
+        if not self.enabled or "render_start" not in g:
+            return
+        duration = time.perf_counter() - g.pop("render_start")
+        self.template_duration.observe(duration, template=template.name or "")
+        self.record("render", duration)
+
+
+# Shared instance, configured by init_app
+instrumentation = Instrumentation()
+timed = instrumentation.timed
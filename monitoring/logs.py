@@ -0,0 +1,316 @@
+import atexit
+import hashlib
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler
+from typing import Dict, List, Optional
+
+import msgspec
+from flask import Flask, Response, g, has_request_context, request, session
+
+TEXT_FORMAT: str = '"%(asctime)s" "%(levelname)s" - "%(message)s"'
+LOG_FORMATS = ["json", "text"]
+REQUEST_ID_HEADER: str = "X-Request-ID"
+# Request IDs taken over from clients, anything else is replaced
+REQUEST_ID_PATTERN = re.compile(r"[\w.:-]{1,64}")
+
+# Attributes every LogRecord has; anything else was passed with extra=
+RECORD_ATTRIBUTES = frozenset(logging.makeLogRecord({}).__dict__) | {
+    "message",
+    "asctime",
+    "event",
+    "sampled",
+    "request_id",
+    "session_id",
+}
+
+
+def parse_sample_rates(value: str) -> Dict[str, float]:
+    """Parses "event=rate,..." into the fraction of records kept per event."""
+    rates = {}
+    for pair in filter(None, (part.strip() for part in value.split(","))):
+        event, _, rate = pair.partition("=")
+        rates[event.strip()] = float(rate)
+    return rates
+
+
+class JsonFormatter(logging.Formatter):
+    """Formats a record as one JSON object per line.
+
+    The message and the extra fields are only formatted here, i.e. in the
+    listener thread, so logging a record in a request costs no formatting.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key in ("event", "request_id", "session_id"):
+            value = getattr(record, key, None)
+            if value is not None:
+                entry[key] = value
+        for key, value in record.__dict__.items():
+            if key not in RECORD_ATTRIBUTES:
+                entry[key] = value
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return msgspec.json.encode(entry, enc_hook=str).decode()
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a configured fraction of the records of each event.
+
+    Records name their event with extra={"event": ...}. Events without a
+    rate, and records without an event, are always kept. Records logged
+    with log_event() were sampled before they were created.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, float]] = None) -> None:
+        super().__init__()
+        self.rates = rates or {}
+
+    def keep(self, event: Optional[str]) -> bool:
+        rate = self.rates.get(event, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return getattr(record, "sampled", False) or self.keep(
+            getattr(record, "event", None)
+        )
+
+
+class CorrelationFilter(logging.Filter):
+    """Adds the request and session IDs of the current request to a record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if has_request_context():
+            record.request_id = g.get("request_id")
+            record.session_id = g.get("session_log_id")
+        return True
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Queues records for the listener without formatting or blocking.
+
+    Unlike QueueHandler, prepare() neither copies the record nor formats
+    its message, so the arguments are formatted lazily by the listener.
+    Records logged while the queue is full are dropped and counted.
+    """
+
+    def __init__(self, log_queue: queue.Queue) -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Nothing is changed in the record, so it is queued as it is
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class LogListener:
+    """Background thread writing the queued records in batches.
+
+    Waking a thread for every record costs the request threads more than
+    the record itself, so after a record arrives the listener waits for
+    flush_interval seconds and then formats and writes everything queued
+    in one go.
+    """
+
+    _sentinel = None
+
+    def __init__(
+        self, log_queue: queue.Queue, output: logging.Handler, flush_interval: float
+    ) -> None:
+        self.queue = log_queue
+        self.output = output
+        self.flush_interval = flush_interval
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="log-listener")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Writes out the queued records and waits for the thread to end."""
+        # The queue may be full, but the thread keeps draining it
+        self.queue.put(self._sentinel)
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        stopped = False
+        while not stopped:
+            records = [self.queue.get()]
+            time.sleep(self.flush_interval)
+            while True:
+                try:
+                    records.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            if self._sentinel in records:
+                stopped = True
+                records = [record for record in records if record is not self._sentinel]
+            self.write(records)
+
+    def write(self, records: List[logging.LogRecord]) -> None:
+        lines = []
+        for record in records:
+            if record.levelno < self.output.level:
+                continue
+            try:
+                lines.append(self.output.format(record) + "\n")
+            except Exception:
+                self.output.handleError(record)
+        if not lines:
+            return
+        self.output.acquire()
+        try:
+            self.output.stream.write("".join(lines))
+            self.output.flush()
+        except Exception:
+            self.output.handleError(records[-1])
+        finally:
+            self.output.release()
+
+
+class LogPipeline:
+    """Root logging through a queue drained by a background thread.
+
+    Request threads only put records on a bounded queue; a listener thread
+    formats them and writes them to stderr. Records carry the request ID
+    (taken from or sent back in the X-Request-ID header) and a hash of the
+    session ID, and high-frequency events can be sampled.
+
+    init_app only reads the configuration; install, called by create_app,
+    starts the listener. Like logging.basicConfig, the pipeline is only
+    installed if the root logger has no handlers yet. The listener is
+    restarted in forked processes, e.g. gunicorn workers forked from a
+    preloaded master.
+    """
+
+    def __init__(self) -> None:
+        self.handler: Optional[NonBlockingQueueHandler] = None
+        self.listener: Optional[LogListener] = None
+        self.output: logging.Handler = logging.StreamHandler(sys.stderr)
+        self.sampler = SamplingFilter()
+        self.queue_size = 10000
+        self.flush_interval = 0.05
+        self.level = logging.INFO
+        self._lock = threading.Lock()
+        self._hooks = False
+
+    def init_app(self, app: Flask) -> None:
+        """Reads the configuration and adds the ID hooks."""
+        log_format = app.config["LOG_FORMAT"]
+        if log_format not in LOG_FORMATS:
+            raise ValueError(
+                f"Log format must be one of {LOG_FORMATS}, got '{log_format}'"
+            )
+        self.output.setFormatter(
+            JsonFormatter() if log_format == "json" else logging.Formatter(TEXT_FORMAT)
+        )
+        self.sampler.rates = parse_sample_rates(app.config["LOG_SAMPLE_RATES"])
+        self.queue_size = app.config["LOG_QUEUE_SIZE"]
+        self.flush_interval = app.config["LOG_FLUSH_INTERVAL"]
+        self.level = app.config["LOG_LEVEL"]
+
+        app.before_request(self._before_request)
+        app.after_request(self._after_request)
+
+    def install(self) -> None:
+        """Installs the pipeline on the root logger unless it has handlers."""
+        root = logging.getLogger()
+        if not root.handlers:
+            root.setLevel(self.level)
+            root.addHandler(self.start())
+
+    def start(self) -> NonBlockingQueueHandler:
+        """Starts the listener thread and returns the handler feeding it."""
+        with self._lock:
+            if self.handler is None:
+                log_queue = queue.Queue(self.queue_size)
+                self.handler = NonBlockingQueueHandler(log_queue)
+                self.handler.addFilter(self.sampler)
+                self.handler.addFilter(CorrelationFilter())
+            self._start_listener()
+            if not self._hooks:
+                os.register_at_fork(after_in_child=self._after_fork)
+                atexit.register(self.stop)
+                self._hooks = True
+        return self.handler
+
+    def stop(self) -> None:
+        """Writes out the queued records and stops the listener thread."""
+        with self._lock:
+            if self.listener is not None:
+                self.listener.stop()
+                self.listener = None
+
+    def _after_fork(self) -> None:
+        # Only the forking thread survives, so the child starts a listener of
+        # its own on a new queue, whose locks may have been held at the fork
+        if self.listener is None or self.handler is None:
+            return
+        self._lock = threading.Lock()
+        self.handler.queue = queue.Queue(self.queue_size)
+        self._start_listener()
+
+    def _start_listener(self) -> None:
+        self.listener = LogListener(
+            self.handler.queue, self.output, self.flush_interval
+        )
+        self.listener.start()
+
+    def _before_request(self) -> None:
+        request_id = request.headers.get(REQUEST_ID_HEADER, "")
+        if not REQUEST_ID_PATTERN.fullmatch(request_id):
+            request_id = uuid.uuid4().hex
+        g.request_id = request_id
+        sid = getattr(session, "sid", None)
+        if sid:
+            # Correlates the records of a session without logging its key
+            g.session_log_id = hashlib.sha256(sid.encode()).hexdigest()[:16]
+
+    def _after_request(self, response: Response) -> Response:
+        if "request_id" in g:
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
+
+
+# Shared instance, configured by init_app
+log_pipeline = LogPipeline()
+
+
+def log_event(
+    logger: logging.Logger,
+    event: str,
+    msg: str,
+    *args: object,
+    level: int = logging.INFO,
+    **fields: object,
+) -> None:
+    """Logs a record of an event with its fields, if the event is sampled.
+
+    Creating a LogRecord takes longer than anything a handler filter does,
+    so records dropped by sampling are never created.
+    """
+    if logger.isEnabledFor(level) and log_pipeline.sampler.keep(event):
+        extra = dict(fields, event=event, sampled=True)
+        logger.log(level, msg, *args, extra=extra, stacklevel=2)
@@ -0,0 +1,150 @@
+// Minimal canvas renderer for the BAC curve served by /api/curve.
+// The server sends a downsampled list of [hours, bac] points, so drawing
+// is a single pass over at most a few hundred points.
+
+const CURVE_COLOR = "rgba(75, 192, 192, 1)";
+const CURVE_FILL = "rgba(75, 192, 192, 0.2)";
+const LIMIT_COLOR = "rgba(255, 99, 132, 1)";
+const SOBER_COLOR = "rgba(255, 165, 0, 1)";
+const AXIS_COLOR = "#666";
+const GRID_COLOR = "rgba(0, 0, 0, 0.1)";
+const PADDING = { top: 20, right: 20, bottom: 45, left: 55 };
+
+// Returns a tick step of 1, 2 or 5 times a power of ten for about count ticks
+function niceStep(range, count) {
+	const rough = range / count;
+	const power = Math.pow(10, Math.floor(Math.log10(rough)));
+	const fraction = rough / power;
+	if (fraction <= 1) return power;
+	if (fraction <= 2) return 2 * power;
+	if (fraction <= 5) return 5 * power;
+	return 10 * power;
+}
+
+function drawDashedLine(ctx, x1, y1, x2, y2, color) {
+	ctx.save();
+	ctx.strokeStyle = color;
+	ctx.lineWidth = 2;
+	ctx.setLineDash([10, 5]);
+	ctx.beginPath();
+	ctx.moveTo(x1, y1);
+	ctx.lineTo(x2, y2);
+	ctx.stroke();
+	ctx.restore();
+}
+
+function drawCurve(canvas, data) {
+	const ratio = window.devicePixelRatio || 1;
+	const width = canvas.clientWidth;
+	const height = canvas.clientHeight;
+	canvas.width = width * ratio;
+	canvas.height = height * ratio;
+
+	const ctx = canvas.getContext("2d");
+	ctx.setTransform(ratio, 0, 0, ratio, 0, 0);
+	ctx.clearRect(0, 0, width, height);
+	ctx.font = "12px sans-serif";
+
+	const plotWidth = width - PADDING.left - PADDING.right;
+	const plotHeight = height - PADDING.top - PADDING.bottom;
+	const maxX = data.hours || 1;
+	const maxY = Math.max(data.peak, data.legal_limit) * 1.1 || 1;
+	const x = (hours) => PADDING.left + (hours / maxX) * plotWidth;
+	const y = (bac) => PADDING.top + plotHeight - (bac / maxY) * plotHeight;
+
+	// Grid and tick labels
+	ctx.strokeStyle = GRID_COLOR;
+	ctx.fillStyle = AXIS_COLOR;
+	ctx.lineWidth = 1;
+	const stepX = niceStep(maxX, 8);
+	ctx.textAlign = "center";
+	ctx.textBaseline = "top";
+	for (let tick = 0; tick <= maxX + 1e-9; tick += stepX) {
+		ctx.beginPath();
+		ctx.moveTo(x(tick), PADDING.top);
+		ctx.lineTo(x(tick), PADDING.top + plotHeight);
+		ctx.stroke();
+		ctx.fillText(+tick.toFixed(2), x(tick), PADDING.top + plotHeight + 5);
+	}
+	const stepY = niceStep(maxY, 5);
+	ctx.textAlign = "right";
+	ctx.textBaseline = "middle";
+	for (let tick = 0; tick <= maxY + 1e-9; tick += stepY) {
+		ctx.beginPath();
+		ctx.moveTo(PADDING.left, y(tick));
+		ctx.lineTo(PADDING.left + plotWidth, y(tick));
+		ctx.stroke();
+		ctx.fillText(+tick.toFixed(3), PADDING.left - 5, y(tick));
+	}
+
+	// Axis titles
+	ctx.textAlign = "center";
+	ctx.textBaseline = "bottom";
+	ctx.fillText("Zeit (Stunden)", PADDING.left + plotWidth / 2, height - 2);
+	ctx.save();
+	ctx.translate(12, PADDING.top + plotHeight / 2);
+	ctx.rotate(-Math.PI / 2);
+	ctx.textBaseline = "middle";
+	ctx.fillText("BAK (Promille)", 0, 0);
+	ctx.restore();
+
+	// Curve, filled down to the x axis
+	const points = data.points;
+	if (points.length) {
+		ctx.beginPath();
+		points.forEach(([hours, bac], i) =>
+			i ? ctx.lineTo(x(hours), y(bac)) : ctx.moveTo(x(hours), y(bac))
+		);
+		ctx.strokeStyle = CURVE_COLOR;
+		ctx.lineWidth = 2;
+		ctx.stroke();
+		ctx.lineTo(x(points[points.length - 1][0]), y(0));
+		ctx.lineTo(x(points[0][0]), y(0));
+		ctx.closePath();
+		ctx.fillStyle = CURVE_FILL;
+		ctx.fill();
+	}
+
+	// Legal limit and the time the BAC stays below it
+	drawDashedLine(ctx, x(0), y(data.legal_limit), x(maxX), y(data.legal_limit), LIMIT_COLOR);
+	ctx.fillStyle = LIMIT_COLOR;
+	ctx.textAlign = "right";
+	ctx.textBaseline = "bottom";
+	ctx.fillText(`${data.legal_limit} Promille Grenze`, x(maxX), y(data.legal_limit) - 3);
+
+	if (data.time_below_limit !== null) {
+		const below = x(data.time_below_limit);
+		drawDashedLine(ctx, below, PADDING.top, below, PADDING.top + plotHeight, SOBER_COLOR);
+		ctx.fillStyle = SOBER_COLOR;
+		ctx.textAlign = "left";
+		ctx.textBaseline = "top";
+		ctx.fillText(`${data.time_below_limit} Stunden`, below + 4, PADDING.top);
+	}
+}
+
+function showCurveError(canvas, message) {
+	const error = document.createElement("p");
+	error.className = "error-message";
+	error.textContent = message;
+	canvas.replaceWith(error);
+}
+
+// Loads the curve for every canvas with a data-curve-url attribute
+document.querySelectorAll("canvas[data-curve-url]").forEach((canvas) => {
+	const points = Math.round(canvas.clientWidth / 2) || 200;
+	fetch(`${canvas.dataset.curveUrl}?points=${points}`, {
+		credentials: "same-origin",
+		headers: { Accept: "application/json" },
+	})
+		.then((response) =>
+			response.json().then((data) => {
+				if (!response.ok) throw new Error(data.error);
+				return data;
+			})
+		)
+		.then((data) => {
+			drawCurve(canvas, data);
+			window.addEventListener("resize", () => drawCurve(canvas, data));
+		})
+		.catch((error) => showCurveError(canvas, error.message));
+});
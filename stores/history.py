@@ -0,0 +1,48 @@
+from typing import Any, Optional
+
+from cachelib import FileSystemCache, RedisCache, SimpleCache
+from flask import Flask
+
+# History archive backends selectable with the HISTORY_ARCHIVE_BACKEND setting
+HISTORY_ARCHIVE_BACKENDS = ["filesystem", "memory", "redis", "none"]
+
+
+def create_history_archive(app: Flask) -> Optional[Any]:
+    """Creates the cachelib cache holding archived history chunks.
+
+    Returns None for the "none" backend, in which case history entries
+    beyond HISTORY_MAX_ENTRIES are dropped instead of archived. Chunks
+    expire with the retention window or, without one, with the session
+    lifetime, so the chunks of abandoned sessions do not pile up. The caches
+    never prune them earlier; the sweeper deletes expired chunk files.
+    """
+    backend = app.config["HISTORY_ARCHIVE_BACKEND"]
+    timeout = app.config["HISTORY_RETENTION_HOURS"] * 60 * 60 or int(
+        app.permanent_session_lifetime.total_seconds()
+    )
+    if backend == "filesystem":
+        return FileSystemCache(
+            cache_dir=app.config["HISTORY_ARCHIVE_DIR"],
+            threshold=0,
+            default_timeout=timeout,
+        )
+    if backend == "memory":
+        return SimpleCache(
+            threshold=app.config["HISTORY_MEMORY_MAX_CHUNKS"], default_timeout=timeout
+        )
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "The redis history archive requires the 'redis' package"
+            ) from e
+
+        client = redis.Redis.from_url(app.config["SESSION_REDIS_URL"])
+        return RedisCache(host=client, key_prefix="bac:", default_timeout=timeout)
+    if backend == "none":
+        return None
+    raise ValueError(
+        f"History archive backend must be one of {HISTORY_ARCHIVE_BACKENDS}, "
+        f"got '{backend}'"
+    )
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from flask import Flask
+
+# Result cache backends selectable with the RESULT_CACHE_BACKEND setting
+RESULT_CACHE_BACKENDS = ["memory", "cachelib", "none"]
+
+
+def result_key(profile: Sequence[Any], drink_counts: Dict[str, int]) -> str:
+    """Returns a canonical hash of a user profile and a drink multiset.
+
+    The drinks are identified by their display string, which FrozenDrink
+    normalizes, and sorted so the order they were added in does not matter.
+    """
+    payload = json.dumps(
+        [list(profile), sorted(drink_counts.items())],
+        separators=(",", ":"),
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    # Entries dropped to stay within the size bound, None if not observable
+    evictions: Optional[int] = 0
+    # Entries dropped because their TTL ran out, None if not observable
+    expirations: Optional[int] = 0
+
+    def to_dict(self) -> Dict[str, int]:
+        """Returns the counters, leaving out those the backend cannot observe."""
+        return {
+            counter.name: getattr(self, counter.name)
+            for counter in fields(self)
+            if getattr(self, counter.name) is not None
+        }
+
+
+class ResultCache(ABC):
+    """Bounded cache for calculation results with hit and miss counters.
+
+    The counters are updated under a lock, as request threads share the
+    cache.
+    """
+
+    def __init__(self) -> None:
+        self.stats = CacheStats()
+        self._stats_lock = threading.Lock()
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        """Adds amount to one of the stats counters."""
+        with self._stats_lock:
+            setattr(self.stats, counter, getattr(self.stats, counter) + amount)
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value, or None if it is missing or expired."""
+
+    @abstractmethod
+    def set(self, key: str, value: Any) -> None:
+        """Stores a value, evicting older entries if the cache is full."""
+
+    def memoize(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Returns the cached value for key, computing and storing it on a miss."""
+        value = self.get(key)
+        if value is not None:
+            self.count("hits")
+            return value
+        self.count("misses")
+        value = compute()
+        self.set(key, value)
+        return value
+
+
+class MemoryResultCache(ResultCache):
+    """In-process LRU result cache with a TTL per entry."""
+
+    def __init__(self, max_entries: int = 1024, ttl: int = 3600) -> None:
+        super().__init__()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._entries[key]
+                self.count("expirations")
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.count("evictions")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CachelibResultCache(ResultCache):
+    """Result cache on top of a cachelib cache, e.g. the FileSystemCache.
+
+    cachelib prunes expired and then the oldest entries on its own once its
+    threshold is reached. Whatever a write pruned is counted as evicted,
+    based on the entry count the cache keeps, e.g. FileSystemCache.
+
+    The app's cache has no threshold and keeps no count; the sweeper
+    deletes its expired and surplus files in the background, without
+    telling them apart from other entries of the shared directory. The
+    evictions are then left out of the stats, like the expirations, which
+    cachelib never reports; the sweeper's totals for the directory are
+    served at /metrics instead.
+    """
+
+    def __init__(self, cache: Any, prefix: str = "result:", ttl: int = 3600) -> None:
+        super().__init__()
+        self.cache = cache
+        self.prefix = prefix
+        self.ttl = ttl
+        self.stats.expirations = None
+        if not getattr(cache, "_threshold", 0) or not hasattr(cache, "_file_count"):
+            self.stats.evictions = None
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.cache.get(self.prefix + key)
+
+    def set(self, key: str, value: Any) -> None:
+        if self.stats.evictions is None:
+            self.cache.set(self.prefix + key, value, timeout=self.ttl)
+            return
+        with self._stats_lock:
+            # Held across the write, so that concurrent writes are not
+            # mistaken for the ones this write pruned
+            before = self.cache._file_count
+            self.cache.set(self.prefix + key, value, timeout=self.ttl)
+            self.stats.evictions += max(0, before + 1 - self.cache._file_count)
+
+
+class NullResultCache(ResultCache):
+    """Result cache that stores nothing, so every lookup is a miss."""
+
+    def get(self, key: str) -> Optional[Any]:
+        return None
+
+    def set(self, key: str, value: Any) -> None:
+        pass
+
+
+def create_result_cache(
+    app: Flask, cache: Any = None, prefix: str = "result:"
+) -> ResultCache:
+    """Creates the result cache for the configured backend.
+
+    The cachelib backend uses the given cachelib cache, with keys prefixed
+    so several result caches can share it.
+    """
+    backend = app.config["RESULT_CACHE_BACKEND"]
+    ttl = app.config["RESULT_CACHE_TTL"]
+    if backend == "memory":
+        return MemoryResultCache(app.config["RESULT_CACHE_MAX_ENTRIES"], ttl)
+    if backend == "cachelib":
+        return CachelibResultCache(cache, prefix=prefix, ttl=ttl)
+    if backend == "none":
+        return NullResultCache()
+    raise ValueError(
+        f"Result cache backend must be one of {RESULT_CACHE_BACKENDS}, got '{backend}'"
+    )
@@ -0,0 +1,541 @@
+import hashlib
+import secrets
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from cachelib import FileSystemCache
+from flask import Flask, Request, Response
+from flask.sessions import SecureCookieSession, SessionInterface
+from itsdangerous import BadSignature, TimestampSigner, base64_decode, base64_encode
+
+from flask_session import Session
+from flask_session.base import ServerSideSession, ServerSideSessionInterface
+from models.drink import FrozenDrink
+from models.session_codec import SessionCodec
+
+Fields = Dict[str, bytes]
+
+# Session backends selectable with the SESSION_BACKEND setting
+SESSION_BACKENDS = ["filesystem", "memory", "redis", "stateless"]
+# Backends holding the stateless sessions that exceed the token budget
+TOKEN_FALLBACK_BACKENDS = ["memory", "redis"]
+
+# First byte of a token, before the signature: the session itself, or the
+# key of a session kept in the fallback store
+SESSION_TOKEN: bytes = b"t"
+SESSION_REFERENCE: bytes = b"r"
+
+
+class SessionStore(ABC):
+    """Stores each session as a mapping of session keys to encoded values."""
+
+    @abstractmethod
+    def load(self, store_id: str) -> Optional[Fields]:
+        """Returns all encoded fields of a session, or None if it is unknown."""
+
+    @abstractmethod
+    def save(
+        self, store_id: str, changed: Fields, removed: Iterable[str], ttl: int
+    ) -> None:
+        """Writes the changed fields, drops the removed ones and renews the TTL."""
+
+    @abstractmethod
+    def delete(self, store_id: str) -> None:
+        """Deletes the whole session."""
+
+
+class MemorySessionStore(SessionStore):
+    """In-process LRU session store for single-pod deployments.
+
+    Sessions are only visible to the worker process that created them, so
+    this store must be run with a single worker per pod.
+    """
+
+    def __init__(self, max_entries: int = 10000) -> None:
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def load(self, store_id: str) -> Optional[Fields]:
+        with self._lock:
+            entry = self._entries.get(store_id)
+            if entry is None:
+                return None
+            expires, fields = entry
+            if expires < time.monotonic():
+                del self._entries[store_id]
+                return None
+            self._entries.move_to_end(store_id)
+            return dict(fields)
+
+    def save(
+        self, store_id: str, changed: Fields, removed: Iterable[str], ttl: int
+    ) -> None:
+        with self._lock:
+            _, fields = self._entries.pop(store_id, (0, {}))
+            fields.update(changed)
+            for key in removed:
+                fields.pop(key, None)
+            self._entries[store_id] = (time.monotonic() + ttl, fields)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, store_id: str) -> None:
+        with self._lock:
+            self._entries.pop(store_id, None)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class RedisSessionStore(SessionStore):
+    """Session store speaking the Redis protocol, one hash per session.
+
+    Only changed fields are sent with HSET, so a request that appends a drink
+    does not rewrite the rest of the session.
+    """
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+
+    @classmethod
+    def from_url(
+        cls, url: str, max_connections: int = 50, timeout: int = 5
+    ) -> "RedisSessionStore":
+        """Creates a store backed by a bounded, blocking connection pool."""
+        try:
+            import redis
+        except ImportError as e:
+            raise ImportError(
+                "The redis session backend requires the 'redis' package"
+            ) from e
+
+        pool = redis.BlockingConnectionPool.from_url(
+            url, max_connections=max_connections, timeout=timeout
+        )
+        return cls(redis.Redis(connection_pool=pool))
+
+    def load(self, store_id: str) -> Optional[Fields]:
+        fields = self.client.hgetall(store_id)
+        if not fields:
+            return None
+        return {key.decode(): value for key, value in fields.items()}
+
+    def save(
+        self, store_id: str, changed: Fields, removed: Iterable[str], ttl: int
+    ) -> None:
+        pipeline = self.client.pipeline(transaction=True)
+        if changed:
+            pipeline.hset(store_id, mapping=changed)
+        removed = list(removed)
+        if removed:
+            pipeline.hdel(store_id, *removed)
+        pipeline.expire(store_id, ttl)
+        pipeline.execute()
+
+    def delete(self, store_id: str) -> None:
+        self.client.delete(store_id)
+
+
+class AsyncSessionStore(ABC):
+    """Awaitable counterpart of SessionStore for the ASGI entry point."""
+
+    @abstractmethod
+    async def load(self, store_id: str) -> Optional[Fields]:
+        """Returns all encoded fields of a session, or None if it is unknown."""
+
+    @abstractmethod
+    async def save(
+        self, store_id: str, changed: Fields, removed: Iterable[str], ttl: int
+    ) -> None:
+        """Writes the changed fields, drops the removed ones and renews the TTL."""
+
+    @abstractmethod
+    async def delete(self, store_id: str) -> None:
+        """Deletes the whole session."""
+
+    async def close(self) -> None:
+        """Releases connections when the server shuts down."""
+
+
+class AsyncMemorySessionStore(AsyncSessionStore):
+    """Async wrapper of MemorySessionStore, whose operations never block."""
+
+    def __init__(self, store: MemorySessionStore) -> None:
+        self.store = store
+
+    async def load(self, store_id: str) -> Optional[Fields]:
+        return self.store.load(store_id)
+
+    async def save(
+        self, store_id: str, changed: Fields, removed: Iterable[str], ttl: int
+    ) -> None:
+        self.store.save(store_id, changed, removed, ttl)
+
+    async def delete(self, store_id: str) -> None:
+        self.store.delete(store_id)
+
+
+class AsyncRedisSessionStore(AsyncSessionStore):
+    """RedisSessionStore on redis.asyncio, with the same key layout."""
+
+    def __init__(self, client: Any) -> None:
+        self.client = client
+
+    @classmethod
+    def from_url(
+        cls, url: str, max_connections: int = 50, timeout: int = 5
+    ) -> "AsyncRedisSessionStore":
+        """Creates a store backed by a bounded, blocking connection pool."""
+        try:
+            import redis.asyncio
+        except ImportError as e:
+            raise ImportError(
+                "The redis session backend requires the 'redis' package"
+            ) from e
+
+        pool = redis.asyncio.BlockingConnectionPool.from_url(
+            url, max_connections=max_connections, timeout=timeout
+        )
+        return cls(redis.asyncio.Redis(connection_pool=pool))
+
+    async def load(self, store_id: str) -> Optional[Fields]:
+        fields = await self.client.hgetall(store_id)
+        if not fields:
+            return None
+        return {key.decode(): value for key, value in fields.items()}
+
+    async def save(
+        self, store_id: str, changed: Fields, removed: Iterable[str], ttl: int
+    ) -> None:
+        async with self.client.pipeline(transaction=True) as pipeline:
+            if changed:
+                pipeline.hset(store_id, mapping=changed)
+            removed = list(removed)
+            if removed:
+                pipeline.hdel(store_id, *removed)
+            pipeline.expire(store_id, ttl)
+            await pipeline.execute()
+
+    async def delete(self, store_id: str) -> None:
+        await self.client.delete(store_id)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+@dataclass
+class PendingSession:
+    """Session fields loaded ahead of a request and the writes it made."""
+
+    store_id: Optional[str]
+    fields: Optional[Fields]
+    writes: List[Tuple[str, tuple]] = field(default_factory=list)
+
+    async def flush(self, store: AsyncSessionStore) -> None:
+        """Applies the recorded writes to an async store, in order."""
+        for method, args in self.writes:
+            await getattr(store, method)(*args)
+        self.writes.clear()
+
+
+# Session of the request currently handled by the ASGI entry point
+pending_session: ContextVar[PendingSession] = ContextVar("pending_session")
+
+
+class PreloadedSessionStore(SessionStore):
+    """Serves the session loaded by the ASGI entry point and defers writes.
+
+    The ASGI entry point awaits the load before running Flask and awaits
+    the recorded writes afterwards, so views never block on session I/O.
+    """
+
+    def load(self, store_id: str) -> Optional[Fields]:
+        pending = pending_session.get()
+        if pending.store_id != store_id or pending.fields is None:
+            return None
+        return dict(pending.fields)
+
+    def save(
+        self, store_id: str, changed: Fields, removed: Iterable[str], ttl: int
+    ) -> None:
+        pending_session.get().writes.append(
+            ("save", (store_id, changed, list(removed), ttl))
+        )
+
+    def delete(self, store_id: str) -> None:
+        pending_session.get().writes.append(("delete", (store_id,)))
+
+
+class LoadedSessionData(dict):
+    """Decoded session data that remembers the encoded fields it came from."""
+
+    def __init__(self, data: Dict[str, Any], encoded: Fields) -> None:
+        super().__init__(data)
+        self.encoded = encoded
+
+
+class TrackedSession(ServerSideSession):
+    """Server-side session that keeps the encoded values it was loaded with."""
+
+    def __init__(self, initial=None, sid=None, permanent=None) -> None:
+        super().__init__(initial, sid=sid, permanent=permanent)
+        self.snapshot: Fields = dict(getattr(initial, "encoded", {}))
+
+
+class KeyedSessionInterface(ServerSideSessionInterface):
+    """Flask-Session interface that writes back only the dirty session keys.
+
+    Every top-level key is encoded on its own. On save, each key is compared
+    with the encoding it had when the session was loaded, so nested lists
+    that were mutated in place are detected without rewriting untouched keys.
+    """
+
+    session_class = TrackedSession
+    ttl = True
+
+    def __init__(self, app: Flask, store: SessionStore, **kwargs: Any) -> None:
+        super().__init__(app, **kwargs)
+        self.store = store
+
+    def _retrieve_session_data(self, store_id: str) -> Optional[dict]:
+        encoded = self.store.load(store_id)
+        if encoded is None:
+            return None
+        decoder = self.serializer.decoder
+        data = {key: decoder.decode(value) for key, value in encoded.items()}
+        return LoadedSessionData(data, encoded)
+
+    def _delete_session(self, store_id: str) -> None:
+        self.store.delete(store_id)
+
+    def _upsert_session(
+        self, session_lifetime: timedelta, session: TrackedSession, store_id: str
+    ) -> None:
+        encoder = self.serializer.encoder
+        encoded = {key: encoder.encode(value) for key, value in session.items()}
+        changed = {
+            key: value
+            for key, value in encoded.items()
+            if session.snapshot.get(key) != value
+        }
+        removed = session.snapshot.keys() - encoded.keys()
+        ttl = max(1, int(session_lifetime.total_seconds()))
+        self.store.save(store_id, changed, removed, ttl)
+        session.snapshot = encoded
+
+
+class TokenSession(SecureCookieSession):
+    """Session decoded from a token, remembering the payload it came from."""
+
+    def __init__(
+        self, initial=None, payload: Optional[bytes] = None, sid: Optional[str] = None
+    ) -> None:
+        super().__init__(initial)
+        self.payload = payload
+        self.sid = sid  # Key in the fallback store, for oversized sessions
+
+
+class TokenSessionInterface(SessionInterface):
+    """Keeps the whole session in a signed, compact cookie token.
+
+    The session is encoded with SessionCodec and signed with the app's
+    SECRET_KEY, so any replica sharing the key serves any request without
+    shared storage. The cookie is only sent again when the encoded session
+    changed.
+
+    Cookies are limited to about 4 KB, so sessions whose token would exceed
+    max_bytes are saved to the fallback store instead, and the cookie only
+    carries their signed key. Once such a session fits again, it moves back
+    into the cookie and is deleted from the store.
+    """
+
+    session_class = TokenSession
+    salt = "bac-session-token"
+
+    def __init__(
+        self, codec: SessionCodec, fallback: SessionStore, max_bytes: int
+    ) -> None:
+        self.codec = codec
+        self.fallback = fallback
+        self.max_bytes = max_bytes
+
+    def get_signer(self, app: Flask) -> Optional[TimestampSigner]:
+        if not app.secret_key:
+            return None
+        return TimestampSigner(
+            app.secret_key,
+            salt=self.salt,
+            key_derivation="hmac",
+            digest_method=hashlib.sha256,
+        )
+
+    def open_session(self, app: Flask, request: Request) -> Optional[TokenSession]:
+        signer = self.get_signer(app)
+        if signer is None:
+            return None
+        value = request.cookies.get(self.get_cookie_name(app))
+        if not value:
+            return self.session_class()
+        max_age = int(app.permanent_session_lifetime.total_seconds())
+        try:
+            token = base64_decode(signer.unsign(value, max_age=max_age))
+        except (BadSignature, ValueError):
+            return self.session_class()
+
+        kind, body = token[:1], token[1:]
+        sid = None
+        if kind == SESSION_REFERENCE:
+            sid = body.decode("ascii", "replace")
+            body = (self.fallback.load(sid) or {}).get("payload")
+            if body is None:
+                return self.session_class()
+        elif kind != SESSION_TOKEN:
+            return self.session_class()
+        try:
+            return self.session_class(self.codec.decode(body), payload=body, sid=sid)
+        except ValueError:
+            return self.session_class()
+
+    def save_session(
+        self, app: Flask, session: TokenSession, response: Response
+    ) -> None:
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if session.payload is not None or session.modified:
+                if session.sid:
+                    self.fallback.delete(session.sid)
+                response.delete_cookie(
+                    name,
+                    domain=domain,
+                    path=path,
+                    secure=self.get_cookie_secure(app),
+                    samesite=self.get_cookie_samesite(app),
+                    httponly=self.get_cookie_httponly(app),
+                )
+            return
+
+        payload = self.codec.encode(session)
+        refresh = session.permanent and app.config["SESSION_REFRESH_EACH_REQUEST"]
+        if payload == session.payload and not refresh:
+            return
+
+        signer = self.get_signer(app)
+        value = signer.sign(base64_encode(SESSION_TOKEN + payload)).decode()
+        if len(value) <= self.max_bytes:
+            if session.sid:
+                self.fallback.delete(session.sid)
+        else:
+            sid = session.sid or secrets.token_urlsafe(32)
+            ttl = max(1, int(app.permanent_session_lifetime.total_seconds()))
+            self.fallback.save(sid, {"payload": payload}, [], ttl)
+            value = signer.sign(
+                base64_encode(SESSION_REFERENCE + sid.encode())
+            ).decode()
+        response.set_cookie(
+            name,
+            value,
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def create_session_store(
+    app: Flask, backend: Optional[str] = None
+) -> Optional[SessionStore]:
+    """Creates the store for a backend, by default the configured one.
+
+    Returns None for filesystem and stateless, which need no SessionStore.
+    """
+    backend = backend or app.config["SESSION_BACKEND"]
+    if backend in ("filesystem", "stateless"):
+        return None
+    if backend == "memory":
+        return MemorySessionStore(app.config["SESSION_MEMORY_MAX_ENTRIES"])
+    if backend == "redis":
+        return RedisSessionStore.from_url(
+            app.config["SESSION_REDIS_URL"],
+            max_connections=app.config["SESSION_REDIS_MAX_CONNECTIONS"],
+        )
+    raise ValueError(f"Session backend must be one of {SESSION_BACKENDS}, got '{backend}'")
+
+
+def create_async_session_store(app: Flask) -> Optional[AsyncSessionStore]:
+    """Creates the async store for the configured backend.
+
+    Returns None for filesystem, and for stateless, whose fallback store may
+    block, so the ASGI entry point runs those requests in worker threads.
+    """
+    backend = app.config["SESSION_BACKEND"]
+    if backend in ("filesystem", "stateless"):
+        return None
+    if backend == "memory":
+        return AsyncMemorySessionStore(
+            MemorySessionStore(app.config["SESSION_MEMORY_MAX_ENTRIES"])
+        )
+    if backend == "redis":
+        return AsyncRedisSessionStore.from_url(
+            app.config["SESSION_REDIS_URL"],
+            max_connections=app.config["SESSION_REDIS_MAX_CONNECTIONS"],
+        )
+    raise ValueError(f"Session backend must be one of {SESSION_BACKENDS}, got '{backend}'")
+
+
+def create_session_file_cache(app: Flask) -> FileSystemCache:
+    """Creates the cache of the filesystem backend, a file per session.
+
+    Its threshold is 0, so writing a session never prunes the directory;
+    the sweeper (see stores/sweeper.py) expires and caps the files instead.
+    """
+    return FileSystemCache(app.config["SESSION_FILE_DIR"], threshold=0, mode=0o600)
+
+
+def init_session(app: Flask, known_drinks: Sequence[FrozenDrink] = ()) -> None:
+    """Installs the session interface selected by SESSION_BACKEND.
+
+    Stateless tokens reference known_drinks by their position, so every
+    replica must be given the same drinks in the same order. Oversized
+    sessions must be readable by every process, so the per-process memory
+    fallback is refused with more than one worker process.
+    """
+    if app.config["SESSION_BACKEND"] == "stateless":
+        fallback = app.config["SESSION_TOKEN_FALLBACK"]
+        if fallback not in TOKEN_FALLBACK_BACKENDS:
+            raise ValueError(
+                f"Session token fallback must be one of {TOKEN_FALLBACK_BACKENDS}, "
+                f"got '{fallback}'"
+            )
+        if fallback == "memory" and app.config["WORKER_PROCESSES"] > 1:
+            raise ValueError(
+                "The memory session token fallback is local to one process, "
+                "use 'redis' with more than one worker process"
+            )
+        app.session_interface = TokenSessionInterface(
+            SessionCodec(known_drinks),
+            create_session_store(app, fallback),
+            app.config["SESSION_TOKEN_MAX_BYTES"],
+        )
+        return
+    store = create_session_store(app)
+    if store is None:
+        app.config["SESSION_CACHELIB"] = create_session_file_cache(app)
+        Session(app)
+        return
+    app.session_interface = KeyedSessionInterface(
+        app, store, permanent=app.config["SESSION_PERMANENT"]
+    )
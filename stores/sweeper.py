@@ -0,0 +1,525 @@
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, BinaryIO, Dict, List, Optional, Sequence, Tuple
+
+from cachelib import FileSystemCache
+from flask import Flask
+
+from models.drink import FrozenDrink
+from models.drink_log import LEGACY_KEYS, DrinkLog
+from models.session_version import SessionVersion
+from monitoring.instrumentation import format_labels, instrumentation
+from monitoring.logs import log_event
+
+logger = logging.getLogger(__name__)
+
+# Expiry time in epoch seconds at the start of every cachelib file, 0 never
+EXPIRY_HEADER = struct.Struct("I")
+# Bookkeeping files of FileSystemCache: its entry count and files being written
+COUNT_FILE: str = hashlib.md5(b"__wz_cache_count").hexdigest()
+TRANSACTION_SUFFIX: str = ".__wz_cache"
+# Sessions written this recently may be used by a request and are not compacted
+COMPACT_MIN_IDLE: int = 10 * 60
+
+
+def open_unused(path: str) -> BinaryIO:
+    """Opens a file for reading without updating its access time.
+
+    The sweeper tells used from idle files by their access time, so its own
+    reads must not count. O_NOATIME is only allowed for the file's owner.
+    """
+    flags = os.O_RDONLY | getattr(os, "O_NOATIME", 0)
+    try:
+        fd = os.open(path, flags)
+    except PermissionError:
+        fd = os.open(path, os.O_RDONLY)
+    return os.fdopen(fd, "rb")
+
+
+def read_expiry(path: str) -> int:
+    """Returns the expiry time of a cachelib file, 1 if it has no header."""
+    with open_unused(path) as f:
+        header = f.read(EXPIRY_HEADER.size)
+    if len(header) < EXPIRY_HEADER.size:
+        # cachelib cannot read it either, so it is as good as expired
+        return 1
+    return EXPIRY_HEADER.unpack(header)[0]
+
+
+@dataclass
+class IndexedFile:
+    size: int  # Bytes on disk
+    mtime_ns: int  # Last write, to detect files written since the refresh
+    last_used: float  # Epoch seconds of the last read or write
+    expires: int  # Epoch seconds from the header, 0 never
+
+
+class FileIndex:
+    """Sizes, ages and expiry times of the files of a FileSystemCache.
+
+    refresh() lists the directory and only reads the header of files that
+    changed since the last refresh, so keeping the index current costs a
+    stat per file. A file was last used when it was last read or written:
+    sessions are only rewritten when they change.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.files: Dict[str, IndexedFile] = {}
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(indexed.size for indexed in self.files.values())
+
+    def refresh(self) -> None:
+        files: Dict[str, IndexedFile] = {}
+        try:
+            entries = os.scandir(self.path)
+        except FileNotFoundError:
+            self.files = files
+            return
+        with entries:
+            for entry in entries:
+                if entry.name == COUNT_FILE or entry.name.endswith(TRANSACTION_SUFFIX):
+                    continue
+                try:
+                    if not entry.is_file(follow_symlinks=False):
+                        continue
+                    stat = entry.stat(follow_symlinks=False)
+                    known = self.files.get(entry.name)
+                    if known is not None and (known.size, known.mtime_ns) == (
+                        stat.st_size,
+                        stat.st_mtime_ns,
+                    ):
+                        expires = known.expires
+                    else:
+                        expires = read_expiry(entry.path)
+                except FileNotFoundError:
+                    # Deleted by a request since it was listed
+                    continue
+                files[entry.name] = IndexedFile(
+                    size=stat.st_size,
+                    mtime_ns=stat.st_mtime_ns,
+                    last_used=max(stat.st_mtime, stat.st_atime),
+                    expires=expires,
+                )
+        self.files = files
+
+    def remove(self, name: str) -> int:
+        """Deletes a file and returns its size, 0 if it changed since the refresh."""
+        indexed = self.files.pop(name)
+        path = os.path.join(self.path, name)
+        try:
+            if os.stat(path).st_mtime_ns != indexed.mtime_ns:
+                # Written by a request in the meantime, so it is in use
+                return 0
+            os.remove(path)
+        except FileNotFoundError:
+            return 0
+        return indexed.size
+
+
+@dataclass
+class SweptDirectory:
+    index: FileIndex
+    max_files: int = 0  # Least recently used files beyond this are deleted, 0 never
+    max_idle: int = 0  # Seconds after which unused files are deleted, 0 never
+    sessions: bool = False  # Whether the files are sessions, which are compacted
+
+
+def empty_state() -> Dict[str, Any]:
+    return {
+        "sweeps": 0,
+        "duration": 0.0,  # Seconds, of all sweeps
+        "last_duration": 0.0,
+        "last_sweep": 0.0,  # Epoch seconds
+        "deleted": {},  # Files per directory and reason
+        "reclaimed": {},  # Bytes per directory and reason
+        "compacted": {},  # Sessions per directory
+        "size": {},  # Files and bytes per directory after the last sweep
+    }
+
+
+def removal_reason(
+    directory: SweptDirectory, indexed: IndexedFile, now: float
+) -> Optional[str]:
+    """Returns why a file is deleted regardless of capacity, or None to keep it."""
+    if indexed.expires and indexed.expires < now:
+        return "expired"
+    if directory.max_idle and indexed.last_used < now - directory.max_idle:
+        return "idle"
+    return None
+
+
+class SessionSweeper:
+    """Background expiry, capping and compaction of the cachelib file stores.
+
+    FileSystemCache prunes inside set() once it holds threshold files, i.e.
+    in whichever request writes next, and scans the whole directory to do
+    so. Session files are kept for PERMANENT_SESSION_LIFETIME even though
+    SESSION_PERMANENT is off and the cookies end with the browser. The
+    session, cache and history archive stores are therefore created with
+    threshold=0, and a thread sweeps them every interval seconds instead:
+
+    - files past their expiry time, and sessions not used for max_idle
+      seconds, are deleted,
+    - the least recently used files beyond max_files are deleted,
+    - sessions larger than compact_bytes that have been idle for a while
+      get their history trimmed to compact_entries (see
+      DrinkHistory.compact), the older entries going to the history archive
+      where the per-drink counts already account for them, and their cached
+      BAC curve dropped.
+
+    Every decision is made on a FileIndex of the directory, refreshed at the
+    start of the sweep, and files written by a request since are left alone.
+
+    Each worker runs the thread, but the sweeps of a pod are serialized by a
+    lock next to state_file and skipped if the last one, in any process, is
+    less than half an interval ago. The totals in state_file are served by
+    every worker at /metrics. Threads do not survive a fork, so with gunicorn
+    --preload only the master sweeps.
+    """
+
+    def __init__(self) -> None:
+        self.interval = 0.0
+        self.state_file = "/tmp/bac_sweeper.json"
+        self.directories: Dict[str, SweptDirectory] = {}
+        self.compact_bytes = 0
+        self.compact_entries = 50
+        self.known_drinks: List[FrozenDrink] = []
+        self.archive: Any = None
+        self.history_chunk_size = 100
+        self.history_retention: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def init_app(
+        self,
+        app: Flask,
+        archive: Any = None,
+        known_drinks: Sequence[FrozenDrink] = (),
+    ) -> None:
+        """Reads the configuration, adds the metrics and starts the thread.
+
+        Called by create_app, so that importing main starts no thread.
+
+        Compacted sessions archive their history in archive and intern the
+        drinks of legacy sessions from known_drinks, like requests do.
+        """
+        self.interval = app.config["SWEEP_INTERVAL"]
+        self.state_file = app.config["SWEEP_STATE_FILE"]
+        self.compact_bytes = app.config["SWEEP_COMPACT_BYTES"]
+        self.compact_entries = app.config["SWEEP_COMPACT_ENTRIES"]
+        self.known_drinks = list(known_drinks)
+        self.archive = archive
+        self.history_chunk_size = app.config["HISTORY_CHUNK_SIZE"]
+        retention = app.config["HISTORY_RETENTION_HOURS"] * 60 * 60
+        self.history_retention = retention or None
+
+        self.directories = {
+            "cache": SweptDirectory(
+                FileIndex(app.config["CACHE_DIR"]),
+                max_files=app.config["CACHE_MAX_FILES"],
+            )
+        }
+        if app.config["SESSION_BACKEND"] == "filesystem":
+            self.directories["sessions"] = SweptDirectory(
+                FileIndex(app.config["SESSION_FILE_DIR"]),
+                max_files=app.config["SESSION_FILE_MAX"],
+                max_idle=app.config["SWEEP_IDLE_HOURS"] * 60 * 60,
+                sessions=True,
+            )
+        if app.config["HISTORY_ARCHIVE_BACKEND"] == "filesystem":
+            # Chunks are only deleted once expired: they belong to sessions
+            # that may still page to them
+            self.directories["history"] = SweptDirectory(
+                FileIndex(app.config["HISTORY_ARCHIVE_DIR"])
+            )
+
+        if self.render_metrics not in instrumentation.collectors:
+            instrumentation.collectors.append(self.render_metrics)
+        if self.interval > 0:
+            self.start()
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="session-sweeper")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stops the thread, waiting for a running sweep to finish."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.sweep()
+            except Exception:
+                logger.exception("Session sweep failed")
+
+    def sweep(
+        self, now: Optional[float] = None, force: bool = False
+    ) -> Optional[Dict[str, Any]]:
+        """Sweeps every directory once and returns the totals so far.
+
+        Returns None without sweeping while another process of the pod
+        sweeps, or, unless force, within half an interval of the last sweep.
+        """
+        now = time.time() if now is None else now
+        lock_path = self.state_file + ".lock"
+        os.makedirs(os.path.dirname(lock_path) or ".", exist_ok=True)
+        with open(lock_path, "a") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return None
+            state = self.read_state()
+            if not force and now - state["last_sweep"] < self.interval / 2:
+                return None
+
+            start = time.perf_counter()
+            deleted = reclaimed = 0
+            for name, directory in self.directories.items():
+                files, saved = self._sweep_directory(name, directory, now, state)
+                deleted += files
+                reclaimed += saved
+            duration = time.perf_counter() - start
+
+            state["sweeps"] += 1
+            state["duration"] += duration
+            state["last_duration"] = duration
+            state["last_sweep"] = now
+            self._write_state(state)
+
+        log_event(
+            logger,
+            "sweep",
+            "Swept %d files and reclaimed %d bytes in %.3f seconds",
+            deleted,
+            reclaimed,
+            duration,
+            deleted=deleted,
+            reclaimed_bytes=reclaimed,
+            duration=duration,
+        )
+        return state
+
+    def _sweep_directory(
+        self, name: str, directory: SweptDirectory, now: float, state: Dict[str, Any]
+    ) -> Tuple[int, int]:
+        """Sweeps one directory, returning the files deleted and bytes reclaimed."""
+        index = directory.index
+        index.refresh()
+        deleted = state["deleted"].setdefault(name, {})
+        reclaimed = state["reclaimed"].setdefault(name, {})
+        files = saved = 0
+
+        def remove(file_name: str, reason: str) -> None:
+            nonlocal files, saved
+            size = index.remove(file_name)
+            if size:
+                files += 1
+                saved += size
+                deleted[reason] = deleted.get(reason, 0) + 1
+                reclaimed[reason] = reclaimed.get(reason, 0) + size
+
+        for file_name, indexed in list(index.files.items()):
+            reason = removal_reason(directory, indexed, now)
+            if reason:
+                remove(file_name, reason)
+
+        if directory.max_files and len(index) > directory.max_files:
+            by_use = sorted(index.files, key=lambda key: index.files[key].last_used)
+            for file_name in by_use[: len(index) - directory.max_files]:
+                remove(file_name, "capacity")
+
+        if directory.sessions and self.compact_bytes:
+            saved += self._compact_directory(name, index, now, state)
+
+        state["size"][name] = [len(index), index.total_bytes]
+        return files, saved
+
+    def _compact_directory(
+        self, name: str, index: FileIndex, now: float, state: Dict[str, Any]
+    ) -> int:
+        """Compacts the large idle sessions and returns the bytes saved."""
+        reclaimed = state["reclaimed"][name]
+        saved = 0
+        for file_name, indexed in list(index.files.items()):
+            if (
+                indexed.size > self.compact_bytes
+                and indexed.last_used < now - COMPACT_MIN_IDLE
+            ):
+                size = self._compact_file(index, file_name, int(now))
+                if size:
+                    saved += size
+                    reclaimed["compacted"] = reclaimed.get("compacted", 0) + size
+                    state["compacted"][name] = state["compacted"].get(name, 0) + 1
+        return saved
+
+    def _compact_file(self, index: FileIndex, file_name: str, now: int) -> int:
+        """Compacts a session file in place and returns the bytes saved.
+
+        The file is replaced atomically, with its times kept so that it
+        ages as before, unless a request wrote it while it was compacted.
+        """
+        indexed = index.files[file_name]
+        path = os.path.join(index.path, file_name)
+        try:
+            with open_unused(path) as f:
+                header = f.read(EXPIRY_HEADER.size)
+                data = FileSystemCache.serializer.load(f)
+        except FileNotFoundError:
+            return 0
+        except (EOFError, ValueError) as e:
+            logger.warning("Could not load session file %s: %s", path, e)
+            return 0
+        if not isinstance(data, dict) or not self.compact_session(data, now):
+            return 0
+
+        fd, temporary = tempfile.mkstemp(suffix=TRANSACTION_SUFFIX, dir=index.path)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                FileSystemCache.serializer.dump(data, f)
+            stat = os.stat(path)
+            if stat.st_mtime_ns != indexed.mtime_ns:
+                return 0
+            os.utime(temporary, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            os.replace(temporary, path)
+        except FileNotFoundError:
+            return 0
+        finally:
+            if os.path.exists(temporary):
+                os.remove(temporary)
+
+        size = os.stat(path).st_size
+        index.files[file_name] = IndexedFile(
+            size=size,
+            mtime_ns=indexed.mtime_ns,
+            last_used=indexed.last_used,
+            expires=indexed.expires,
+        )
+        return max(0, indexed.size - size)
+
+    def compact_session(self, data: Dict[str, Any], now: int) -> bool:
+        """Compacts the data of a session, returning whether it changed.
+
+        Legacy sessions are migrated, the history is trimmed to
+        compact_entries and the cached BAC curve, which is rebuilt on
+        demand, is dropped.
+        """
+        changed = any(key in data for key in LEGACY_KEYS)
+        log = DrinkLog(
+            data,
+            known_drinks=self.known_drinks,
+            archive=self.archive,
+            history_chunk_size=self.history_chunk_size,
+            history_retention=self.history_retention,
+        )
+        if log.entries.compact(now, self.compact_entries):
+            changed = True
+            version = SessionVersion(data)
+            if version.value is not None:
+                # Pages rendered with the trimmed entries are outdated
+                version.bump()
+        if data.pop("curve", None) is not None:
+            changed = True
+        return changed
+
+    def read_state(self) -> Dict[str, Any]:
+        """Returns the totals of the sweeps so far, by any process of the pod."""
+        try:
+            with open(self.state_file) as f:
+                stored = json.load(f)
+        except (FileNotFoundError, ValueError):
+            stored = {}
+        return dict(empty_state(), **stored)
+
+    def _write_state(self, state: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.state_file) or "."
+        fd, temporary = tempfile.mkstemp(suffix=".tmp", dir=directory)
+        with os.fdopen(fd, "w") as f:
+            json.dump(state, f)
+        os.replace(temporary, self.state_file)
+
+    def render_metrics(self) -> List[str]:
+        """Returns the sweep totals in the Prometheus text format."""
+        state = self.read_state()
+        lines = [
+            "# HELP bac_sweep_duration_seconds Time spent sweeping the file stores.",
+            "# TYPE bac_sweep_duration_seconds summary",
+            f"bac_sweep_duration_seconds_sum {state['duration']}",
+            f"bac_sweep_duration_seconds_count {state['sweeps']}",
+            "# HELP bac_sweep_last_duration_seconds Duration of the last sweep.",
+            "# TYPE bac_sweep_last_duration_seconds gauge",
+            f"bac_sweep_last_duration_seconds {state['last_duration']}",
+        ]
+        lines.extend(
+            render_series(
+                "bac_sweep_deleted_files_total",
+                "counter",
+                "Files deleted by the sweeper.",
+                state["deleted"],
+            )
+        )
+        lines.extend(
+            render_series(
+                "bac_sweep_reclaimed_bytes_total",
+                "counter",
+                "Bytes freed by deleting or compacting files.",
+                state["reclaimed"],
+            )
+        )
+        lines.extend(
+            [
+                "# HELP bac_sweep_compacted_sessions_total Sessions compacted.",
+                "# TYPE bac_sweep_compacted_sessions_total counter",
+            ]
+        )
+        for directory, count in sorted(state["compacted"].items()):
+            labels = format_labels((("directory", directory),))
+            lines.append(f"bac_sweep_compacted_sessions_total{labels} {count}")
+        for metric, position, help in (
+            ("bac_swept_files", 0, "Files in a directory after the last sweep."),
+            ("bac_swept_bytes", 1, "Bytes in a directory after the last sweep."),
+        ):
+            lines.append(f"# HELP {metric} {help}")
+            lines.append(f"# TYPE {metric} gauge")
+            for directory, size in sorted(state["size"].items()):
+                labels = format_labels((("directory", directory),))
+                lines.append(f"{metric}{labels} {size[position]}")
+        return lines
+
+
+def render_series(
+    name: str, kind: str, help: str, values: Dict[str, Dict[str, int]]
+) -> List[str]:
+    """Renders a metric with a series per directory and reason."""
+    lines = [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+    for directory, reasons in sorted(values.items()):
+        for reason, value in sorted(reasons.items()):
+            labels = format_labels((("directory", directory), ("reason", reason)))
+            lines.append(f"{name}{labels} {value}")
+    return lines
+
+
+# Shared instance, configured by init_app
+session_sweeper = SessionSweeper()
@@ -0,0 +1,53 @@
+import random
+import unittest
+
+from main import DRINKS, calculate_total_alcohol_in_grams
+from models.aggregate import aggregate_drinks
+from models.drink import FrozenDrink
+from models.drink_log import DrinkLog
+
+
+def count_summary(drinks):
+    """Returns the summary the way it was built with list.count."""
+    drinks = sorted(drinks, key=lambda x: x.volume_in_liters(), reverse=True)
+    return {str(drink): drinks.count(drink) for drink in drinks}
+
+
+class TestDrinkAggregate(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(7)
+        custom = FrozenDrink(name="Mojito", volume=250, unit="ml", alcohol=12)
+        self.drinks = [rng.choice(DRINKS + [custom]) for _ in range(500)]
+
+    def test_matches_list_count(self):
+        """Test that one pass matches the list.count summary and total."""
+        aggregate = aggregate_drinks(self.drinks)
+        self.assertEqual(aggregate.summary(), count_summary(self.drinks))
+        self.assertEqual(list(aggregate.summary()), list(count_summary(self.drinks)))
+        self.assertEqual(
+            aggregate.total_grams, calculate_total_alcohol_in_grams(self.drinks)
+        )
+        self.assertEqual(aggregate.count, len(self.drinks))
+
+    def test_drink_log_is_incremental(self):
+        """Test that the session aggregate follows adds and removes."""
+        log = DrinkLog({})
+        for timestamp, drink in enumerate(self.drinks):
+            log.add(drink, timestamp)
+        remaining = list(self.drinks)
+        for drink in self.drinks[::3]:
+            self.assertTrue(log.remove(drink))
+            remaining.remove(drink)
+
+        aggregate = log.aggregate()
+        self.assertEqual(aggregate.summary(), count_summary(remaining))
+        self.assertEqual(
+            aggregate.total_grams, calculate_total_alcohol_in_grams(remaining)
+        )
+        volumes = [drink.volume_in_liters() for drink in log.selected_drinks()]
+        self.assertEqual(volumes, sorted(volumes, reverse=True))
+        self.assertEqual(len(volumes), len(remaining))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import pytest
+
+from main import DRINKS, app
+
+JSON = {"Accept": "application/json"}
+
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        yield client
+
+
+def test_list_drinks(client):
+    """Test that the predefined drinks are listed."""
+    response = client.get("/api/v1/drinks")
+    assert response.status_code == 200
+    drinks = [drink["drink"] for drink in response.get_json()["drinks"]]
+    assert str(DRINKS[0]) in drinks
+
+
+def test_add_and_remove_session_drink(client):
+    """Test that add and remove return the updated aggregate and BAC."""
+    client.post(
+        "/api/v1/calculate", json={"weight": 80, "gender": "male", "age": 30}
+    )
+    response = client.post("/api/v1/session/drinks", json={"drink": str(DRINKS[1])})
+    assert response.status_code == 201
+    state = response.get_json()
+    assert state["count"] == 1
+    assert state["total_grams"] == DRINKS[1].alcohol_grams()
+    assert state["result"]["bac"] > 0
+
+    response = client.post(
+        "/api/v1/session/drinks",
+        json={"name": "Mojito", "volume": 250, "alcohol": 12},
+    )
+    assert response.get_json()["count"] == 2
+
+    response = client.delete(
+        "/api/v1/session/drinks", json={"drink": str(DRINKS[1])}
+    )
+    assert response.status_code == 200
+    assert [d["name"] for d in response.get_json()["drinks"]] == ["Mojito"]
+
+    response = client.delete(
+        "/api/v1/session/drinks", json={"drink": str(DRINKS[1])}
+    )
+    assert response.status_code == 404
+
+
+def test_invalid_custom_drink(client):
+    """Test that invalid custom drinks are rejected."""
+    response = client.post("/api/v1/session/drinks", json={"name": "X"})
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+
+    response = client.post(
+        "/api/v1/session/drinks", json={"name": "", "volume": 250, "alcohol": 12}
+    )
+    assert response.status_code == 400
+
+
+def test_calculate_and_history(client):
+    """Test the calculation and history endpoints."""
+    response = client.post("/api/v1/calculate", json={"weight": 70})
+    assert response.status_code == 422
+
+    client.post("/api/v1/session/drinks", json={"drink": str(DRINKS[0])})
+    response = client.post(
+        "/api/v1/calculate", json={"weight": 70, "gender": "female", "age": 25}
+    )
+    result = response.get_json()
+    assert result["bac"] > 0
+    assert result["drinks"] == {str(DRINKS[0]): 1}
+    assert result["curve"]
+
+    history = client.get("/api/v1/history").get_json()["history"]
+    assert history[0]["drink"] == str(DRINKS[0])
+
+    assert client.delete("/api/v1/history").status_code == 200
+    assert client.get("/api/v1/history").get_json()["history"] == []
+
+
+def test_form_routes_negotiate_json(client):
+    """Test that form routes answer with JSON instead of a redirect."""
+    response = client.post(
+        "/add_drink", data={"drink": str(DRINKS[2])}, headers=JSON
+    )
+    assert response.status_code == 200
+    assert response.get_json()["drinks"][0]["count"] == 1
+
+    response = client.post("/add_drink", data={"drink": "Wasser"}, headers=JSON)
+    assert response.status_code == 404
+
+    response = client.post("/add_drink", data={"drink": str(DRINKS[2])})
+    assert response.status_code == 302
+
+    response = client.post(
+        "/calculate", data={"weight": "70", "age": "abc"}, headers=JSON
+    )
+    assert response.status_code == 400
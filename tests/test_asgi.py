@@ -0,0 +1,168 @@
+import asyncio
+import json
+import threading
+import unittest
+from urllib.parse import urlencode
+
+from flask import Flask, request
+
+from asgi import AsyncApp
+from main import DRINKS, app
+from stores.session import (
+    AsyncMemorySessionStore,
+    AsyncRedisSessionStore,
+    MemorySessionStore,
+)
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class AsgiClient:
+    """Calls an ASGI app directly and keeps the session cookie."""
+
+    def __init__(self, asgi_app):
+        self.asgi_app = asgi_app
+        self.cookie = None
+
+    def request(self, method, path, form=None, json_body=None, headers=()):
+        headers = list(headers)
+        body = b""
+        if form is not None:
+            body = urlencode(form).encode()
+            headers.append(
+                (b"content-type", b"application/x-www-form-urlencoded")
+            )
+        if json_body is not None:
+            body = json.dumps(json_body).encode()
+            headers.append((b"content-type", b"application/json"))
+        if self.cookie:
+            headers.append((b"cookie", self.cookie))
+        return asyncio.run(self._request(method, path, body, headers))
+
+    async def _request(self, method, path, body, headers):
+        messages = []
+
+        async def receive():
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        async def send(message):
+            messages.append(message)
+
+        scope = {
+            "type": "http",
+            "method": method,
+            "path": path,
+            "query_string": b"",
+            "headers": headers,
+        }
+        await self.asgi_app(scope, receive, send)
+        start, *bodies = messages
+        assert not bodies[-1].get("more_body")
+        response_headers = dict(start["headers"])
+        if b"set-cookie" in response_headers:
+            self.cookie = response_headers[b"set-cookie"].split(b";")[0]
+        return (
+            start["status"],
+            response_headers,
+            b"".join(message["body"] for message in bodies),
+        )
+
+
+class AsgiTestCase(unittest.TestCase):
+    def setUp(self):
+        self.original_interface = app.session_interface
+
+    def tearDown(self):
+        app.session_interface = self.original_interface
+
+    def check_session_round_trip(self, store):
+        client = AsgiClient(AsyncApp(app, store))
+        status, headers, _ = client.request(
+            "POST", "/add_drink", form={"drink": str(DRINKS[0])}
+        )
+        self.assertEqual(status, 302)
+        status, _, body = client.request(
+            "POST", "/api/v1/session/drinks", json_body={"drink": str(DRINKS[0])}
+        )
+        self.assertEqual(status, 201)
+        self.assertEqual(json.loads(body)["count"], 2)
+        _, _, body = client.request("GET", "/history")
+        self.assertIn(str(DRINKS[0]), body.decode())
+
+
+class TestAsyncApp(AsgiTestCase):
+    def test_memory_session(self):
+        """Test that the session survives requests with the async memory store."""
+        self.check_session_round_trip(AsyncMemorySessionStore(MemorySessionStore()))
+
+    @unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+    def test_redis_session(self):
+        """Test that the session survives requests with async Redis."""
+        self.check_session_round_trip(AsyncRedisSessionStore(fakeredis.FakeAsyncRedis()))
+
+    def test_threaded_fallback(self):
+        """Test that the filesystem backend is served from a worker thread."""
+        client = AsgiClient(AsyncApp(app, None))
+        status, _, body = client.request("GET", "/health-check")
+        self.assertEqual((status, body), (200, b"OK"))
+
+    def test_streamed_request_and_response(self):
+        """Test that bodies are streamed and the view runs off the event loop."""
+        stream_app = Flask(__name__)
+        threads = []
+
+        @stream_app.post("/echo")
+        def echo():
+            threads.append(threading.current_thread())
+            stream = request.stream
+
+            def generate():
+                while chunk := stream.read(4):
+                    yield chunk.upper()
+
+            return stream_app.response_class(generate())
+
+        received = iter([b"abcd", b"efgh", b"ij"])
+        sent = []
+
+        async def receive():
+            body = next(received)
+            more_body = body != b"ij"
+            return {"type": "http.request", "body": body, "more_body": more_body}
+
+        async def send(message):
+            sent.append(message)
+
+        scope = {"type": "http", "method": "POST", "path": "/echo", "headers": []}
+        asyncio.run(AsyncApp(stream_app, None)(scope, receive, send))
+
+        self.assertIsNot(threads[0], threading.main_thread())
+        self.assertEqual(sent[0]["status"], 200)
+        self.assertEqual(
+            [(m["body"], m.get("more_body", False)) for m in sent[1:]],
+            [(b"ABCD", True), (b"EFGH", True), (b"IJ", True), (b"", False)],
+        )
+
+    def test_lifespan(self):
+        """Test the lifespan startup and shutdown handshake."""
+        messages = iter([{"type": "lifespan.startup"}, {"type": "lifespan.shutdown"}])
+        sent = []
+
+        async def receive():
+            return next(messages)
+
+        async def send(message):
+            sent.append(message["type"])
+
+        store = AsyncMemorySessionStore(MemorySessionStore())
+        asyncio.run(AsyncApp(app, store)({"type": "lifespan"}, receive, send))
+        self.assertEqual(
+            sent, ["lifespan.startup.complete", "lifespan.shutdown.complete"]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,184 @@
+import random
+import unittest
+
+import numpy as np
+
+from engine.batch import calculate_batch, round_half_even
+from main import (
+    DRINKS,
+    app,
+    calculate_adjusted_metabolism_rate,
+    calculate_bac,
+    calculate_time_to_sober,
+    calculate_total_alcohol_in_grams,
+)
+
+
+def random_profiles(size, seed=42):
+    """Builds reproducible random profiles with drinks from DRINKS."""
+    rng = random.Random(seed)
+    profiles = []
+    for _ in range(size):
+        profiles.append(
+            {
+                "weight": round(rng.uniform(5, 500), 1),
+                "gender": rng.choice(["male", "female", "unknown"]),
+                "age": rng.randint(0, 150),
+                "drinks": [rng.choice(DRINKS) for _ in range(rng.randint(0, 12))],
+            }
+        )
+    return profiles
+
+
+def scalar_result(profile):
+    """Calculates a profile with the scalar helper functions."""
+    total_alcohol = calculate_total_alcohol_in_grams(profile["drinks"])
+    bac = calculate_bac(
+        weight=profile["weight"],
+        gender=profile["gender"],
+        age=profile["age"],
+        total_alcohol=total_alcohol,
+    )
+    time_to_sober = calculate_time_to_sober(
+        bac=bac, weight=profile["weight"], age=profile["age"]
+    )
+    return total_alcohol, bac, time_to_sober
+
+
+class TestBatchParity(unittest.TestCase):
+    def test_round_half_even_matches_builtin(self):
+        """Test vectorized rounding against the builtin round."""
+        values = np.array([0.995, 0.125, 2.675, 1.005, 0.0, 12.345, 99.995])
+        for ndigits in (2, 3):
+            expected = [round(float(value), ndigits) for value in values]
+            self.assertEqual(round_half_even(values, ndigits).tolist(), expected)
+
+    def test_batch_matches_scalar_functions(self):
+        """Test every batch column against the scalar helpers."""
+        profiles = random_profiles(2000)
+        drink_grams = [
+            drink.alcohol_grams() for profile in profiles for drink in profile["drinks"]
+        ]
+        owners = [
+            owner
+            for owner, profile in enumerate(profiles)
+            for _ in profile["drinks"]
+        ]
+
+        result = calculate_batch(
+            [profile["weight"] for profile in profiles],
+            [profile["gender"] for profile in profiles],
+            [profile["age"] for profile in profiles],
+            drink_grams,
+            owners,
+        )
+
+        for index, profile in enumerate(profiles):
+            self.assertEqual(
+                (
+                    result.total_alcohol[index],
+                    result.bac[index],
+                    result.time_to_sober[index],
+                ),
+                scalar_result(profile),
+                f"Mismatch for profile {profile}",
+            )
+
+    def test_batch_full_age_and_weight_domain(self):
+        """Test metabolism rates for every integer age and weight."""
+        ages, weights = np.meshgrid(np.arange(0, 151), np.arange(3, 501))
+        ages, weights = ages.ravel(), weights.ravel().astype(float)
+        result = calculate_batch(
+            weights, ["male"] * len(ages), ages, [10.0] * len(ages), range(len(ages))
+        )
+        for index in range(0, len(ages), 97):
+            age, weight = int(ages[index]), float(weights[index])
+            bac = calculate_bac(weight, "male", age, 10.0)
+            self.assertEqual(result.bac[index], bac)
+            self.assertEqual(
+                result.time_to_sober[index],
+                round(bac / calculate_adjusted_metabolism_rate(age, weight), 2),
+            )
+
+    def test_batch_rejects_invalid_columns(self):
+        """Test validation of batch columns."""
+        with self.assertRaises(ValueError):
+            calculate_batch([70, 80], ["male"], [20, 30], [], [])
+        with self.assertRaises(ValueError):
+            calculate_batch([0], ["male"], [20], [], [])
+        with self.assertRaises(ValueError):
+            calculate_batch([1], ["male"], [20], [], [])
+        with self.assertRaises(ValueError):
+            calculate_batch([70], ["male"], [200], [], [])
+        with self.assertRaises(ValueError):
+            calculate_batch([70], ["male"], [20], [10.0], [1])
+        for ages in ([30.7], [True], [30, True], ["30"]):
+            with self.subTest(ages=ages), self.assertRaises(ValueError):
+                calculate_batch([70] * len(ages), ["male"] * len(ages), ages, [], [])
+
+
+class TestBatchEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_batch_endpoint(self):
+        """Test the JSON batch endpoint against the scalar helpers."""
+        profiles = random_profiles(50, seed=7)
+        response = self.client.post(
+            "/api/calculate/batch",
+            json={
+                "weight": [profile["weight"] for profile in profiles],
+                "gender": [profile["gender"] for profile in profiles],
+                "age": [profile["age"] for profile in profiles],
+                "drinks": [
+                    [str(drink) for drink in profile["drinks"]] for profile in profiles
+                ],
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        for index, profile in enumerate(profiles):
+            self.assertEqual(
+                (
+                    data["total_alcohol"][index],
+                    data["bac"][index],
+                    data["time_to_sober"][index],
+                ),
+                scalar_result(profile),
+            )
+
+    def test_batch_endpoint_custom_drink(self):
+        """Test custom drink objects in the batch endpoint."""
+        response = self.client.post(
+            "/api/calculate/batch",
+            json={
+                "weight": [70],
+                "gender": ["male"],
+                "age": [25],
+                "drinks": [[{"name": "Mojito", "volume": 250, "unit": "ml", "alcohol": 12}]],
+            },
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(response.get_json()["bac"][0], 0)
+
+    def test_batch_endpoint_invalid_input(self):
+        """Test error responses of the batch endpoint."""
+        response = self.client.post("/api/calculate/batch", data="not json")
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(
+            "/api/calculate/batch",
+            json={"weight": [70], "gender": ["male"], "age": [25], "drinks": [["Wasser"]]},
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("error", response.get_json())
+
+        response = self.client.post(
+            "/api/calculate/batch",
+            json={"weight": [80, 80], "gender": ["male", "male"], "age": [30.7, True]},
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,22 @@
+from benchmarks.bench_suite import compare, measure
+
+
+def test_compare_flags_regressions():
+    """Test that only medians beyond the threshold are reported."""
+    baseline = {"a": {"median_us": 100.0}, "b": {"median_us": 100.0}}
+    results = {
+        "a": {"median_us": 120.0},
+        "b": {"median_us": 130.0},
+        "c": {"median_us": 1000.0},
+    }
+    regressions = compare(results, baseline, threshold=0.25)
+    assert len(regressions) == 1
+    assert regressions[0].startswith("b:")
+    assert compare(results, baseline, threshold=0.25, min_delta=50) == []
+
+
+def test_measure_reports_statistics():
+    """Test the shape of a benchmark result."""
+    result = measure(lambda: None, rounds=3, inner=10)
+    assert result["rounds"] == 3
+    assert result["min_us"] <= result["median_us"]
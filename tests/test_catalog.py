@@ -0,0 +1,37 @@
+import unittest
+
+from main import DRINK_CATALOG, DRINKS
+from models.catalog import DrinkCatalog
+from models.drink import Drink
+from models.drink_log import INDEX_KEY, DrinkLog
+
+
+class TestDrinkCatalog(unittest.TestCase):
+    def test_resolve_predefined(self):
+        """Test resolving predefined drinks by display string."""
+        for drink in DRINKS:
+            self.assertIs(DRINK_CATALOG.resolve(str(drink)), drink)
+        self.assertIsNone(DRINK_CATALOG.resolve("Wasser (0.5 L, 0%)"))
+        self.assertEqual(len(DRINK_CATALOG), len(DRINKS))
+
+    def test_resolve_session_drink(self):
+        """Test resolving custom drinks through the session index."""
+        custom = Drink(name="Mojito", volume=250, unit="ml", alcohol=12)
+        log = DrinkLog({})
+        log.add(custom, 0)
+
+        catalog = DrinkCatalog(DRINKS)
+        self.assertIsNone(catalog.resolve(str(custom)))
+        self.assertEqual(catalog.resolve(str(custom), log), custom)
+        self.assertEqual(log.store[INDEX_KEY], {str(custom): 0})
+
+    def test_index_rebuilt_for_old_sessions(self):
+        """Test that sessions without an index get one on first lookup."""
+        store = {"drink_catalog": [["Bier", 0.5, "L", 5]]}
+        log = DrinkLog(store)
+        self.assertEqual(log.lookup("Bier (0.5 L, 5%)"), 0)
+        self.assertIn(INDEX_KEY, store)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,136 @@
+import unittest
+
+from engine.constants import ABSORPTION_HOURS
+from engine.curve import BacCurve, downsample
+from main import DRINKS, app, create_bac_curve
+from models.drink_log import DrinkLog
+from models.user import User
+
+DRINK_TIMES = [(0, 30.0), (1800, 20.0), (3600 * 3, 40.0), (3600 * 12, 10.0)]
+
+
+def build_curve(drinks):
+    curve = BacCurve(bac_per_gram=0.01, elimination_rate=0.15)
+    for timestamp, grams in drinks:
+        curve.add_drink(timestamp, grams)
+    return curve
+
+
+class TestBacCurve(unittest.TestCase):
+    def test_single_drink(self):
+        """Test absorption and elimination of a single drink."""
+        curve = build_curve([(1000, 30.0)])
+        points = curve.compact()
+        self.assertEqual(points[0], [0.0, 0.0])
+        self.assertEqual(points[1], [ABSORPTION_HOURS, 0.225])
+        self.assertEqual(points[-1], [2.0, 0.0])
+
+    def test_incremental_matches_rebuild(self):
+        """Test that extending a restored curve equals building it at once."""
+        curve = build_curve(DRINK_TIMES[:1])
+        for drink in DRINK_TIMES[1:]:
+            curve.points()
+            curve = BacCurve.from_state(curve.to_state())
+            curve.add_drink(*drink)
+        self.assertEqual(curve.compact(), build_curve(DRINK_TIMES).compact())
+        self.assertEqual(curve.drinks, len(DRINK_TIMES))
+
+    def test_curve_returns_to_zero(self):
+        """Test that the curve ends sober and never goes negative."""
+        points = build_curve(DRINK_TIMES).points()
+        self.assertEqual(points[-1][1], 0.0)
+        self.assertTrue(all(bac >= 0 for _, bac in points))
+        self.assertEqual([hours for hours, _ in points], sorted(hours for hours, _ in points))
+
+    def test_rejects_out_of_order_drinks(self):
+        """Test that drinks must be added chronologically."""
+        curve = build_curve([(3600, 10.0)])
+        with self.assertRaises(ValueError):
+            curve.add_drink(0, 10.0)
+
+    def test_time_below(self):
+        """Test the legal limit crossing time."""
+        curve = build_curve([(0, 100.0)])
+        peak = curve.peak()
+        self.assertAlmostEqual(peak, 0.925)
+        self.assertAlmostEqual(curve.time_below(0.5), ABSORPTION_HOURS + (peak - 0.5) / 0.15)
+        self.assertIsNone(build_curve([(0, 10.0)]).time_below(0.5))
+
+    def test_create_bac_curve_profile(self):
+        """Test that the curve peak matches the unrounded BAC formula."""
+        user = User(name="User", weight=70, gender="male", age=20)
+        curve = create_bac_curve(user)
+        curve.add_drink(0, 40.0)
+        self.assertAlmostEqual(
+            curve.peak(), 40.0 * 0.85 / (70 * 0.7) - ABSORPTION_HOURS * 0.15
+        )
+
+
+class TestCurveRoutes(unittest.TestCase):
+    def test_calculate_caches_and_extends_curve(self):
+        """Test that adding a drink extends the cached curve."""
+        with app.test_client() as client:
+            client.post("/add_drink", data={"drink": str(DRINKS[0])})
+            response = client.post(
+                "/calculate", data={"weight": "70", "gender": "male", "age": "25"}
+            )
+            self.assertEqual(response.status_code, 200)
+            self.assertIn(b'data-curve-url="/api/curve"', response.data)
+            self.assertNotIn(b"cdn.jsdelivr.net", response.data)
+
+            client.post("/add_drink", data={"drink": str(DRINKS[1])})
+            with client.session_transaction() as session:
+                self.assertEqual(session["curve"]["state"]["drinks"], 2)
+
+            client.post("/remove_drink", data={"drink": str(DRINKS[1])})
+            with client.session_transaction() as session:
+                self.assertNotIn("curve", session)
+
+    def test_api_curve(self):
+        """Test that /api/curve serves the downsampled curve and crossing time."""
+        with app.test_client() as client:
+            response = client.get("/api/curve")
+            self.assertEqual(response.status_code, 422)
+
+            with client.session_transaction() as session:
+                log = DrinkLog(session)
+                for i in range(60):
+                    log.add(DRINKS[i % 3], 1_700_000_000 + i * 900)
+            client.post(
+                "/calculate", data={"weight": "70", "gender": "male", "age": "25"}
+            )
+            response = client.get("/api/curve?points=10")
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()
+
+            with client.session_transaction() as session:
+                curve = BacCurve.from_state(session["curve"]["state"])
+            self.assertEqual(len(data["points"]), 10)
+            self.assertEqual(data["points"][0], curve.compact()[0])
+            self.assertEqual(data["points"][-1], curve.compact()[-1])
+            self.assertEqual(data["hours"], data["points"][-1][0])
+            self.assertEqual(data["peak"], round(curve.peak(), 3))
+            self.assertEqual(data["time_below_limit"], round(curve.time_below(), 2))
+
+
+class TestDownsample(unittest.TestCase):
+    def test_keeps_short_curves(self):
+        """Test that curves with fewer points than the target are unchanged."""
+        points = build_curve(DRINK_TIMES).points()
+        self.assertEqual(downsample(points, len(points)), points)
+        self.assertEqual(downsample(points, 2), [points[0], points[-1]])
+
+    def test_reduces_to_target_and_keeps_peak(self):
+        """Test that the downsampled curve keeps its ends and its peak."""
+        points = [[i / 10, 0.0] for i in range(500)]
+        points[137][1] = 1.0
+        sampled = downsample(points, 20)
+        self.assertEqual(len(sampled), 20)
+        self.assertEqual(sampled[0], points[0])
+        self.assertEqual(sampled[-1], points[-1])
+        self.assertIn(points[137], sampled)
+        self.assertEqual(sampled, sorted(sampled))
+
+
+if __name__ == "__main__":
+    unittest.main()
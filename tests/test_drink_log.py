@@ -0,0 +1,156 @@
+import unittest
+
+import msgspec
+
+from main import DRINKS, app, format_timestamp
+from models.drink import Drink
+from models.drink_log import DrinkLog, migrate_session
+
+START = 1_700_000_000
+
+
+def legacy_fields(drink):
+    """Returns what Drink.__dict__ held for a drink in the old format."""
+    return {
+        "name": drink.name,
+        "volume": drink.volume,
+        "unit": drink.unit,
+        "alcohol": drink.alcohol,
+    }
+
+
+def legacy_session(count):
+    """Builds a session in the dict-list format with count drinks."""
+    session = {"user_drinks": [], "custom_drinks": [], "history": []}
+    for i in range(count):
+        drink = DRINKS[i % len(DRINKS)]
+        session["user_drinks"].append(legacy_fields(drink))
+        session["history"].append(
+            {
+                "drink": str(drink),
+                "time": format_timestamp(START + i),
+                "timestamp": START + i + 0.123456,
+            }
+        )
+    return session
+
+
+class TestDrinkLog(unittest.TestCase):
+    def test_add_and_remove(self):
+        """Test that drinks are interned and removed with their history."""
+        log = DrinkLog({})
+        log.add(DRINKS[0], START)
+        log.add(DRINKS[1], START + 1)
+        log.add(DRINKS[0], START + 2)
+
+        self.assertEqual(len(log.catalog), 2)
+        self.assertEqual(log.counts, [2, 1])
+        self.assertEqual(log.history()[1], (DRINKS[1], START + 1))
+
+        self.assertTrue(log.remove(DRINKS[0]))
+        self.assertEqual(log.counts, [1, 1])
+        self.assertEqual(log.history(), [(DRINKS[1], START + 1)])
+        self.assertFalse(log.remove(DRINKS[2]))
+
+    def test_remove_history_entry(self):
+        """Test removing a single history entry."""
+        log = DrinkLog({})
+        log.add(DRINKS[0], START)
+        log.add(DRINKS[0], START + 60)
+        self.assertTrue(log.remove_history_entry(0))
+        self.assertFalse(log.remove_history_entry(0))
+        self.assertEqual(log.history(), [(DRINKS[0], START + 60)])
+        self.assertEqual(log.counts, [2])
+
+    def test_migrate_session(self):
+        """Test converting a session from the dict-list format."""
+        session = legacy_session(10)
+        custom = Drink(name="Mojito", volume=250, unit="ml", alcohol=12)
+        session["custom_drinks"].append(legacy_fields(custom))
+
+        log = DrinkLog(session, known_drinks=DRINKS)
+
+        self.assertNotIn("user_drinks", session)
+        self.assertNotIn("history", session)
+        self.assertEqual(sum(log.counts), 11)
+        self.assertIn(custom, log.selected_drinks())
+        self.assertEqual(len(log.history()), 10)
+        self.assertEqual(log.history()[0], (DRINKS[0], START))
+
+    def test_selected_list_is_aggregated(self):
+        """Test converting a session that stored the selected drink IDs."""
+        session = {
+            "drink_catalog": [list(legacy_fields(DRINKS[0]).values())],
+            "selected": [0, 0],
+        }
+        log = DrinkLog(session)
+        self.assertNotIn("selected", session)
+        self.assertEqual(log.counts, [2])
+        self.assertEqual(log.lookup(str(DRINKS[0])), 0)
+        self.assertAlmostEqual(
+            log.aggregate().total_grams, DRINKS[0].alcohol_grams() * 2
+        )
+
+    def test_payload_size_after_1000_drinks(self):
+        """Test that the compact format is much smaller than the old one."""
+        old = legacy_session(1000)
+        old_size = len(msgspec.msgpack.encode(old))
+
+        new = dict(old)
+        migrate_session(new, DRINKS)
+        new_size = len(msgspec.msgpack.encode(new))
+        self.assertLess(new_size * 10, old_size)
+
+    def test_reads_add_no_keys(self):
+        """Test that reading an empty log leaves its store empty."""
+        store = {}
+        log = DrinkLog(store)
+        log.aggregate()
+        log.history_page()
+        self.assertEqual(log.lookup("Bier (0.5 L, 5%)"), None)
+        self.assertEqual(store, {})
+
+
+class TestDrinkLogRoutes(unittest.TestCase):
+    def test_legacy_session_is_migrated(self):
+        """Test that a session in the old format keeps its history."""
+        with app.test_client() as client:
+            with client.session_transaction() as session:
+                session.update(legacy_session(3))
+
+            response = client.get("/history")
+            self.assertIn(str(DRINKS[2]), response.text)
+
+            with client.session_transaction() as session:
+                self.assertEqual(len(session["history_ids"]), 3)
+                self.assertNotIn("history", session)
+
+    def test_remove_custom_drink(self):
+        """Test that custom drinks can be removed like predefined ones."""
+        with app.test_client() as client:
+            client.post(
+                "/add_custom_drink",
+                data={
+                    "custom-drink-name": "Mojito",
+                    "custom-drink-alcohol": "12",
+                    "custom-drink-volume": "250",
+                },
+            )
+            response = client.post(
+                "/remove_drink", data={"drink": "Mojito (250.0 ml, 12.0%)"}
+            )
+            self.assertEqual(response.status_code, 302)
+            self.assertNotIn("Mojito", client.get("/history").text)
+
+    def test_reads_leave_new_session_unsaved(self):
+        """Test that pages that only read the drink log set no session cookie."""
+        client = app.test_client()
+        for path in ("/", "/history", "/api/v1/drinks", "/api/v1/session/drinks"):
+            with self.subTest(path=path):
+                response = client.get(path)
+                self.assertEqual(response.status_code, 200)
+                self.assertNotIn("Set-Cookie", response.headers)
+
+
+if __name__ == "__main__":
+    unittest.main()
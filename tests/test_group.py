@@ -0,0 +1,147 @@
+import pytest
+
+from main import DRINKS, app, calculate_bac, calculate_time_to_sober
+from models.group import GroupTab
+from models.user import User
+
+START = 1_700_000_000
+
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        yield client
+
+
+def expected_result(user, drinks):
+    """Calculates a participant with the scalar helper functions."""
+    total = sum(round(drink.alcohol_grams() * 100) for drink in drinks) / 100
+    bac = calculate_bac(user.weight, user.gender, user.age, total)
+    return bac, calculate_time_to_sober(bac, user.weight, user.age)
+
+
+def test_rounds_match_scalar_results():
+    """Test that batched rounds give the same results as one user at a time."""
+    tab = GroupTab({})
+    users = [
+        User(name="Anna", weight=60, gender="female", age=25),
+        User(name="Ben", weight=90, gender="male", age=40),
+        User(name="Cem", weight=75.5, gender="male", age=70),
+    ]
+    ids = [tab.join(user) for user in users]
+
+    assert tab.add_round(DRINKS[1], START) == ids
+    assert tab.add_round(DRINKS[6], START + 60, [ids[0], ids[2]]) == [0, 2]
+
+    drinks = {0: [DRINKS[1], DRINKS[6]], 1: [DRINKS[1]], 2: [DRINKS[1], DRINKS[6]]}
+    participants = {p.participant_id: p for p in tab.participants()}
+    for participant_id, user in enumerate(users):
+        participant = participants[participant_id]
+        bac, time_to_sober = expected_result(user, drinks[participant_id])
+        assert participant.bac == bac
+        assert participant.time_to_sober == time_to_sober
+        assert participant.drinks == len(drinks[participant_id])
+    assert tab.rounds == 2
+
+
+def test_participants_sorted_by_time_to_sober():
+    """Test that the table lists the longest time to sober first."""
+    tab = GroupTab({})
+    light = tab.join(User(name="Light", weight=50, gender="female", age=30))
+    heavy = tab.join(User(name="Heavy", weight=120, gender="male", age=30))
+    idle = tab.join(User(name="Idle", weight=80, gender="male", age=30))
+    tab.add_round(DRINKS[0], START, [light, heavy])
+
+    order = [p.participant_id for p in tab.participants()]
+    assert order == [light, heavy, idle]
+
+
+def test_leave_and_limits():
+    """Test leaving, unknown participants and the participant limit."""
+    tab = GroupTab({}, max_participants=2)
+    first = tab.join(User(name="A"))
+    second = tab.join(User(name="B"))
+    with pytest.raises(ValueError):
+        tab.join(User(name="C"))
+
+    assert tab.leave(first)
+    assert not tab.leave(first)
+    assert [p.participant_id for p in tab.participants()] == [second]
+    assert tab.add_round(DRINKS[1], START) == [second]
+    with pytest.raises(KeyError):
+        tab.add_round(DRINKS[1], START, [first])
+    # The slot of a participant who left stays taken
+    with pytest.raises(ValueError):
+        tab.join(User(name="C"))
+
+    with pytest.raises(ValueError):
+        tab.join(User(name="Zero", weight=0))
+
+
+def test_round_limit():
+    """Test that a tab holds at most max_rounds rounds."""
+    tab = GroupTab({}, max_rounds=2)
+    tab.join(User(name="A"))
+    tab.add_round(DRINKS[0], START)
+    tab.add_round(DRINKS[1], START)
+    with pytest.raises(ValueError):
+        tab.add_round(DRINKS[2], START)
+    assert tab.rounds == 2
+
+
+def test_reads_add_no_keys():
+    """Test that reading an empty tab leaves the store empty."""
+    store = {}
+    tab = GroupTab(store)
+    assert tab.participants() == []
+    assert tab.rounds == 0
+    assert len(tab) == 0
+    assert store == {}
+
+
+def test_group_api(client):
+    """Test joining, adding rounds and reading the table over the API."""
+    for name, weight in [("Anna", 60), ("Ben", 95)]:
+        response = client.post(
+            "/api/v1/group/participants",
+            json={"name": name, "weight": weight, "gender": "male", "age": 30},
+        )
+        assert response.status_code == 201
+
+    response = client.post("/api/v1/group/rounds", json={"drink": str(DRINKS[1])})
+    assert response.status_code == 201
+    state = response.get_json()
+    assert state["members"] == [0, 1]
+    assert [p["name"] for p in state["participants"]] == ["Anna", "Ben"]
+    assert state["participants"][0]["time_to_sober"] > 0
+
+    response = client.post(
+        "/api/v1/group/rounds",
+        json={"name": "Shot", "volume": 4, "unit": "cl", "alcohol": 40,
+              "participants": [1]},
+    )
+    assert response.get_json()["participants"][1]["drinks"] == 2
+
+    response = client.get("/api/v1/group")
+    times = [p["time_to_sober"] for p in response.get_json()["participants"]]
+    assert times == sorted(times, reverse=True)
+
+    assert client.post(
+        "/api/v1/group/rounds", json={"drink": "Unknown", "participants": [0]}
+    ).status_code == 404
+    assert client.post(
+        "/api/v1/group/rounds", json={"drink": str(DRINKS[1]), "participants": [7]}
+    ).status_code == 404
+    assert client.post(
+        "/api/v1/group/rounds",
+        json={"name": "", "volume": 4, "unit": "cl", "alcohol": 40},
+    ).status_code == 400
+    assert client.post(
+        "/api/v1/group/participants", json={"age": 200}
+    ).status_code == 400
+
+    assert client.delete("/api/v1/group/participants/0").status_code == 200
+    assert client.delete("/api/v1/group/participants/0").status_code == 404
+
+    response = client.delete("/api/v1/group")
+    assert response.get_json()["participants"] == []
@@ -1,8 +1,8 @@
 import unittest
 
+from engine.constants import REDUCTION_FACTOR
 from main import (
     DRINKS,
-    REDUCTION_FACTOR,
     Drink,
     calculate_adjusted_metabolism_rate,
     calculate_age_factor,
@@ -0,0 +1,142 @@
+import unittest
+
+from cachelib import SimpleCache
+
+from main import DRINKS, app, get_history_archive
+from models.history import DrinkHistory
+
+START = 1_700_000_000
+
+
+def fill(history, count, step=60):
+    for i in range(count):
+        history.append(i % 3, START + i * step)
+
+
+class TestDrinkHistory(unittest.TestCase):
+    def test_overflow_is_archived(self):
+        """Test that the session keeps a bounded tail and archives the rest."""
+        store, archive = {}, SimpleCache()
+        history = DrinkHistory(store, archive, max_entries=10, chunk_size=5)
+        fill(history, 33)
+
+        self.assertLessEqual(len(store["history_ids"]), 10)
+        self.assertEqual(history.next_id, 33)
+        self.assertEqual(len(store["history_chunks"]), 5)
+
+        entries, cursor = history.page(limit=20)
+        self.assertEqual([e.entry_id for e in entries], list(range(32, 12, -1)))
+        self.assertEqual(cursor, 13)
+        entries, cursor = history.page(before=cursor, limit=20)
+        self.assertEqual([e.entry_id for e in entries], list(range(12, -1, -1)))
+        self.assertIsNone(cursor)
+
+    def test_first_page_does_not_load_archive(self):
+        """Test that archived chunks are only loaded when paged into view."""
+
+        class CountingCache(SimpleCache):
+            loads = 0
+
+            def get(self, key):
+                CountingCache.loads += 1
+                return super().get(key)
+
+        history = DrinkHistory({}, CountingCache(), max_entries=10, chunk_size=5)
+        fill(history, 30)
+        history.page(limit=5)
+        self.assertEqual(CountingCache.loads, 0)
+
+    def test_remove_by_id(self):
+        """Test removing recent and archived entries by ID."""
+        history = DrinkHistory({}, SimpleCache(), max_entries=10, chunk_size=5)
+        fill(history, 20)
+        self.assertTrue(history.remove(19))
+        self.assertTrue(history.remove(2))
+        self.assertFalse(history.remove(2))
+        self.assertFalse(history.remove(100))
+        ids = [e.entry_id for e in history.page(limit=100)[0]]
+        self.assertNotIn(19, ids)
+        self.assertNotIn(2, ids)
+        self.assertEqual(len(ids), 18)
+
+    def test_remove_drink_hides_archived_entries(self):
+        """Test that purging a drink hides its archived entries too."""
+        history = DrinkHistory({}, SimpleCache(), max_entries=4, chunk_size=2)
+        fill(history, 12)
+        history.remove_drink(0)
+        history.append(0, START + 10_000)
+        drinks = [(e.drink_id, e.entry_id) for e in history.page(limit=100)[0]]
+        self.assertEqual([d for d in drinks if d[0] == 0], [(0, 12)])
+
+    def test_retention_and_cap_without_archive(self):
+        """Test that old entries are dropped by age or by the cap."""
+        history = DrinkHistory({}, max_entries=5, chunk_size=1, retention=600)
+        fill(history, 8)
+        self.assertEqual(len(history.entries()), 5)
+        history.append(1, START + 8 * 60 + 3600)
+        self.assertEqual([e.entry_id for e in history.entries()], [8])
+        self.assertEqual(history.page()[0][0].entry_id, 8)
+
+    def test_clear_deletes_archive(self):
+        """Test that clearing the history deletes the archived chunks."""
+        archive = SimpleCache()
+        history = DrinkHistory({}, archive, max_entries=4, chunk_size=2)
+        fill(history, 10)
+        history.clear()
+        self.assertEqual(archive._cache, {})
+        self.assertEqual(history.page(), ([], None))
+
+
+class TestHistoryRoutes(unittest.TestCase):
+    def test_paginated_api(self):
+        """Test cursor pagination and removal through the JSON API."""
+        with app.test_client() as client:
+            for drink in DRINKS[:3]:
+                client.post("/api/v1/session/drinks", json={"drink": str(drink)})
+            page = client.get("/api/v1/history?limit=2").get_json()
+            self.assertEqual(
+                [entry["drink"] for entry in page["history"]],
+                [str(DRINKS[2]), str(DRINKS[1])],
+            )
+            older = client.get(f"/api/v1/history?before={page['next']}").get_json()
+            self.assertEqual(older["history"][0]["drink"], str(DRINKS[0]))
+            self.assertIsNone(older["next"])
+
+            entry_id = older["history"][0]["id"]
+            response = client.delete(f"/api/v1/history/{entry_id}")
+            self.assertEqual(response.status_code, 200)
+            response = client.delete(f"/api/v1/history/{entry_id}")
+            self.assertEqual(response.status_code, 404)
+
+    def test_remove_by_entry_id_form(self):
+        """Test that the history page removes entries by their ID."""
+        with app.test_client() as client:
+            client.post("/add_drink", data={"drink": str(DRINKS[3])})
+            self.assertIn('name="entry_id" value="0"', client.get("/history").text)
+            client.post("/history/remove", data={"entry_id": "0"})
+            self.assertNotIn(str(DRINKS[3]), client.get("/history").text)
+
+    def test_reset_deletes_archived_chunks(self):
+        """Test that resetting the session deletes its archived history."""
+        config = {"HISTORY_MAX_ENTRIES": 2, "HISTORY_CHUNK_SIZE": 1}
+        saved = {key: app.config[key] for key in config}
+        app.config.update(config)
+        archive = get_history_archive()
+        try:
+            with app.test_client() as client:
+                for drink in DRINKS[:5]:
+                    client.post("/add_drink", data={"drink": str(drink)})
+                with client.session_transaction() as session:
+                    history = DrinkHistory(dict(session), archive)
+                    keys = [history._chunk_key(first) for first, _, _ in history.chunks]
+                self.assertEqual(len(keys), 3)
+                self.assertTrue(all(archive.has(key) for key in keys))
+
+                client.get("/reset")
+                self.assertFalse(any(archive.has(key) for key in keys))
+        finally:
+            app.config.update(saved)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import io
+import json
+import tracemalloc
+
+import pytest
+from cachelib.file import FileSystemCache
+
+from main import DRINKS, app
+from models.drink_log import DrinkLog
+from models.history_io import csv_rows, export_ndjson, import_history
+
+START = 1_700_000_000
+
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        yield client
+
+
+def csv_lines(count):
+    """Yields a CSV file with count rows, one line at a time."""
+    yield "timestamp,name,volume,unit,alcohol\n"
+    for i in range(count):
+        drink = DRINKS[i % len(DRINKS)]
+        yield f"{START + i},{drink.name},{drink.volume},{drink.unit},{drink.alcohol}\n"
+
+
+def import_peak(tmp_path, count):
+    """Imports count rows and exports them again, returning the peak memory."""
+    archive = FileSystemCache(str(tmp_path / str(count)), threshold=0)
+    log = DrinkLog({}, archive=archive, max_history=200, history_chunk_size=100)
+
+    tracemalloc.start()
+    result = import_history(log, csv_rows(csv_lines(count)), chunk_size=100)
+    exported = sum(chunk.count("\n") for chunk in export_ndjson(log.iter_history()))
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    assert result.imported == exported == count
+    return peak
+
+
+def test_memory_stays_flat(tmp_path):
+    """Test that importing and exporting 100k rows keeps memory flat."""
+    # The rows alone would take several MB if they were held at once
+    assert import_peak(tmp_path, 100_000) < 1024 * 1024
+
+
+def test_export_and_import_round_trip(client):
+    """Test that an exported history imports into a new session unchanged."""
+    for drink in DRINKS[:3]:
+        client.post("/add_drink", data={"drink": str(drink)})
+
+    ndjson = client.get("/api/v1/history/export")
+    assert ndjson.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in ndjson.get_data(as_text=True).splitlines()]
+    assert [row["name"] for row in rows] == [d.name for d in DRINKS[:3]]
+
+    exported = client.get("/api/v1/history/export?format=csv")
+    assert exported.mimetype == "text/csv"
+    assert "attachment" in exported.headers["Content-Disposition"]
+
+    with app.test_client() as other:
+        response = other.post(
+            "/api/v1/history/import",
+            data={"file": (io.BytesIO(exported.get_data()), "history.csv")},
+        )
+        assert response.get_json() == {"imported": 3, "failed": 0, "errors": []}
+        history = other.get("/api/v1/history").get_json()["history"]
+        assert [entry["drink"] for entry in history] == [
+            str(drink) for drink in reversed(DRINKS[:3])
+        ]
+        assert [entry["timestamp"] for entry in history] == [
+            row["timestamp"] for row in reversed(rows)
+        ]
+
+
+def test_import_skips_invalid_rows(client):
+    """Test that invalid rows are reported and valid ones still imported."""
+    body = "\n".join(
+        [
+            json.dumps({"name": "Bier", "volume": 0.5, "unit": "L", "alcohol": 5,
+                        "timestamp": START}),
+            "not json",
+            json.dumps({"name": "bier", "volume": 0.5, "alcohol": 5,
+                        "timestamp": START}),
+            json.dumps({"name": "Wein", "volume": 0.2, "unit": "L", "alcohol": 12,
+                        "time": "2023-11-14T22:13:20"}),
+            json.dumps({"name": "Bier", "volume": 0.5}),
+        ]
+    )
+    response = client.post(
+        "/api/v1/history/import",
+        data=body,
+        content_type="application/x-ndjson",
+    )
+    result = response.get_json()
+    assert result["imported"] == 2
+    assert result["failed"] == 3
+    assert result["errors"][0].startswith("Line 2:")
+
+    response = client.post(
+        "/api/v1/history/import", data="a,b\n", content_type="text/plain"
+    )
+    assert response.status_code == 415
@@ -0,0 +1,70 @@
+import os
+import tempfile
+import unittest
+
+from main import DRINKS, app
+from monitoring.instrumentation import Histogram, instrumentation
+
+
+class TestHistogram(unittest.TestCase):
+    def test_render(self):
+        """Test the Prometheus text format of a histogram."""
+        histogram = Histogram("test_seconds", "Test.", [0.1, 1.0])
+        histogram.observe(0.05, route="/")
+        histogram.observe(0.5, route="/")
+        histogram.observe(5, route="/")
+        lines = histogram.render()
+        self.assertIn('test_seconds_bucket{route="/",le="0.1"} 1', lines)
+        self.assertIn('test_seconds_bucket{route="/",le="1.0"} 2', lines)
+        self.assertIn('test_seconds_bucket{route="/",le="+Inf"} 3', lines)
+        self.assertIn('test_seconds_count{route="/"} 3', lines)
+
+
+class TestInstrumentation(unittest.TestCase):
+    def setUp(self):
+        instrumentation.enabled = True
+        self.client = app.test_client()
+
+    def tearDown(self):
+        instrumentation.enabled = False
+        instrumentation.profile_rate = 0.0
+
+    def test_server_timing_and_metrics(self):
+        """Test that stage timings are sent back and aggregated."""
+        self.client.post("/add_drink", data={"drink": str(DRINKS[0])})
+        response = self.client.post(
+            "/calculate", data={"weight": "70", "gender": "male", "age": "30"}
+        )
+        server_timing = response.headers["Server-Timing"]
+        self.assertIn("session_load;dur=", server_timing)
+        self.assertIn("render;dur=", server_timing)
+        self.assertIn("total;dur=", server_timing)
+
+        metrics = self.client.get("/metrics").text
+        self.assertIn(
+            'bac_request_duration_seconds_count{method="POST",route="/calculate"',
+            metrics,
+        )
+        self.assertIn('stage="session_save"', metrics)
+        self.assertIn('bac_template_render_seconds_sum{template="result.html"}', metrics)
+        self.assertIn("bac_session_payload_bytes_bucket", metrics)
+
+    def test_sampled_profiles(self):
+        """Test that sampled requests dump a profile per route."""
+        instrumentation.profile_rate = 1.0
+        instrumentation.profile_dir = tempfile.mkdtemp()
+        self.client.get("/history")
+        profiles = os.listdir(instrumentation.profile_dir)
+        self.assertEqual(len(profiles), 1)
+        self.assertTrue(profiles[0].startswith("history-"))
+
+    def test_disabled(self):
+        """Test that nothing is recorded or exposed when disabled."""
+        instrumentation.enabled = False
+        response = self.client.get("/")
+        self.assertNotIn("Server-Timing", response.headers)
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,111 @@
+import io
+import json
+import logging
+import queue
+import unittest
+
+from main import app
+from monitoring.logs import (
+    JsonFormatter,
+    LogListener,
+    NonBlockingQueueHandler,
+    SamplingFilter,
+    log_event,
+    log_pipeline,
+    parse_sample_rates,
+)
+
+
+def make_record(msg="Time to sober: %s hours", args=(2.5,), **extra):
+    record = logging.makeLogRecord({"msg": msg, "args": args, "levelno": 20})
+    record.__dict__.update(extra)
+    return record
+
+
+class TestJsonFormatter(unittest.TestCase):
+    def test_format(self):
+        """Test that records become one JSON object with their extra fields."""
+        record = make_record(event="calculation", request_id="abc", bac=0.5)
+        entry = json.loads(JsonFormatter().format(record))
+        self.assertEqual(entry["message"], "Time to sober: 2.5 hours")
+        self.assertEqual(entry["event"], "calculation")
+        self.assertEqual(entry["request_id"], "abc")
+        self.assertEqual(entry["bac"], 0.5)
+        self.assertNotIn("args", entry)
+
+
+class TestSampling(unittest.TestCase):
+    def test_parse_sample_rates(self):
+        """Test parsing per-event sample rates from the configuration."""
+        self.assertEqual(
+            parse_sample_rates("calculation=0.1, curve=0"),
+            {"calculation": 0.1, "curve": 0.0},
+        )
+        self.assertEqual(parse_sample_rates(""), {})
+
+    def test_filter(self):
+        """Test that only events with a rate are sampled."""
+        sampler = SamplingFilter({"calculation": 0.0})
+        self.assertFalse(sampler.filter(make_record(event="calculation")))
+        self.assertTrue(sampler.filter(make_record(event="calculation", sampled=True)))
+        self.assertTrue(sampler.filter(make_record(event="other")))
+        self.assertTrue(sampler.filter(make_record()))
+
+    def test_log_event_skips_dropped_records(self):
+        """Test that log_event does not create records dropped by sampling."""
+        logger = logging.getLogger("test_logs.sampling")
+        logger.setLevel(logging.INFO)
+        records = []
+        handler = logging.Handler()
+        handler.emit = records.append
+        logger.addHandler(handler)
+        rates = log_pipeline.sampler.rates
+        try:
+            log_pipeline.sampler.rates = {"calculation": 0.0}
+            log_event(logger, "calculation", "Dropped")
+            log_pipeline.sampler.rates = {"calculation": 1.0}
+            log_event(logger, "calculation", "Kept %s", 1, bac=0.5)
+        finally:
+            log_pipeline.sampler.rates = rates
+            logger.removeHandler(handler)
+        self.assertEqual([r.getMessage() for r in records], ["Kept 1"])
+        self.assertEqual(records[0].bac, 0.5)
+        self.assertEqual(records[0].funcName, "test_log_event_skips_dropped_records")
+
+
+class TestQueue(unittest.TestCase):
+    def test_full_queue_drops_records(self):
+        """Test that logging never blocks on a full queue."""
+        handler = NonBlockingQueueHandler(queue.Queue(1))
+        handler.handle(make_record())
+        handler.handle(make_record())
+        self.assertEqual(handler.queue.qsize(), 1)
+        self.assertEqual(handler.dropped, 1)
+
+    def test_listener_writes_batches(self):
+        """Test that the listener writes every queued record before stopping."""
+        stream = io.StringIO()
+        output = logging.StreamHandler(stream)
+        output.setFormatter(JsonFormatter())
+        log_queue = queue.Queue()
+        listener = LogListener(log_queue, output, flush_interval=0.01)
+        listener.start()
+        for i in range(100):
+            log_queue.put(make_record("Record %s", (i,)))
+        listener.stop()
+        lines = stream.getvalue().splitlines()
+        self.assertEqual(len(lines), 100)
+        self.assertEqual(json.loads(lines[-1])["message"], "Record 99")
+
+
+class TestRequestId(unittest.TestCase):
+    def test_request_id_header(self):
+        """Test that requests get an ID, or keep a valid one they were sent."""
+        client = app.test_client()
+        generated = client.get("/health-check").headers["X-Request-ID"]
+        self.assertEqual(len(generated), 32)
+        response = client.get("/health-check", headers={"X-Request-ID": "abc-123"})
+        self.assertEqual(response.headers["X-Request-ID"], "abc-123")
+        for invalid in ["a b", "x" * 65]:
+            response = client.get("/health-check", headers={"X-Request-ID": invalid})
+            self.assertNotEqual(response.headers["X-Request-ID"], invalid)
@@ -1,6 +1,10 @@
 import unittest
 
+from dataclasses import FrozenInstanceError
+
 from main import Drink, User
+from models.drink import Drink as MutableDrink
+from models.drink import FrozenDrink
 
 
 class TestModels(unittest.TestCase):
@@ -49,6 +53,35 @@ class TestModels(unittest.TestCase):
         # Test inequality
         self.assertNotEqual(drink, drink2, "Expected inequality")
 
+    def test_frozen_drink_model(self):
+        """Test that FrozenDrink matches Drink and cannot be modified."""
+        for fields in [("Beer", 500, "ml", 5), ("Beer", 2000, "ml", 5), ("Shot", 4, "cl", 40)]:
+            frozen = FrozenDrink(*fields)
+            drink = MutableDrink(*fields)
+            self.assertEqual(str(frozen), str(drink))
+            self.assertEqual(frozen.volume_in_liters(), drink.volume_in_liters())
+            self.assertEqual(frozen.alcohol_grams(), drink.alcohol_grams())
+            self.assertEqual(frozen, drink)
+            self.assertEqual(hash(frozen), hash(drink))
+            self.assertEqual(len({frozen, drink}), 1)
+
+        drink = FrozenDrink(name="Beer", volume=500, unit="ml", alcohol=5)
+        with self.assertRaises(FrozenInstanceError):
+            drink.volume = 1
+
+        # Equal drinks hash equally, regardless of the name's case
+        self.assertEqual(drink, FrozenDrink(name="BEER", volume=500, unit="ml", alcohol=5))
+        self.assertEqual(
+            len({drink, FrozenDrink(name="BEER", volume=500, unit="ml", alcohol=5)}), 1
+        )
+        self.assertEqual(drink.key, "Beer (500 ml, 5%)")
+
+    def test_empty_drink_name(self):
+        """Test that an empty drink name is rejected with ValueError."""
+        for cls in (MutableDrink, FrozenDrink):
+            with self.subTest(cls=cls), self.assertRaises(ValueError):
+                cls(name="", volume=500, unit="ml", alcohol=5)
+
 
 if __name__ == "__main__":
     unittest.main()
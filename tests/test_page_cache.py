@@ -0,0 +1,90 @@
+import re
+
+import pytest
+
+from main import DRINKS, app, fragment_cache
+from models.session_version import SessionVersion
+
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        yield client
+
+
+def test_session_version():
+    """Test that the version counts changes and starts with a random tag."""
+    store = {}
+    version = SessionVersion(store)
+    assert version.value is None
+    version.bump()
+    version.bump()
+    tag, counter = version.value.split("-")
+    assert counter == "2"
+    other = SessionVersion({})
+    other.bump()
+    assert other.value.split("-")[0] != tag
+
+
+def test_index_not_modified(client):
+    """Test that the index answers 304 until the drinks or user change."""
+    response = client.get("/")
+    etag = response.headers["ETag"]
+    assert "no-cache" in response.headers["Cache-Control"]
+    assert "Cookie" in response.headers["Vary"]
+
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    client.post("/add_drink", data={"drink": str(DRINKS[1])})
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    user = {"weight": 70, "gender": "male", "age": 30}
+    client.post("/calculate", data=user)
+    response = client.get("/", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    etag = response.headers["ETag"]
+
+    # The same profile again does not change the page
+    client.post("/calculate", data=user)
+    assert client.get("/", headers={"If-None-Match": etag}).status_code == 304
+
+    client.get("/reset")
+    assert client.get("/", headers={"If-None-Match": etag}).status_code == 200
+
+
+def test_drink_grid_is_cached(client):
+    """Test that the drink grid is rendered once per session version."""
+    client.post("/add_drink", data={"drink": str(DRINKS[2])})
+    first = client.get("/").data
+    hits = fragment_cache.stats.hits
+    assert client.get("/").data == first
+    assert fragment_cache.stats.hits == hits + 1
+
+
+def test_static_urls_are_hashed(client):
+    """Test that static URLs carry a content hash and are cached for good."""
+    client.post(
+        "/add_custom_drink",
+        data={
+            "custom-drink-name": "Mojito",
+            "custom-drink-alcohol": "12",
+            "custom-drink-volume": "250",
+        },
+    )
+    html = client.get("/").get_data(as_text=True)
+    urls = re.findall(r'(?:src|href)="(/static/[^"]+)"', html)
+    assert urls and all("?v=" in url for url in urls)
+    # Drinks without an image of their own use the custom one directly
+    assert "images/Mojito.svg" not in html
+
+    response = client.get(urls[0])
+    assert response.cache_control.immutable
+    assert response.cache_control.max_age == 365 * 24 * 60 * 60
+    assert not response.cache_control.no_cache
+
+    stale = client.get(urls[0].split("?")[0] + "?v=outdated")
+    assert not stale.cache_control.immutable
@@ -0,0 +1,136 @@
+import random
+import unittest
+
+from engine.planner import plan
+from main import (
+    DRINKS,
+    app,
+    calculate_adjusted_metabolism_rate,
+    calculate_bac,
+    calculate_time_to_sober,
+)
+
+
+def random_cases(size, seed=42):
+    """Builds reproducible random profiles, totals, targets and hours."""
+    rng = random.Random(seed)
+    for _ in range(size):
+        yield {
+            "weight": round(rng.uniform(20, 500), 1),
+            "gender": rng.choice(["male", "female", "unknown"]),
+            "age": rng.randint(0, 150),
+            "total_alcohol": round(rng.uniform(0, 150), 2),
+            "target": rng.choice([0.01, 0.3, 0.5, 1.1]),
+            "hours": rng.choice([0, 0.5, 2.5, 8]),
+        }
+
+
+def below(case, total_alcohol):
+    """Tells with the forward functions whether the total stays below target."""
+    bac = calculate_bac(
+        case["weight"], case["gender"], case["age"], round(total_alcohol, 2)
+    )
+    rate = calculate_adjusted_metabolism_rate(case["age"], case["weight"])
+    return bac - rate * case["hours"] < case["target"]
+
+
+class TestPlannerParity(unittest.TestCase):
+    def test_budget_is_largest_amount_below_target(self):
+        """Test the budget against calculate_bac one hundredth of a gram on."""
+        for case in random_cases(2000):
+            result = plan(**case, drinks=DRINKS)
+            total = case["total_alcohol"]
+            with self.subTest(case=case):
+                if not below(case, total):
+                    self.assertEqual(result.budget_grams, 0)
+                    continue
+                self.assertTrue(below(case, total + result.budget_grams))
+                self.assertFalse(below(case, total + result.budget_grams + 0.01))
+
+    def test_drink_counts(self):
+        """Test that count drinks fit into the budget and one more does not."""
+        for case in random_cases(500, seed=7):
+            result = plan(**case, drinks=DRINKS)
+            if not below(case, case["total_alcohol"]):
+                continue
+            for drink in result.drinks:
+                total, grams = case["total_alcohol"], drink["alcohol_grams"]
+                with self.subTest(case=case, drink=drink["drink"]):
+                    self.assertTrue(below(case, total + drink["count"] * grams))
+                    self.assertFalse(below(case, total + (drink["count"] + 1) * grams))
+
+    def test_hours_below_matches_time_to_sober(self):
+        """Test that the hours below a tiny target match the time to sober."""
+        for case in random_cases(200, seed=3):
+            result = plan(**dict(case, target=1e-9))
+            bac = calculate_bac(
+                case["weight"], case["gender"], case["age"], case["total_alcohol"]
+            )
+            self.assertEqual(result.bac, bac)
+            self.assertAlmostEqual(
+                result.hours_below,
+                calculate_time_to_sober(bac, case["weight"], case["age"]),
+                delta=0.011,
+            )
+
+    def test_invalid_input(self):
+        """Test that invalid weights, targets and hours raise ValueError."""
+        profile = {"total_alcohol": 10, "weight": 80, "gender": "male", "age": 30}
+        for invalid in (
+            {"weight": 0},
+            {"weight": float("inf")},
+            {"target": 0},
+            {"target": float("inf")},
+            {"target": float("nan")},
+            {"hours": -1},
+            {"hours": float("nan")},
+        ):
+            with self.subTest(invalid=invalid), self.assertRaises(ValueError):
+                plan(**dict(profile, **invalid))
+
+    def test_huge_target_and_hours_are_clamped(self):
+        """Test that huge targets and hours return instead of searching forever."""
+        result = plan(10, 80, "male", 30, target=1e300, hours=1e300)
+        self.assertEqual(result.target, 10.0)
+        self.assertEqual(result.hours, 7 * 24.0)
+        self.assertGreater(result.budget_grams, 0)
+
+
+class TestPlanRoutes(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.client.post("/add_drink", data={"drink": str(DRINKS[1])})
+
+    def test_api_plan(self):
+        """Test the plan of the session drinks for a profile in the request."""
+        response = self.client.post(
+            "/api/v1/plan", json={"weight": 80, "gender": "male", "age": 30}
+        )
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["target"], 0.5)
+        self.assertEqual(data["bac"], calculate_bac(80, "male", 30, 19.73))
+        self.assertEqual(len(data["drinks"]), len(DRINKS))
+        self.assertGreater(data["budget_grams"], 0)
+
+    def test_plan_uses_session_profile(self):
+        """Test that the form route plans for the profile in the session."""
+        response = self.client.post("/api/v1/plan", json={})
+        self.assertEqual(response.status_code, 422)
+        self.client.post("/calculate", data={"weight": "80", "age": "30"})
+        response = self.client.post("/plan", data={"target": "0.3", "hours": "1"})
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("Planer", response.get_data(as_text=True))
+
+    def test_invalid_plan(self):
+        """Test that invalid and zero targets are rejected with 400."""
+        for target in (-1, 0, "abc", "inf", "nan"):
+            with self.subTest(target=target):
+                response = self.client.post(
+                    "/api/v1/plan", json={"weight": 80, "target": target}
+                )
+                self.assertEqual(response.status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import tempfile
+import threading
+import time
+import unittest
+
+from cachelib.file import FileSystemCache
+
+from main import DRINKS, app, result_cache
+from stores.results import (
+    CachelibResultCache,
+    MemoryResultCache,
+    result_key,
+)
+
+
+class TestResultKey(unittest.TestCase):
+    def test_canonical(self):
+        """Test that the key ignores the order drinks were added in."""
+        profile = [70.0, "male", 25]
+        self.assertEqual(
+            result_key(profile, {"a": 1, "b": 2}),
+            result_key(profile, {"b": 2, "a": 1}),
+        )
+        self.assertNotEqual(
+            result_key(profile, {"a": 1}), result_key(profile, {"a": 2})
+        )
+        self.assertNotEqual(
+            result_key(profile, {"a": 1}), result_key([70.0, "female", 25], {"a": 1})
+        )
+
+
+class TestMemoryResultCache(unittest.TestCase):
+    def test_memoize_counts_hits_and_misses(self):
+        """Test that a value is only computed once."""
+        cache = MemoryResultCache()
+        calls = []
+        for _ in range(3):
+            cache.memoize("a", lambda: calls.append(1) or {"bac": 0.5})
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats.hits, 2)
+        self.assertEqual(cache.stats.misses, 1)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted."""
+        cache = MemoryResultCache(max_entries=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        cache.get("a")
+        cache.set("c", 3)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats.evictions, 1)
+
+    def test_expiry(self):
+        """Test that expired entries are dropped and counted."""
+        cache = MemoryResultCache()
+        cache.set("a", 1)
+        cache._entries["a"] = (time.monotonic() - 1, 1)
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.stats.expirations, 1)
+
+
+class TestCachelibResultCache(unittest.TestCase):
+    def test_eviction(self):
+        """Test that entries pruned by cachelib are counted as evictions."""
+        cache = CachelibResultCache(
+            FileSystemCache(cache_dir=tempfile.mkdtemp(), threshold=2)
+        )
+        for key in "abcd":
+            cache.memoize(key, lambda: {"bac": 0.5})
+        self.assertEqual(cache.stats.misses, 4)
+        self.assertGreater(cache.stats.evictions, 0)
+        self.assertEqual(cache.memoize("d", lambda: None), {"bac": 0.5})
+        self.assertEqual(cache.stats.hits, 1)
+
+    def test_unobservable_counters_are_left_out(self):
+        """Test that a cache pruned by the sweeper reports no evictions."""
+        cache = CachelibResultCache(
+            FileSystemCache(cache_dir=tempfile.mkdtemp(), threshold=0)
+        )
+        cache.memoize("a", lambda: {"bac": 0.5})
+        cache.memoize("a", lambda: None)
+        self.assertEqual(cache.stats.to_dict(), {"hits": 1, "misses": 1})
+
+
+class TestCounters(unittest.TestCase):
+    def test_concurrent_counts(self):
+        """Test that hits counted by concurrent threads are not lost."""
+        cache = MemoryResultCache()
+        cache.set("a", 1)
+
+        def hit():
+            for _ in range(1000):
+                cache.memoize("a", lambda: None)
+
+        threads = [threading.Thread(target=hit) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(cache.stats.hits, 8000)
+
+
+class TestCalculateMemo(unittest.TestCase):
+    def test_repeated_calculation_hits_cache(self):
+        """Test that identical inputs to /calculate are served from the cache."""
+        data = {"weight": "81", "gender": "female", "age": "33"}
+        with app.test_client() as client:
+            client.post("/add_drink", data={"drink": str(DRINKS[1])})
+            first = client.post("/calculate", data=data)
+            hits = result_cache.stats.hits
+            second = client.post("/calculate", data=data)
+            self.assertEqual(result_cache.stats.hits, hits + 1)
+            self.assertEqual(first.text, second.text)
+            stats = client.get("/api/cache/stats").get_json()
+            self.assertEqual(stats["hits"], result_cache.stats.hits)
+
+
+if __name__ == "__main__":
+    unittest.main()
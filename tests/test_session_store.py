@@ -0,0 +1,107 @@
+import time
+import unittest
+
+from main import DRINKS, app
+from stores.session import (
+    KeyedSessionInterface,
+    MemorySessionStore,
+    RedisSessionStore,
+)
+
+try:
+    import fakeredis
+except ImportError:
+    fakeredis = None
+
+
+class RecordingStore(MemorySessionStore):
+    """Memory store that records which fields each save wrote."""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.saves = []
+
+    def save(self, store_id, changed, removed, ttl):
+        self.saves.append((set(changed), set(removed)))
+        super().save(store_id, changed, removed, ttl)
+
+
+class TestMemorySessionStore(unittest.TestCase):
+    def test_save_and_load(self):
+        """Test partial writes and removals."""
+        store = MemorySessionStore()
+        store.save("a", {"x": b"1", "y": b"2"}, [], ttl=60)
+        store.save("a", {"y": b"3"}, ["x"], ttl=60)
+        self.assertEqual(store.load("a"), {"y": b"3"})
+        self.assertIsNone(store.load("unknown"))
+
+    def test_lru_eviction(self):
+        """Test that the least recently used session is evicted."""
+        store = MemorySessionStore(max_entries=2)
+        store.save("a", {"x": b"1"}, [], ttl=60)
+        store.save("b", {"x": b"1"}, [], ttl=60)
+        store.load("a")
+        store.save("c", {"x": b"1"}, [], ttl=60)
+        self.assertIsNotNone(store.load("a"))
+        self.assertIsNone(store.load("b"))
+        self.assertEqual(len(store), 2)
+
+    def test_expiry(self):
+        """Test that expired sessions are not returned."""
+        store = MemorySessionStore()
+        store.save("a", {"x": b"1"}, [], ttl=60)
+        store._entries["a"] = (time.monotonic() - 1, store._entries["a"][1])
+        self.assertIsNone(store.load("a"))
+
+
+@unittest.skipIf(fakeredis is None, "fakeredis is not installed")
+class TestRedisSessionStore(unittest.TestCase):
+    def test_save_and_load(self):
+        """Test partial writes, removals and TTL against fakeredis."""
+        client = fakeredis.FakeRedis()
+        store = RedisSessionStore(client)
+        store.save("a", {"x": b"1", "y": b"2"}, [], ttl=60)
+        store.save("a", {"y": b"3"}, ["x"], ttl=60)
+        self.assertEqual(store.load("a"), {"y": b"3"})
+        self.assertGreater(client.ttl("a"), 0)
+        store.delete("a")
+        self.assertIsNone(store.load("a"))
+
+
+class TestKeyedSessionInterface(unittest.TestCase):
+    def setUp(self):
+        self.original_interface = app.session_interface
+        self.store = RecordingStore()
+        app.session_interface = KeyedSessionInterface(app, self.store, permanent=False)
+        self.client = app.test_client()
+
+    def tearDown(self):
+        app.session_interface = self.original_interface
+
+    def test_session_round_trip(self):
+        """Test that drinks survive requests with the memory backend."""
+        self.client.post("/add_drink", data={"drink": str(DRINKS[0])})
+        self.client.post("/add_drink", data={"drink": str(DRINKS[2])})
+        response = self.client.get("/history")
+        self.assertIn(str(DRINKS[0]), response.text)
+        self.assertIn(str(DRINKS[2]), response.text)
+
+    def test_only_dirty_keys_written(self):
+        """Test that a save only writes keys whose value changed."""
+        self.client.post(
+            "/calculate", data={"weight": "70", "gender": "male", "age": "25"}
+        )
+        self.client.post("/add_drink", data={"drink": str(DRINKS[0])})
+        self.store.saves.clear()
+
+        self.client.post("/add_drink", data={"drink": str(DRINKS[0])})
+        changed = set().union(*(changed for changed, _ in self.store.saves))
+        self.assertIn("selected_counts", changed)
+        self.assertIn("selected_centigrams", changed)
+        self.assertIn("history_ts", changed)
+        self.assertNotIn("drink_catalog", changed)
+        self.assertNotIn("user", changed)
+
+
+if __name__ == "__main__":
+    unittest.main()
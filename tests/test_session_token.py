@@ -0,0 +1,173 @@
+import importlib.util
+import itertools
+import os
+import unittest
+from unittest import mock
+
+from flask import Flask
+from werkzeug.test import Client
+
+from main import DRINKS, Config
+from models.drink import FrozenDrink
+from models.drink_log import DrinkLog
+from models.session_codec import SessionCodec
+from stores.session import MemorySessionStore, RedisSessionStore, init_session
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATELESS = {
+    "SESSION_BACKEND": "stateless",
+    "SECRET_KEY": "shared-secret",
+    "HISTORY_ARCHIVE_BACKEND": "none",
+}
+
+
+def load_app(name):
+    """Imports main.py as a separate module, i.e. an independent replica."""
+    spec = importlib.util.spec_from_file_location(name, os.path.join(ROOT, "main.py"))
+    module = importlib.util.module_from_spec(spec)
+    with mock.patch.dict("sys.modules", {name: module}), mock.patch.dict(
+        os.environ, STATELESS
+    ):
+        spec.loader.exec_module(module)
+    return module.app
+
+
+def build_session():
+    """Builds a session with known and custom drinks and a removed entry."""
+    session = {"user": {"name": "User", "age": 30, "gender": "female", "weight": 62.5}}
+    log = DrinkLog(session)
+    for timestamp, drink in enumerate(DRINKS * 3):
+        log.add(drink, 1_700_000_000 + timestamp * 90)
+    log.add(FrozenDrink("Mojito", 250.0, "ml", 12.0), 1_700_010_000)
+    log.remove(DRINKS[2])
+    log.remove_history_entry(3)
+    session["version"] = ["0123456789abcdef", 27]
+    session["curve"] = {"profile": [62.5, "female", 30], "state": {}}
+    return session
+
+
+class TestSessionCodec(unittest.TestCase):
+    def test_round_trip(self):
+        """Test that decoding restores the session without the cached curve."""
+        session = build_session()
+        codec = SessionCodec(DRINKS)
+        payload = codec.encode(session)
+        expected = {key: value for key, value in session.items() if key != "curve"}
+        self.assertEqual(codec.decode(payload), expected)
+        self.assertEqual(codec.encode(codec.decode(payload)), payload)
+
+    def test_compact(self):
+        """Test that the payload is far smaller than the session as msgpack."""
+        import msgspec
+
+        session = build_session()
+        payload = SessionCodec(DRINKS).encode(session)
+        self.assertLess(len(payload) * 3, len(msgspec.msgpack.encode(session)))
+
+    def test_irregular_values_are_kept(self):
+        """Test that values outside the compact sections survive verbatim."""
+        session = {"user": {"name": "User"}, "_flashes": [["message", "Hi"]]}
+        codec = SessionCodec(DRINKS)
+        self.assertEqual(codec.decode(codec.encode(session)), session)
+
+    def test_invalid_payloads(self):
+        """Test that truncated, foreign and other-version payloads are rejected."""
+        payload = SessionCodec(DRINKS).encode(build_session())
+        invalid = [
+            payload[:-3],
+            b"\x02" + payload[1:],
+            SessionCodec(DRINKS[:-1]).encode(build_session()),
+        ]
+        for value in invalid:
+            with self.assertRaises(ValueError):
+                SessionCodec(DRINKS).decode(value)
+
+
+class TestTokenFallback(unittest.TestCase):
+    def create_app(self, **config):
+        app = Flask(__name__)
+        app.config.from_object(Config)
+        app.config.update(SESSION_BACKEND="stateless", **config)
+        init_session(app, known_drinks=DRINKS)
+        return app
+
+    def test_memory_fallback_needs_a_single_process(self):
+        """Test that the per-process memory fallback needs one worker process."""
+        with self.assertRaises(ValueError):
+            self.create_app(SESSION_TOKEN_FALLBACK="memory", WORKER_PROCESSES=4)
+        app = self.create_app(SESSION_TOKEN_FALLBACK="memory", WORKER_PROCESSES=1)
+        self.assertIsInstance(app.session_interface.fallback, MemorySessionStore)
+
+    def test_redis_fallback_by_default(self):
+        """Test that the fallback defaults to the shared Redis store."""
+        app = self.create_app()
+        self.assertIsInstance(app.session_interface.fallback, RedisSessionStore)
+
+
+class TestStatelessReplicas(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.replicas = [load_app("replica_a"), load_app("replica_b")]
+
+    def setUp(self):
+        # A load balancer alternating between the replicas for one client
+        replicas = itertools.cycle(self.replicas)
+
+        def balancer(environ, start_response):
+            return next(replicas)(environ, start_response)
+
+        self.client = Client(balancer)
+
+    def test_replicas_share_the_session(self):
+        """Test that two independent app instances serve one client's session."""
+        for drink in DRINKS[:3] + DRINKS[:2]:
+            response = self.client.post(
+                "/api/v1/session/drinks", json={"drink": str(drink)}
+            )
+            self.assertEqual(response.status_code, 201)
+        response = self.client.post(
+            "/api/v1/calculate", json={"weight": 80, "gender": "male", "age": 30}
+        )
+        self.assertEqual(response.status_code, 200)
+
+        for _ in self.replicas:
+            state = self.client.get("/api/v1/session/drinks").get_json()
+            self.assertEqual(state["count"], 5)
+            self.assertEqual(
+                state["total_grams"],
+                round(sum(d.alcohol_grams() for d in DRINKS[:3] + DRINKS[:2]), 2),
+            )
+            self.assertIsNotNone(state["result"])
+            history = self.client.get("/api/v1/history").get_json()
+            self.assertEqual(len(history["history"]), 5)
+
+    def test_tampered_token_starts_a_new_session(self):
+        """Test that a token with a wrong signature is ignored."""
+        self.client.post("/api/v1/session/drinks", json={"drink": str(DRINKS[0])})
+        cookie = self.client.get_cookie("session")
+        self.client.set_cookie("session", cookie.value[:-2] + "xx")
+        state = self.client.get("/api/v1/session/drinks").get_json()
+        self.assertEqual(state["count"], 0)
+
+    def test_oversized_session_falls_back_to_the_store(self):
+        """Test the fallback store above the budget and the return below it."""
+        # Shared by the replicas, like a Redis fallback
+        store = MemorySessionStore()
+        interfaces = [app.session_interface for app in self.replicas]
+        with mock.patch.multiple(
+            interfaces[0], max_bytes=250, fallback=store
+        ), mock.patch.multiple(interfaces[1], max_bytes=250, fallback=store):
+            for i in range(30):
+                custom = {"name": f"Cocktail {i}", "volume": 200 + i, "alcohol": 12}
+                self.client.post("/api/v1/session/drinks", json=custom)
+            self.assertLess(len(self.client.get_cookie("session").value), 150)
+            self.assertEqual(len(store), 1)
+            state = self.client.get("/api/v1/session/drinks").get_json()
+            self.assertEqual(state["count"], 30)
+
+            self.client.get("/reset")
+            self.assertEqual(len(store), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import os
+import subprocess
+import sys
+
+from benchmarks.bench_startup import (
+    ROOT,
+    load_budget,
+    measure_first_response,
+    measure_import,
+    over_budget,
+)
+
+# Timings vary with the machine and its load, e.g. under coverage in CI, so
+# the suite allows this multiple of the timing budgets; bench_startup.py
+# checks them exactly
+TIMING_SLACK = float(os.environ.get("STARTUP_BUDGET_SLACK", 2))
+
+
+def test_cold_start_within_budget():
+    """Test import time, first response and RSS against startup_budget.json."""
+    budget = {
+        name: limit * TIMING_SLACK if name.endswith("_ms") else limit
+        for name, limit in load_budget().items()
+    }
+    results = measure_import()
+    results.update(measure_first_response())
+    assert over_budget(results, budget) == [], results
+
+
+def test_optional_engines_are_deferred():
+    """Test that numpy is only imported on first use or when preloading."""
+    check = (
+        "import sys, main; before = 'numpy' in sys.modules; "
+        "main.create_app(preload=True); print(before, 'numpy' in sys.modules)"
+    )
+    output = subprocess.run(
+        [sys.executable, "-c", check], cwd=ROOT, capture_output=True, text=True
+    ).stdout
+    assert output.split() == ["False", "True"]
+
+
+def test_over_budget():
+    """Test that only measurements above their budget are reported."""
+    results = {"import_ms": 500, "rss_mb": 90}
+    budget = {"import_ms": 750, "rss_mb": 80, "first_response_ms": 1000}
+    assert over_budget(results, budget) == ["rss_mb: 90 > 80 budget"]
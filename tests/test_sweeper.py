@@ -0,0 +1,182 @@
+import os
+import shutil
+import tempfile
+import time
+import unittest
+
+from cachelib import FileSystemCache, SimpleCache
+from flask import Flask
+
+from main import DRINKS, Config, app
+from models.drink_log import DrinkLog
+from monitoring.instrumentation import instrumentation
+from stores.sweeper import FileIndex, SessionSweeper
+
+HOUR = 60 * 60
+
+
+class TestSessionSweeper(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.sessions = FileSystemCache(
+            os.path.join(self.root, "sessions"), threshold=0
+        )
+        self.cache = FileSystemCache(os.path.join(self.root, "cache"), threshold=0)
+        self.history = FileSystemCache(
+            os.path.join(self.root, "history"), threshold=0
+        )
+        self.archive = SimpleCache()
+        self.sweeper = self.create_sweeper()
+
+    def tearDown(self):
+        instrumentation.collectors.remove(self.sweeper.render_metrics)
+        shutil.rmtree(self.root)
+
+    def create_sweeper(self):
+        test_app = Flask(__name__)
+        test_app.config.from_object(Config)
+        test_app.config.update(
+            SESSION_BACKEND="filesystem",
+            SESSION_FILE_DIR=self.sessions._path,
+            SESSION_FILE_MAX=100,
+            CACHE_DIR=self.cache._path,
+            CACHE_MAX_FILES=100,
+            SWEEP_INTERVAL=0,
+            SWEEP_IDLE_HOURS=24,
+            SWEEP_COMPACT_BYTES=1024,
+            SWEEP_COMPACT_ENTRIES=20,
+            SWEEP_STATE_FILE=os.path.join(self.root, "sweeper.json"),
+            HISTORY_ARCHIVE_BACKEND="filesystem",
+            HISTORY_ARCHIVE_DIR=self.history._path,
+            HISTORY_RETENTION_HOURS=0,
+        )
+        sweeper = SessionSweeper()
+        sweeper.init_app(test_app, archive=self.archive, known_drinks=DRINKS)
+        return sweeper
+
+    def age(self, cache, key, hours):
+        path = cache._get_filename(key)
+        then = time.time() - hours * HOUR
+        os.utime(path, (then, then))
+
+    def test_expired_and_idle_files_are_deleted(self):
+        """Test that expired and long unused files are deleted, others kept."""
+        self.sessions.set("session:expired", {"user": {}}, timeout=1)
+        self.sessions.set("session:idle", {"user": {}}, timeout=31 * 24 * HOUR)
+        self.sessions.set("session:active", {"user": {}}, timeout=31 * 24 * HOUR)
+        self.cache.set("result:old", 1, timeout=1)
+        self.cache.set("result:idle", 2, timeout=0)
+        self.age(self.sessions, "session:idle", 48)
+        self.age(self.cache, "result:idle", 48)
+
+        state = self.sweeper.sweep(now=time.time() + 10)
+
+        self.assertFalse(self.sessions.has("session:expired"))
+        self.assertFalse(self.sessions.has("session:idle"))
+        self.assertTrue(self.sessions.has("session:active"))
+        self.assertFalse(self.cache.has("result:old"))
+        # Only sessions expire when idle
+        self.assertEqual(self.cache.get("result:idle"), 2)
+        self.assertEqual(state["deleted"]["sessions"], {"expired": 1, "idle": 1})
+        self.assertEqual(state["deleted"]["cache"], {"expired": 1})
+        self.assertGreater(state["reclaimed"]["sessions"]["idle"], 0)
+        self.assertEqual(state["size"]["sessions"][0], 1)
+
+    def test_expired_history_chunks_are_deleted(self):
+        """Test that expired archive chunks are deleted and idle ones kept."""
+        self.history.set("history:a:0", {"ids": [0]}, timeout=1)
+        self.history.set("history:b:0", {"ids": [0]}, timeout=3600)
+        self.age(self.history, "history:b:0", 48)
+
+        state = self.sweeper.sweep(now=time.time() + 10)
+
+        self.assertFalse(self.history.has("history:a:0"))
+        self.assertTrue(self.history.has("history:b:0"))
+        self.assertEqual(state["deleted"]["history"], {"expired": 1})
+
+    def test_least_recently_used_beyond_capacity(self):
+        """Test that the least recently used files beyond the cap are deleted."""
+        self.sweeper.directories["cache"].max_files = 2
+        for i in range(4):
+            self.cache.set(f"result:{i}", i)
+            self.age(self.cache, f"result:{i}", 4 - i)
+
+        state = self.sweeper.sweep()
+
+        self.assertEqual(
+            [self.cache.has(f"result:{i}") for i in range(4)],
+            [False, False, True, True],
+        )
+        self.assertEqual(state["deleted"]["cache"], {"capacity": 2})
+
+    def test_written_files_are_kept(self):
+        """Test that a file written after the index was refreshed is kept."""
+        self.sessions.set("session:a", {"user": {}})
+        index = FileIndex(self.sessions._path)
+        index.refresh()
+        (name,) = index.files
+        path = os.path.join(index.path, name)
+        os.utime(path, ns=(0, index.files[name].mtime_ns + 1))
+
+        self.assertEqual(index.remove(name), 0)
+        self.assertTrue(os.path.exists(path))
+
+    def test_oversized_sessions_are_compacted(self):
+        """Test that large idle sessions keep a short history and their times."""
+        data = {"curve": {"profile": [], "state": {}}, "version": ["tag", 3]}
+        log = DrinkLog(data)
+        start = int(time.time()) - 2 * HOUR
+        log.extend_history((DRINKS[i % 3], start + i) for i in range(300))
+        self.sessions.set("session:large", data, timeout=31 * 24 * HOUR)
+        self.sessions.set("session:small", {"user": {}}, timeout=31 * 24 * HOUR)
+        self.age(self.sessions, "session:large", 1)
+        path = self.sessions._get_filename("session:large")
+        size, mtime = os.path.getsize(path), os.stat(path).st_mtime_ns
+
+        state = self.sweeper.sweep()
+
+        compacted = self.sessions.get("session:large")
+        history = DrinkLog(compacted, archive=self.archive).entries
+        self.assertLessEqual(len(compacted["history_ids"]), 20)
+        self.assertEqual(history.next_id, 300)
+        self.assertEqual(len(list(history.iter_entries())), 300)
+        self.assertNotIn("curve", compacted)
+        self.assertEqual(compacted["version"], ["tag", 4])
+        self.assertEqual(os.stat(path).st_mtime_ns, mtime)
+        self.assertEqual(state["compacted"], {"sessions": 1})
+        self.assertEqual(
+            state["reclaimed"]["sessions"]["compacted"],
+            size - os.path.getsize(path),
+        )
+
+    def test_sweeps_are_spaced(self):
+        """Test that a sweep within half an interval of the last is skipped."""
+        self.sweeper.interval = 300
+        self.assertIsNotNone(self.sweeper.sweep())
+        self.assertIsNone(self.sweeper.sweep())
+        self.assertEqual(self.sweeper.sweep(force=True)["sweeps"], 2)
+
+    def test_metrics(self):
+        """Test that reclaimed bytes and sweep durations are served at /metrics."""
+        self.sessions.set("session:expired", {"user": {}}, timeout=1)
+        self.sweeper.sweep(now=time.time() + 10)
+
+        instrumentation.enabled = True
+        try:
+            metrics = app.test_client().get("/metrics").text
+        finally:
+            instrumentation.enabled = False
+        self.assertIn("bac_sweep_duration_seconds_count 1", metrics)
+        self.assertIn(
+            'bac_sweep_deleted_files_total{directory="sessions",reason="expired"} 1',
+            metrics,
+        )
+        self.assertIn(
+            'bac_sweep_reclaimed_bytes_total{directory="sessions",reason="expired"}',
+            metrics,
+        )
+        self.assertIn('bac_swept_files{directory="sessions"} 0', metrics)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+import unittest
+
+import numpy as np
+
+from engine import tables
+from engine.batch import (
+    AGE_FACTOR_ARRAY,
+    adjusted_metabolism_rates,
+    age_factors,
+    reduction_factors,
+)
+from engine.constants import (
+    AGE_FACTOR_ONSET,
+    AGE_FACTOR_SLOPE,
+    ALCOHOL_METABOLISM_RATE,
+    DEFAULT_REDUCTION_FACTOR,
+    MIN_METABOLISM_RATE,
+    REDUCTION_FACTOR,
+    REFERENCE_WEIGHT,
+)
+from main import (
+    calculate_adjusted_metabolism_rate,
+    calculate_age_factor,
+    calculate_reduction_factor,
+)
+from models.user import MAX_AGE, MAX_WEIGHT, MIN_AGE
+
+AGES = range(MIN_AGE, MAX_AGE + 1)
+GENDERS = ["male", "female", "unknown"]
+# Every whole and tenth kilogram up to MAX_WEIGHT
+WEIGHTS = [w / 10 for w in range(1, int(MAX_WEIGHT * 10) + 1)]
+
+
+# The arithmetic the helpers used before the tables, kept as reference
+def reference_age_factor(age):
+    if age <= AGE_FACTOR_ONSET:
+        return 1
+    return round(1 - ((age - AGE_FACTOR_ONSET) * AGE_FACTOR_SLOPE), 2)
+
+
+def reference_reduction_factor(gender, age):
+    reduction_factor = REDUCTION_FACTOR.get(gender, DEFAULT_REDUCTION_FACTOR)
+    return reduction_factor * reference_age_factor(age)
+
+
+def reference_metabolism_rate(age, weight):
+    metabolism_rate = ALCOHOL_METABOLISM_RATE * reference_age_factor(age)
+    metabolism_rate = max(MIN_METABOLISM_RATE, metabolism_rate)
+    return round(metabolism_rate * (weight / REFERENCE_WEIGHT), 2)
+
+
+class TestFactorTables(unittest.TestCase):
+    """Test that the table lookups match the arithmetic over the full domain"""
+
+    def test_age_factor(self):
+        for age in AGES:
+            self.assertEqual(calculate_age_factor(age), reference_age_factor(age))
+
+    def test_reduction_factor(self):
+        for gender in GENDERS:
+            for age in AGES:
+                self.assertEqual(
+                    calculate_reduction_factor(gender, age),
+                    reference_reduction_factor(gender, age),
+                )
+
+    def test_adjusted_metabolism_rate(self):
+        for age in AGES:
+            for weight in WEIGHTS:
+                self.assertEqual(
+                    calculate_adjusted_metabolism_rate(age, weight),
+                    reference_metabolism_rate(age, weight),
+                    (age, weight),
+                )
+
+    def test_ages_outside_the_table(self):
+        for age in [-1, MAX_AGE + 1, 30.5]:
+            self.assertEqual(calculate_age_factor(age), reference_age_factor(age))
+            self.assertEqual(
+                calculate_reduction_factor("female", age),
+                reference_reduction_factor("female", age),
+            )
+            self.assertEqual(
+                calculate_adjusted_metabolism_rate(age, 70),
+                reference_metabolism_rate(age, 70),
+            )
+
+    def test_batch_lookups(self):
+        ages = np.repeat(np.arange(MIN_AGE, MAX_AGE + 1), len(GENDERS))
+        genders = np.array(GENDERS * len(AGES))
+        weights = np.linspace(0.1, MAX_WEIGHT, len(ages))
+
+        np.testing.assert_array_equal(
+            age_factors(ages), [reference_age_factor(age) for age in ages.tolist()]
+        )
+        np.testing.assert_array_equal(
+            reduction_factors(genders, ages),
+            [
+                reference_reduction_factor(gender, age)
+                for gender, age in zip(genders.tolist(), ages.tolist())
+            ],
+        )
+        np.testing.assert_array_equal(
+            adjusted_metabolism_rates(ages, weights),
+            [
+                reference_metabolism_rate(age, weight)
+                for age, weight in zip(ages.tolist(), weights.tolist())
+            ],
+        )
+
+    def test_tables_cover_the_age_domain(self):
+        self.assertEqual(len(tables.AGE_FACTORS), MAX_AGE - MIN_AGE + 1)
+        self.assertEqual(AGE_FACTOR_ARRAY.shape, (MAX_AGE - MIN_AGE + 1,))
+        self.assertEqual(set(tables.REDUCTION_FACTORS), set(REDUCTION_FACTOR))
@@ -0,0 +1,49 @@
+import random
+from datetime import datetime
+
+import pytest
+from babel.dates import format_datetime
+
+from main import DRINKS, app
+from models.time_format import TimestampFormatter, get_formatter
+
+START = 1_700_000_000
+LOCALES = ["de_DE", "en_US", "fr_CA", "ar_EG", "ja_JP", "fa_IR"]
+
+
+@pytest.fixture
+def client():
+    with app.test_client() as client:
+        yield client
+
+
+@pytest.mark.parametrize("locale", LOCALES)
+def test_matches_format_datetime(locale):
+    """Test that timestamps are formatted exactly like babel's format_datetime."""
+    formatter = TimestampFormatter(locale)
+    timestamps = [random.randint(0, 2_000_000_000) for _ in range(200)]
+    for timestamp in timestamps + [START, START + 59, START + 60]:
+        expected = format_datetime(datetime.fromtimestamp(timestamp), locale=locale)
+        assert formatter(timestamp) == expected
+
+
+def test_formats_each_minute_once():
+    """Test that entries of the same minute share one formatted minute."""
+    formatter = TimestampFormatter()
+    texts = [formatter(START + second) for second in range(180)]
+    assert len(set(texts)) == 180
+    assert formatter.format_minute.cache_info().misses <= 4
+    assert get_formatter("en_US") is get_formatter("en_US")
+
+
+def test_history_uses_accept_language(client):
+    """Test that history times are formatted in the requested locale."""
+    client.post("/add_drink", data={"drink": str(DRINKS[1])})
+    for header, locale in [
+        ("en-US,en;q=0.9", "en_US"),
+        ("fr-CH, fr;q=0.9", "fr_FR"),
+        ("es", "de_DE"),
+    ]:
+        response = client.get("/api/v1/history", headers={"Accept-Language": header})
+        entry = response.get_json()["history"][0]
+        assert entry["time"] == get_formatter(locale)(entry["timestamp"])
@@ -0,0 +1,132 @@
+import time
+import unittest
+
+from engine.uncertainty import Distribution, parse_distributions, simulate
+from main import DRINKS, app, calculate_bac, calculate_time_to_sober
+
+PROFILE = {"total_alcohol": 40.0, "weight": 80.0, "gender": "male", "age": 30}
+ZERO = {
+    parameter: Distribution("normal", 0)
+    for parameter in ("reduction", "absorption", "metabolism")
+}
+
+
+class TestSimulate(unittest.TestCase):
+    def test_seed_is_reproducible(self):
+        """Test that the same seed gives the same bands."""
+        first = simulate(**PROFILE, samples=2000, seed=7).to_dict()
+        second = simulate(**PROFILE, samples=2000, seed=7).to_dict()
+        self.assertEqual(first, second)
+
+    def test_bands_are_ordered_around_point_estimate(self):
+        """Test that p5 <= p50 <= p95 and p50 is near the point estimate."""
+        result = simulate(**PROFILE, samples=10000, seed=1).to_dict()
+        for bands in (result["bac"], result["time_to_sober"]):
+            self.assertLessEqual(bands["p5"], bands["p50"])
+            self.assertLessEqual(bands["p50"], bands["p95"])
+        bac = calculate_bac(80.0, "male", 30, 40.0)
+        self.assertAlmostEqual(result["bac"]["p50"], bac, delta=bac * 0.05)
+
+    def test_zero_scale_collapses_to_point_estimate(self):
+        """Test that distributions without spread give the scalar result."""
+        result = simulate(**PROFILE, samples=100, distributions=ZERO).to_dict()
+        bac = calculate_bac(80.0, "male", 30, 40.0)
+        self.assertEqual(set(result["bac"].values()), {bac})
+        self.assertAlmostEqual(
+            result["time_to_sober"]["p50"],
+            calculate_time_to_sober(bac, 80.0, 30),
+            delta=0.02,
+        )
+
+    def test_invalid_input(self):
+        """Test that invalid samples and weights raise ValueError."""
+        with self.assertRaises(ValueError):
+            simulate(**dict(PROFILE, weight=0))
+        with self.assertRaises(ValueError):
+            simulate(**PROFILE, samples=0)
+
+    def test_ten_thousand_samples_are_fast(self):
+        """Test that 10k samples stay well within an interactive request."""
+        start = time.perf_counter()
+        simulate(**PROFILE, samples=10000)
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+
+class TestDistributions(unittest.TestCase):
+    def test_parse_overrides_defaults(self):
+        """Test that parsed distributions replace only the named parameters."""
+        distributions = parse_distributions("metabolism=uniform:0.3")
+        self.assertEqual(distributions["metabolism"], Distribution("uniform", 0.3))
+        self.assertEqual(distributions["reduction"].kind, "normal")
+        self.assertEqual(parse_distributions(""), parse_distributions(" , "))
+
+    def test_parse_invalid(self):
+        """Test that unknown parameters, kinds and scales raise ValueError."""
+        invalid = ("weight=normal:0.1", "reduction=cauchy:0.1", "reduction=normal:1")
+        for value in invalid:
+            with self.assertRaises(ValueError):
+                parse_distributions(value)
+
+    def test_every_kind_samples(self):
+        """Test that each kind samples multipliers around 1 within bounds."""
+        for kind in ("normal", "lognormal", "uniform", "triangular"):
+            distributions = {"reduction": Distribution(kind, 0.2)}
+            result = simulate(
+                **PROFILE, samples=5000, distributions=distributions, seed=3
+            ).to_dict()
+            self.assertLess(result["bac"]["p5"], result["bac"]["p95"])
+
+
+class TestUncertaintyRoutes(unittest.TestCase):
+    def setUp(self):
+        self.client = app.test_client()
+        self.client.post("/add_drink", data={"drink": str(DRINKS[1])})
+
+    def test_api_returns_bands(self):
+        """Test that the API only returns bands when they are requested."""
+        profile = {"weight": 80, "gender": "male", "age": 30}
+        response = self.client.post("/api/v1/calculate", json=profile)
+        self.assertIsNone(response.get_json()["uncertainty"])
+
+        response = self.client.post(
+            "/api/v1/calculate",
+            json=dict(profile, uncertainty=True, samples=1000, seed=5),
+        )
+        data = response.get_json()
+        self.assertEqual(data["uncertainty"]["samples"], 1000)
+        bac = data["uncertainty"]["bac"]
+        self.assertLessEqual(bac["p5"], data["bac"])
+        self.assertLessEqual(data["bac"], bac["p95"])
+
+    def test_invalid_samples(self):
+        """Test that an invalid number of samples or seed is rejected with 400."""
+        for options in [{"samples": "many"}, {"samples": -5}, {"seed": -1}]:
+            with self.subTest(options=options):
+                response = self.client.post(
+                    "/api/v1/calculate",
+                    json={"weight": 80, "uncertainty": True, **options},
+                )
+                self.assertEqual(response.status_code, 400)
+
+    def test_samples_are_capped(self):
+        """Test that the samples are capped at UNCERTAINTY_MAX_SAMPLES."""
+        response = self.client.post(
+            "/api/v1/calculate",
+            json={"weight": 80, "uncertainty": True, "samples": 10**9, "seed": 1},
+        )
+        self.assertEqual(
+            response.get_json()["uncertainty"]["samples"],
+            app.config["UNCERTAINTY_MAX_SAMPLES"],
+        )
+
+    def test_result_page_shows_range(self):
+        """Test that the result page shows the range when requested."""
+        response = self.client.post(
+            "/calculate",
+            data={"weight": "80", "gender": "male", "age": "30", "uncertainty": "1"},
+        )
+        self.assertIn("Unsicherheitsbereich", response.get_data(as_text=True))
+
+
+if __name__ == "__main__":
+    unittest.main()